@@ -0,0 +1 @@
+"""実ブラウザを使うベンチマーク (pytest の対象外。`python -m benchmarks.run` で実行)"""
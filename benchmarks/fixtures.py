@@ -0,0 +1,135 @@
+"""ベンチマーク用の合成ページを配信するローカル HTTP サーバー
+
+ページ:
+    /static            テキストのみの軽いページ
+    /images?n=N        N 枚の大きな (圧縮の効かない) 画像を含むページ
+    /tall?height=PX    指定した高さの縦長ページ
+    /lazy?n=N          loading="lazy" の画像を縦に並べたページ
+    /auth              Basic 認証付きページ (AUTH_USER / AUTH_PASSWORD)
+    /slow?delay=MS     応答を MS ミリ秒遅らせるページ
+"""
+import base64
+import random
+import struct
+import threading
+import time
+import zlib
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+AUTH_USER = "bench"
+AUTH_PASSWORD = "bench"
+IMAGE_SIZE = 512
+
+
+@lru_cache(maxsize=None)
+def synthetic_png(width: int, height: int, seed: int = 0) -> bytes:
+    """ノイズで埋めた RGB の PNG (ブラウザのデコード負荷を再現するため圧縮が効かない)"""
+    # 行ごとに独立した乱数にする (行を使い回すと zlib が前の行を参照して圧縮できてしまう)
+    # 同じ seed からは実行をまたいで同じ画像を作る
+    stride = width * 3
+    noise = random.Random(seed).randbytes(stride * height)
+    rows = b"".join(b"\x00" + noise[y * stride : (y + 1) * stride] for y in range(height))
+
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+    header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    return b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header) + chunk(b"IDAT", zlib.compress(rows, 1)) + chunk(b"IEND", b"")
+
+
+def _page(title: str, body: str) -> bytes:
+    return (
+        f'<!doctype html><html lang="ja"><head><meta charset="utf-8"><title>{title}</title>'
+        f"<style>body{{margin:0;font-family:sans-serif}} img{{display:block}}</style></head>"
+        f"<body>{body}</body></html>"
+    ).encode()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args) -> None:
+        pass
+
+    def _send(self, body: bytes, content_type: str = "text/html; charset=utf-8", status: int = 200) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self) -> None:
+        url = urlparse(self.path)
+        query = {k: v[0] for k, v in parse_qs(url.query).items()}
+        n = int(query.get("n", 12))
+
+        if url.path == "/static":
+            paragraphs = "".join(f"<p>段落 {i}: ベンチマーク用のテキストです。</p>" for i in range(50))
+            self._send(_page("static", f"<h1>Static</h1>{paragraphs}"))
+        elif url.path == "/images":
+            images = "".join(
+                f'<img src="/img/{i}.png" width="{IMAGE_SIZE}" height="{IMAGE_SIZE}">' for i in range(n)
+            )
+            self._send(_page("images", images))
+        elif url.path == "/tall":
+            height = int(query.get("height", 20000))
+            stripes = "".join(
+                f'<div style="height:500px;background:hsl({i * 37 % 360},60%,70%)">{i}</div>'
+                for i in range(height // 500)
+            )
+            self._send(_page("tall", stripes))
+        elif url.path == "/lazy":
+            images = "".join(
+                f'<div style="height:1500px"><img loading="lazy" src="/img/{i}.png" '
+                f'width="{IMAGE_SIZE}" height="{IMAGE_SIZE}"></div>'
+                for i in range(n)
+            )
+            self._send(_page("lazy", images))
+        elif url.path == "/auth":
+            expected = base64.b64encode(f"{AUTH_USER}:{AUTH_PASSWORD}".encode()).decode()
+            if self.headers.get("Authorization") != f"Basic {expected}":
+                self.send_response(401)
+                self.send_header("WWW-Authenticate", 'Basic realm="bench"')
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            self._send(_page("auth", "<h1>Authenticated</h1>"))
+        elif url.path == "/slow":
+            time.sleep(int(query.get("delay", 1000)) / 1000)
+            self._send(_page("slow", "<h1>Slow</h1>"))
+        elif url.path.startswith("/img/") and url.path.endswith(".png"):
+            seed = int(url.path[len("/img/") : -len(".png")])
+            self._send(synthetic_png(IMAGE_SIZE, IMAGE_SIZE, seed % 7), "image/png")
+        else:
+            self._send(b"not found", "text/plain", status=404)
+
+
+class FixtureServer:
+    """127.0.0.1 の空きポートで合成ページを配信する (with 文で起動・停止)"""
+
+    def __init__(self, port: int = 0):
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), _Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def port(self) -> int:
+        return self._server.server_address[1]
+
+    def url(self, path: str) -> str:
+        return f"http://127.0.0.1:{self.port}{path}"
+
+    def start(self) -> "FixtureServer":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "FixtureServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
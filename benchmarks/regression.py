@@ -0,0 +1,53 @@
+"""ベンチマーク結果 (JSON) の保存とベースラインとの比較"""
+import json
+from dataclasses import dataclass
+from pathlib import Path
+
+LOWER = "lower"
+HIGHER = "higher"
+
+
+def metric(value: float, unit: str, better: str = LOWER) -> dict:
+    return {"value": value, "unit": unit, "better": better}
+
+
+@dataclass
+class Regression:
+    name: str
+    baseline: float
+    current: float
+    change: float
+    threshold: float
+
+    def summary(self) -> str:
+        return (
+            f"{self.name}: {self.baseline:.4g} -> {self.current:.4g} "
+            f"({self.change:+.1%}, 許容 {self.threshold:.0%})"
+        )
+
+
+def load_results(path: str | Path) -> dict:
+    return json.loads(Path(path).read_text(encoding="utf-8"))
+
+
+def write_results(results: dict, path: str | Path) -> None:
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    Path(path).write_text(json.dumps(results, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+
+
+def find_regressions(current: dict, baseline: dict, threshold: float = 0.2) -> list[Regression]:
+    """ベースラインより `threshold` (割合) を超えて悪化した指標を返す
+
+    ベースライン側の指標に "threshold" があればそちらを優先する。どちらかにしかない指標は無視する。
+    """
+    regressions = []
+    for name, base in baseline.get("metrics", {}).items():
+        cur = current.get("metrics", {}).get(name)
+        if cur is None or not base["value"]:
+            continue
+        change = (cur["value"] - base["value"]) / base["value"]
+        worse = change if base.get("better", LOWER) == LOWER else -change
+        limit = base.get("threshold", threshold)
+        if worse > limit:
+            regressions.append(Regression(name, base["value"], cur["value"], change, limit))
+    return regressions
@@ -0,0 +1,258 @@
+"""実ブラウザでの起動・撮影コストを測定するベンチマーク
+
+Usage:
+    uv run python -m benchmarks.run [-o PATH] [--baseline baseline.json] [--threshold 0.2] [--compare-profiles]
+
+ローカルの合成ページ (benchmarks/fixtures.py) に対して撮影し、結果を JSON で保存する。
+`--baseline` を指定すると比較し、閾値を超えて悪化した指標があれば終了コード 1 を返す。
+`--compare-profiles` を指定すると、起動プロファイルごとの起動・撮影の所要時間も測定する
+(interactive はウィンドウを表示するためディスプレイが必要)。
+"""
+import argparse
+import asyncio
+import os
+import platform
+import statistics
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+from src import BrowserLauncher
+from src.launch_profile import HEADLESS, INTERACTIVE, PROFILES, LaunchProfile
+from src.procstat import process_tree_rss
+from src.profiling import Profiler
+from src.readiness import ReadinessOptions
+from src.screen_detector import DEFAULT_SCREEN
+
+from .fixtures import AUTH_PASSWORD, AUTH_USER, FixtureServer
+from .regression import HIGHER, find_regressions, load_results, metric, write_results
+
+FULL_PAGE_HEIGHTS = (2000, 10000, 30000)
+RESULTS_PATH = Path(__file__).parent / "results.json"
+
+
+class RssSampler:
+    """ブラウザを含む子プロセスツリーの RSS を定期的に測定し、最大値を保持する"""
+
+    def __init__(self, interval: float = 0.1):
+        self.interval = interval
+        self.peak = 0
+        self._task: asyncio.Task | None = None
+
+    async def _run(self) -> None:
+        while True:
+            self.peak = max(self.peak, await asyncio.to_thread(process_tree_rss))
+            await asyncio.sleep(self.interval)
+
+    async def __aenter__(self) -> "RssSampler":
+        self._task = asyncio.create_task(self._run())
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+
+
+def _median(samples: list[float]) -> float:
+    return statistics.median(samples) if samples else 0.0
+
+
+async def bench_cold_launch(launcher: BrowserLauncher, iterations: int) -> float:
+    """Playwright 起動からブラウザ起動完了まで"""
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        async with launcher.launch_browser():
+            samples.append(time.perf_counter() - start)
+    return _median(samples)
+
+
+async def bench_first_screenshot(launcher: BrowserLauncher, url: str, iterations: int) -> float:
+    """ブラウザ起動から最初のスクリーンショット取得まで"""
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        async with launcher.launch() as page:
+            await launcher.navigate(page, url)
+            await launcher.capture(page)
+            samples.append(time.perf_counter() - start)
+    return _median(samples)
+
+
+async def bench_steady_state(launcher: BrowserLauncher, page, url: str, seconds: float) -> float:
+    """起動済みのページで遷移と撮影を繰り返したときの毎秒撮影数"""
+    count = 0
+    start = time.perf_counter()
+    while (elapsed := time.perf_counter() - start) < seconds or count == 0:
+        await launcher.navigate(page, url)
+        await launcher.capture(page)
+        count += 1
+    return count / elapsed
+
+
+async def bench_capture(launcher: BrowserLauncher, page, url: str, full_page: bool, iterations: int) -> float:
+    """遷移・描画完了待ち・撮影の合計時間"""
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        await launcher.navigate(page, url)
+        await launcher.capture(page, full_page=full_page)
+        samples.append(time.perf_counter() - start)
+    return _median(samples)
+
+
+async def bench_launch_profiles(
+    url: str,
+    iterations: int,
+    profiles: list[LaunchProfile],
+    browser_channel: str | None = None,
+    readiness: ReadinessOptions | None = None,
+) -> dict[str, dict]:
+    """起動プロファイルごとの起動時間・最初の撮影までの時間・起動後の撮影の所要時間"""
+    metrics: dict[str, dict] = {}
+    for profile in profiles:
+        launcher = BrowserLauncher(
+            DEFAULT_SCREEN, browser_channel=browser_channel, readiness=readiness, launch_profile=profile
+        )
+        prefix = f"profile_{profile.name}"
+        metrics[f"{prefix}_cold_launch_s"] = metric(await bench_cold_launch(launcher, iterations), "s")
+        metrics[f"{prefix}_first_screenshot_s"] = metric(
+            await bench_first_screenshot(launcher, url, iterations), "s"
+        )
+        async with launcher.launch() as page:
+            metrics[f"{prefix}_capture_s"] = metric(await bench_capture(launcher, page, url, False, iterations), "s")
+    return metrics
+
+
+def profile_gains(
+    metrics: dict[str, dict], baseline: str = INTERACTIVE.name, profile: str = HEADLESS.name
+) -> dict[str, float]:
+    """`baseline` に対する `profile` の速さ (所要時間の比、1 より大きいほど速い)"""
+    gains = {}
+    for name in ("cold_launch_s", "first_screenshot_s", "capture_s"):
+        base = metrics.get(f"profile_{baseline}_{name}")
+        current = metrics.get(f"profile_{profile}_{name}")
+        if base and current and current["value"]:
+            gains[name] = base["value"] / current["value"]
+    return gains
+
+
+async def run_benchmarks(
+    iterations: int = 3,
+    steady_seconds: float = 5.0,
+    browser_channel: str | None = None,
+    readiness: ReadinessOptions | None = None,
+    launch_profile: LaunchProfile = HEADLESS,
+    compare_profiles: bool = False,
+) -> dict:
+    profiler = Profiler()
+    launcher = BrowserLauncher(
+        DEFAULT_SCREEN,
+        http_credentials={"username": AUTH_USER, "password": AUTH_PASSWORD},
+        browser_channel=browser_channel,
+        readiness=readiness,
+        profiler=profiler,
+        launch_profile=launch_profile,
+    )
+    metrics: dict[str, dict] = {}
+    with FixtureServer() as server:
+        async with RssSampler() as rss:
+            metrics["cold_launch_s"] = metric(await bench_cold_launch(launcher, iterations), "s")
+            metrics["first_screenshot_s"] = metric(
+                await bench_first_screenshot(launcher, server.url("/static"), iterations), "s"
+            )
+            async with launcher.launch() as page:
+                for name, path in [("static", "/static"), ("images", "/images")]:
+                    rate = await bench_steady_state(launcher, page, server.url(path), steady_seconds)
+                    metrics[f"steady_{name}_per_s"] = metric(rate, "captures/s", HIGHER)
+                for height in FULL_PAGE_HEIGHTS:
+                    seconds = await bench_capture(
+                        launcher, page, server.url(f"/tall?height={height}"), True, iterations
+                    )
+                    metrics[f"full_page_{height}px_s"] = metric(seconds, "s")
+                metrics["lazy_full_page_s"] = metric(
+                    await bench_capture(launcher, page, server.url("/lazy"), True, iterations), "s"
+                )
+                metrics["auth_capture_s"] = metric(
+                    await bench_capture(launcher, page, server.url("/auth"), False, iterations), "s"
+                )
+                # 応答待ち (500ms) を除いた撮影側のオーバーヘッド
+                slow = await bench_capture(launcher, page, server.url("/slow?delay=500"), False, iterations)
+                metrics["slow_overhead_s"] = metric(max(0.0, slow - 0.5), "s")
+        metrics["peak_rss_bytes"] = metric(rss.peak, "bytes")
+        if compare_profiles:
+            metrics.update(
+                await bench_launch_profiles(
+                    server.url("/static"), iterations, [INTERACTIVE, HEADLESS], browser_channel, readiness
+                )
+            )
+
+    return {
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "browser_channel": browser_channel or "chromium",
+            "launch_profile": launch_profile.name,
+            "iterations": iterations,
+        },
+        "metrics": metrics,
+        "phases": profiler.summary(),
+    }
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(prog="benchmarks.run", description="起動・撮影コストのベンチマーク")
+    parser.add_argument(
+        "-o", "--output", type=Path, default=RESULTS_PATH, help=f"結果 (JSON) の保存先 (デフォルト: {RESULTS_PATH})"
+    )
+    parser.add_argument("--baseline", type=Path, metavar="PATH", help="比較するベースラインの結果 (JSON)")
+    parser.add_argument(
+        "--threshold", type=float, default=0.2, metavar="RATIO", help="許容する悪化の割合 (デフォルト: 0.2)"
+    )
+    parser.add_argument("--iterations", type=int, default=3, metavar="N", help="各測定の繰り返し回数 (中央値を採用)")
+    parser.add_argument("--steady-seconds", type=float, default=5.0, metavar="SEC", help="連続撮影の測定時間")
+    parser.add_argument("--chrome", action="store_true", help="Google Chromeを使用 (デフォルト: Chromium)")
+    parser.add_argument("--no-wait-ready", action="store_true", help="描画完了を待たずに撮影")
+    parser.add_argument(
+        "--launch-profile",
+        choices=list(PROFILES),
+        default=HEADLESS.name,
+        help=f"測定に使う起動プロファイル (デフォルト: {HEADLESS.name})",
+    )
+    parser.add_argument(
+        "--compare-profiles",
+        action="store_true",
+        help="起動プロファイルごとの起動・撮影時間も測定 (interactive はディスプレイが必要)",
+    )
+    args = parser.parse_args(argv)
+
+    results = asyncio.run(
+        run_benchmarks(
+            iterations=args.iterations,
+            steady_seconds=args.steady_seconds,
+            browser_channel="chrome" if args.chrome else None,
+            readiness=None if args.no_wait_ready else ReadinessOptions(),
+            launch_profile=PROFILES[args.launch_profile],
+            compare_profiles=args.compare_profiles,
+        )
+    )
+    write_results(results, args.output)
+    for name, m in results["metrics"].items():
+        print(f"{name:<24} {m['value']:>12.4g} {m['unit']}")
+    for name, gain in profile_gains(results["metrics"]).items():
+        print(f"{HEADLESS.name} vs {INTERACTIVE.name}: {name} {gain:.2f}x faster")
+    print(f"Results saved: {args.output}")
+
+    if args.baseline:
+        regressions = find_regressions(results, load_results(args.baseline), args.threshold)
+        for regression in regressions:
+            print(f"[REGRESSION] {regression.summary()}")
+        if regressions:
+            raise SystemExit(1)
+        print("No regressions")
+
+
+if __name__ == "__main__":
+    main()
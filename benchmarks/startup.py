@@ -0,0 +1,110 @@
+"""CLI の起動時間 (モジュールの読み込み時間) の測定
+
+Usage:
+    uv run python -m benchmarks.startup [--budget MS] [--runs N] [--top N]
+
+`python -X importtime` で `main` を読み込み、読み込み時間 (中央値) が予算内か、
+ブラウザを起動しない実行で読み込むべきでないモジュール (Playwright など) を読み込んでいないかを確認する。
+予算を超えた・読み込んでいた場合は終了コード 1 を返す。
+"""
+import argparse
+import re
+import statistics
+import subprocess
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+# `main` の読み込み時間の上限 (Python 自体の起動は含まない)
+DEFAULT_BUDGET_MS = 150.0
+# `--help` / `detect` などで読み込まないモジュール
+HEAVY_MODULES = ("playwright", "PIL", "numpy", "greenlet")
+
+_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|\s+(\S+)\s*$")
+
+
+@dataclass
+class ImportTime:
+    module: str
+    self_us: int
+    cumulative_us: int
+
+
+def parse_importtime(stderr: str) -> list[ImportTime]:
+    """`-X importtime` の出力 (標準エラー) を解析する"""
+    entries = []
+    for line in stderr.splitlines():
+        if match := _LINE.match(line):
+            self_us, cumulative_us, module = match.groups()
+            entries.append(ImportTime(module, int(self_us), int(cumulative_us)))
+    return entries
+
+
+def measure_imports(args: list[str], check: bool = True) -> list[ImportTime]:
+    """`python -X importtime ARGS` を実行し、読み込んだモジュールを返す
+
+    `check=False` なら終了コードが 0 以外 (引数の誤りなど) でも読み込んだモジュールを返す。
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", *args], cwd=ROOT, capture_output=True, text=True, check=check
+    )
+    return parse_importtime(result.stderr)
+
+
+def heavy_imports(entries: list[ImportTime], heavy: tuple[str, ...] = HEAVY_MODULES) -> list[str]:
+    """読み込んだ `heavy` のパッケージ"""
+    return sorted({e.module.split(".")[0] for e in entries} & set(heavy))
+
+
+@dataclass
+class StartupReport:
+    module: str
+    median_ms: float
+    budget_ms: float
+    heavy: list[str]
+    slowest: list[ImportTime]
+
+    @property
+    def ok(self) -> bool:
+        return self.median_ms <= self.budget_ms and not self.heavy
+
+    def summary(self) -> str:
+        status = "OK" if self.ok else "OVER BUDGET" if not self.heavy else "HEAVY IMPORTS"
+        return f"{status}: import {self.module} {self.median_ms:.1f}ms (budget {self.budget_ms:.0f}ms)"
+
+
+def measure_startup(module: str = "main", runs: int = 5, budget_ms: float = DEFAULT_BUDGET_MS) -> StartupReport:
+    """`module` の読み込み時間 (累計, `runs` 回の中央値) を測定する"""
+    samples = []
+    entries: list[ImportTime] = []
+    for _ in range(runs):
+        entries = measure_imports(["-c", f"import {module}"])
+        samples.append(next(e.cumulative_us for e in entries if e.module == module) / 1000)
+    # 自身の読み込み時間が長いモジュール (最後の測定)
+    slowest = sorted(entries, key=lambda e: e.self_us, reverse=True)
+    return StartupReport(module, statistics.median(samples), budget_ms, heavy_imports(entries), slowest)
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(prog="benchmarks.startup", description="CLI の起動時間の測定")
+    parser.add_argument("--module", default="main", help="測定するモジュール (デフォルト: main)")
+    parser.add_argument(
+        "--budget", type=float, default=DEFAULT_BUDGET_MS, metavar="MS", help=f"上限 (デフォルト: {DEFAULT_BUDGET_MS:.0f}ms)"
+    )
+    parser.add_argument("--runs", type=int, default=5, metavar="N", help="測定回数 (中央値を採用, デフォルト: 5)")
+    parser.add_argument("--top", type=int, default=10, metavar="N", help="表示する遅いモジュールの数")
+    args = parser.parse_args(argv)
+
+    report = measure_startup(args.module, args.runs, args.budget)
+    for entry in report.slowest[: args.top]:
+        print(f"{entry.self_us / 1000:>8.1f}ms  {entry.module}")
+    for module in report.heavy:
+        print(f"[HEAVY] {module}")
+    print(report.summary())
+    if not report.ok:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
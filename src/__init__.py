@@ -1,4 +1,31 @@
-from .screen_detector import ScreenInfo, detect_screen_info
-from .browser_launcher import BrowserLauncher
+"""仮想解像度でのブラウザ起動・撮影
 
-__all__ = ["ScreenInfo", "detect_screen_info", "BrowserLauncher"]
+`BrowserLauncher` などは Playwright を読み込むため、最初に参照したときに読み込む
+(画面検出だけ・`--help` だけの実行で Playwright の読み込みを待たないように)。
+"""
+from importlib import import_module
+
+_EXPORTS = {
+    "ScreenInfo": ".screen_detector",
+    "detect_screen_info": ".screen_detector",
+    "resolve_screen_info": ".screen_detector",
+    "resolve_screen_info_async": ".screen_detector",
+    "CaptureItem": ".batch",
+    "CaptureResult": ".batch",
+    "load_manifest": ".batch",
+    "BrowserLauncher": ".browser_launcher",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name: str):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(_EXPORTS[name], __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,253 @@
+"""リクエストの横取りによる静的リソースのディスクキャッシュとブロック
+
+`RequestInterceptor` をコンテキストにルートとして登録すると、
+- ブロック対象 (リソース種別・ホスト) のリクエストを中断し、
+- CSS / JS / フォント / 画像などをディスク上の `AssetCache` から返す。
+キャッシュは実行・コンテキストをまたいで共有され、本文は SHA-256 をキーに
+保存するため、URL が異なっても同じ内容は1つしか保存しない。
+鮮度は Cache-Control / Expires / Last-Modified に従い、期限切れでも ETag / Last-Modified が
+あれば条件付きリクエストで再検証する。`force=True` の場合はヘッダに関係なく保存・再利用する。
+"""
+import asyncio
+import email.utils
+import hashlib
+import json
+import os
+import time
+from dataclasses import asdict, dataclass, field, fields
+from pathlib import Path
+
+from playwright.async_api import BrowserContext, Error as PlaywrightError, Request, Route
+
+from .block_rules import BlockRules
+from .paths import cache_dir
+
+CACHEABLE_RESOURCE_TYPES = frozenset({"stylesheet", "script", "font", "image", "media"})
+DEFAULT_FORCE_TTL = 24 * 60 * 60
+MAX_ENTRY_BYTES = 32 * 1024 * 1024
+# 保存した本文はデコード済みのため、転送に関するヘッダは返さない
+_DROP_HEADERS = {"content-encoding", "content-length", "transfer-encoding", "connection", "set-cookie"}
+
+
+def replayable_headers(headers: dict[str, str]) -> dict[str, str]:
+    """デコード済みの本文と一緒に `route.fulfill` で返せるヘッダ"""
+    return {k: v for k, v in headers.items() if k.lower() not in _DROP_HEADERS}
+
+
+def default_asset_cache_dir() -> Path:
+    return cache_dir() / "assets"
+
+
+def _cache_control(headers: dict[str, str]) -> dict[str, str]:
+    directives = {}
+    for part in headers.get("cache-control", "").lower().split(","):
+        name, _, value = part.strip().partition("=")
+        if name:
+            directives[name] = value.strip('"')
+    return directives
+
+
+def _delta_seconds(value: str | None) -> int:
+    """`Age` / `max-age` の秒数 (数字以外の不正な値は 0)"""
+    value = (value or "").strip()
+    return int(value) if value.isdigit() else 0
+
+
+def _http_date(value: str | None) -> float | None:
+    if not value:
+        return None
+    try:
+        return email.utils.parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+
+def freshness_lifetime(headers: dict[str, str], now: float) -> float | None:
+    """レスポンスを再検証なしで使える秒数 (保存すべきでなければ None)
+
+    RFC 9111 に従い max-age > Expires > Last-Modified からの推定 (経過時間の 10%) の順に決める。
+    """
+    directives = _cache_control(headers)
+    if "no-store" in directives:
+        return None
+    if "no-cache" in directives:
+        return 0.0
+    age = _delta_seconds(headers.get("age"))
+    for name in ("s-maxage", "max-age"):
+        if name in directives:
+            return float(max(0, _delta_seconds(directives[name]) - age))
+    date = _http_date(headers.get("date")) or now
+    if (expires := _http_date(headers.get("expires"))) is not None:
+        return max(0.0, expires - date)
+    if (modified := _http_date(headers.get("last-modified"))) is not None:
+        return max(0.0, (date - modified) * 0.1)
+    return None
+
+
+@dataclass
+class CacheEntry:
+    url: str
+    status: int
+    headers: dict[str, str]
+    digest: str
+    size: int
+    expires: float
+
+    @property
+    def validators(self) -> dict[str, str]:
+        """条件付きリクエスト用のヘッダ"""
+        validators = {}
+        if etag := self.headers.get("etag"):
+            validators["if-none-match"] = etag
+        if modified := self.headers.get("last-modified"):
+            validators["if-modified-since"] = modified
+        return validators
+
+
+class AssetCache:
+    """URL → メタデータ (index/) と、内容のハッシュ → 本文 (blobs/) のディスクキャッシュ"""
+
+    def __init__(
+        self, directory: str | Path | None = None, force: bool = False, force_ttl: float = DEFAULT_FORCE_TTL
+    ):
+        self.directory = Path(directory) if directory else default_asset_cache_dir()
+        self.force = force
+        self.force_ttl = force_ttl
+
+    def _index_path(self, url: str) -> Path:
+        return self.directory / "index" / f"{hashlib.sha256(url.encode()).hexdigest()}.json"
+
+    def _blob_path(self, digest: str) -> Path:
+        return self.directory / "blobs" / digest[:2] / digest
+
+    @staticmethod
+    def _write_atomic(path: Path, data: bytes) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, path)
+
+    def lookup(self, url: str) -> CacheEntry | None:
+        try:
+            return CacheEntry(**json.loads(self._index_path(url).read_text(encoding="utf-8")))
+        except (OSError, ValueError, TypeError):
+            return None
+
+    def read_body(self, entry: CacheEntry) -> bytes | None:
+        try:
+            return self._blob_path(entry.digest).read_bytes()
+        except OSError:
+            return None
+
+    def is_fresh(self, entry: CacheEntry, now: float | None = None) -> bool:
+        return self.force or entry.expires > (time.time() if now is None else now)
+
+    def store(self, url: str, status: int, headers: dict[str, str], body: bytes) -> CacheEntry | None:
+        """保存可能なら保存してエントリを返す (ヘッダで禁止されている・大きすぎる場合は None)"""
+        now = time.time()
+        lifetime = freshness_lifetime(headers, now)
+        if self.force:
+            lifetime = max(lifetime or 0.0, self.force_ttl)
+        if lifetime is None or status != 200 or len(body) > MAX_ENTRY_BYTES:
+            return None
+        digest = hashlib.sha256(body).hexdigest()
+        blob = self._blob_path(digest)
+        if not blob.exists():
+            self._write_atomic(blob, body)
+        entry = CacheEntry(url, status, replayable_headers(headers), digest, len(body), now + lifetime)
+        self._write_atomic(self._index_path(url), json.dumps(asdict(entry)).encode())
+        return entry
+
+    def refresh(self, entry: CacheEntry, headers: dict[str, str]) -> CacheEntry:
+        """304 Not Modified の応答ヘッダで鮮度を更新する"""
+        merged = {**entry.headers, **replayable_headers(headers)}
+        lifetime = freshness_lifetime(merged, time.time()) or 0.0
+        entry = CacheEntry(entry.url, entry.status, merged, entry.digest, entry.size, time.time() + lifetime)
+        self._write_atomic(self._index_path(entry.url), json.dumps(asdict(entry)).encode())
+        return entry
+
+
+@dataclass
+class InterceptorStats:
+    hits: int = 0
+    misses: int = 0
+    revalidated: int = 0
+    stored: int = 0
+    blocked: int = 0
+    bytes_saved: int = 0
+    bytes_fetched: int = 0
+    errors: int = 0
+
+    def merge(self, other: "InterceptorStats") -> None:
+        """他のプロセスの集計を加える"""
+        for f in fields(self):
+            setattr(self, f.name, getattr(self, f.name) + getattr(other, f.name))
+
+    def summary(self) -> str:
+        return (
+            f"{self.hits} hits, {self.revalidated} revalidated, {self.misses} misses ({self.stored} stored), "
+            f"{self.blocked} blocked, {self.bytes_saved / 1_000_000:.1f}MB saved, "
+            f"{self.bytes_fetched / 1_000_000:.1f}MB fetched"
+            + (f", {self.errors} errors" if self.errors else "")
+        )
+
+
+@dataclass
+class RequestInterceptor:
+    """コンテキストの全リクエストを横取りし、ブロックとディスクキャッシュを適用する"""
+
+    cache: AssetCache | None = None
+    block: BlockRules = field(default_factory=BlockRules)
+    stats: InterceptorStats = field(default_factory=InterceptorStats)
+
+    async def install(self, context: BrowserContext) -> None:
+        await context.route("**/*", self._handle)
+
+    async def _handle(self, route: Route) -> None:
+        request = route.request
+        if self.block and self.block.blocks(request):
+            self.stats.blocked += 1
+            await route.abort("blockedbyclient")
+            return
+        if (
+            self.cache is None
+            or request.method != "GET"
+            or request.resource_type not in CACHEABLE_RESOURCE_TYPES
+            or not request.url.startswith(("http://", "https://"))
+        ):
+            await route.fallback()
+            return
+        try:
+            await self._serve_cached(route, request)
+        except PlaywrightError:
+            self.stats.errors += 1
+            await route.fallback()
+
+    async def _serve_cached(self, route: Route, request: Request) -> None:
+        cache = self.cache
+        entry = await asyncio.to_thread(cache.lookup, request.url)
+        body = await asyncio.to_thread(cache.read_body, entry) if entry else None
+        if entry and body is not None and cache.is_fresh(entry):
+            self.stats.hits += 1
+            self.stats.bytes_saved += len(body)
+            await route.fulfill(status=entry.status, headers=entry.headers, body=body)
+            return
+
+        validators = entry.validators if entry and body is not None else {}
+        response = await route.fetch(headers={**request.headers, **validators} if validators else None)
+        if response.status == 304 and validators:
+            self.stats.revalidated += 1
+            self.stats.bytes_saved += len(body)
+            entry = await asyncio.to_thread(cache.refresh, entry, response.headers)
+            await route.fulfill(status=entry.status, headers=entry.headers, body=body)
+            return
+
+        self.stats.misses += 1
+        fetched = await response.body()
+        self.stats.bytes_fetched += len(fetched)
+        try:
+            if await asyncio.to_thread(cache.store, request.url, response.status, response.headers, fetched):
+                self.stats.stored += 1
+        except OSError:
+            self.stats.errors += 1
+        await route.fulfill(response=response, body=fetched)
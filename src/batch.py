@@ -0,0 +1,64 @@
+import csv
+from dataclasses import dataclass
+from pathlib import Path
+
+from .lazyload import PreloadReport
+from .readiness import ReadinessReport
+from .regions import Region, RegionReport, parse_region_list, require_pillow
+from .webmetrics import PageMetrics
+
+_TRUE_VALUES = {"1", "true", "yes", "y", "full", "f"}
+
+
+@dataclass
+class CaptureItem:
+    url: str
+    output: str
+    full_page: bool = False
+    regions: list[Region] | None = None
+
+
+@dataclass
+class CaptureResult:
+    item: CaptureItem
+    ok: bool
+    error: str | None = None
+    elapsed: float = 0.0
+    readiness: ReadinessReport | None = None
+    path: str | None = None
+    preload: PreloadReport | None = None
+    skipped: str | None = None
+    metrics: PageMetrics | None = None
+    regions: RegionReport | None = None
+
+
+def parse_full_page(value: str) -> bool:
+    return value.strip().lower() in _TRUE_VALUES
+
+
+def load_manifest(path: str | Path) -> list[CaptureItem]:
+    """マニフェスト (CSV: url,output[,full_page[,regions]]) を読み込む
+
+    空行と `#` で始まる行は無視する。先頭行が `url` で始まる場合はヘッダとして扱う。
+    regions は `;` 区切りの領域の指定 (`[名前=]セレクタ` / `[名前=]X,Y,幅x高さ`)。
+    regions がある場合、Pillow が無ければ RuntimeError (撮影を始める前に失敗させる)。
+    """
+    items: list[CaptureItem] = []
+    with open(path, newline="", encoding="utf-8") as f:
+        for lineno, row in enumerate(csv.reader(f), start=1):
+            cells = [cell.strip() for cell in row]
+            if not cells or not cells[0] or cells[0].startswith("#"):
+                continue
+            if lineno == 1 and cells[0].lower() == "url":
+                continue
+            if len(cells) < 2 or not cells[1]:
+                raise ValueError(f"{path}:{lineno}: output path is required")
+            full_page = parse_full_page(cells[2]) if len(cells) > 2 else False
+            try:
+                regions = parse_region_list(cells[3]) if len(cells) > 3 else []
+            except ValueError as e:
+                raise ValueError(f"{path}:{lineno}: {e}") from e
+            if regions:
+                require_pillow()
+            items.append(CaptureItem(url=cells[0], output=cells[1], full_page=full_page, regions=regions or None))
+    return items
@@ -0,0 +1,75 @@
+"""リクエストをブロックするリソース種別・ホストの指定
+
+CLI の引数解析からも参照するため、Playwright に依存しないモジュールに分けている。
+"""
+from dataclasses import dataclass
+from fnmatch import fnmatch
+from typing import TYPE_CHECKING
+from urllib.parse import urlparse
+
+if TYPE_CHECKING:
+    from playwright.async_api import Request
+
+# Playwright の Request.resource_type (document はページ自体のため対象外)
+RESOURCE_TYPES = frozenset({
+    "stylesheet", "image", "media", "font", "script", "texttrack",
+    "xhr", "fetch", "eventsource", "websocket", "manifest", "other",
+})
+# 解析・広告用の代表的なホスト (`--block-ads`)
+AD_HOSTS = (
+    "googletagmanager.com",
+    "google-analytics.com",
+    "analytics.google.com",
+    "doubleclick.net",
+    "googlesyndication.com",
+    "googleadservices.com",
+    "adservice.google.com",
+    "connect.facebook.net",
+    "hotjar.com",
+    "clarity.ms",
+    "scorecardresearch.com",
+    "amazon-adsystem.com",
+    "criteo.com",
+    "taboola.com",
+    "outbrain.com",
+)
+
+
+@dataclass
+class BlockRules:
+    """ブロックするリソース種別 (image, media, font など) とホストのパターン
+
+    ホストはそのドメインとサブドメインに一致する。`*` を含む場合は glob として扱う。
+    """
+
+    resource_types: frozenset[str] = frozenset()
+    hosts: tuple[str, ...] = ()
+
+    def __bool__(self) -> bool:
+        return bool(self.resource_types or self.hosts)
+
+    def matches_host(self, host: str) -> bool:
+        host = host.lower()
+        for pattern in self.hosts:
+            pattern = pattern.lower()
+            if "*" in pattern or "?" in pattern:
+                if fnmatch(host, pattern):
+                    return True
+            elif host == pattern or host.endswith(f".{pattern}"):
+                return True
+        return False
+
+    def blocks(self, request: "Request") -> bool:
+        if request.resource_type in self.resource_types:
+            return True
+        return bool(self.hosts) and self.matches_host(urlparse(request.url).hostname or "")
+
+
+def parse_block_rules(types: str | None = None, hosts: list[str] | None = None, ads: bool = False) -> BlockRules:
+    """`--block image,media` / `--block-host` / `--block-ads` の指定から BlockRules を作る"""
+    resource_types = frozenset(t.strip() for t in (types or "").split(",") if t.strip())
+    if unknown := resource_types - RESOURCE_TYPES:
+        raise ValueError(
+            f"Unknown resource type: {', '.join(sorted(unknown))} (choose from {', '.join(sorted(RESOURCE_TYPES))})"
+        )
+    return BlockRules(resource_types, tuple(hosts or ()) + (AD_HOSTS if ads else ()))
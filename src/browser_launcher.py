@@ -1,10 +1,31 @@
-from contextlib import asynccontextmanager
-from typing import AsyncIterator
+import asyncio
+import time
+import weakref
+from contextlib import AsyncExitStack, asynccontextmanager
+from pathlib import Path
+from dataclasses import dataclass
+from typing import AsyncIterator, Awaitable, Callable
 from urllib.parse import urlparse, urlunparse
 
-from playwright.async_api import async_playwright, Page
+from playwright.async_api import async_playwright, Browser, BrowserContext, Error as PlaywrightError, Page, Response
 
+from .asset_cache import RequestInterceptor
+from .batch import CaptureItem, CaptureResult
+from .encoder import ImageEncoder
+from .incremental import DOM_UNCHANGED, NOT_MODIFIED, IncrementalManifest
+from .launch_profile import INTERACTIVE, LaunchProfile
+from .lazyload import PreloadOptions, PreloadReport, preload_lazy_content
+from .matrix import SharedResponseCache, ViewportVariant
+from .paths import cache_dir
+from .profiling import Profiler
+from .readiness import ReadinessOptions, ReadinessReport, wait_for_ready
+from .regions import Region, RegionReport, RegionResult, crop_regions, locate_regions
 from .screen_detector import ScreenInfo
+from .screencast import ScreencastOptions, ScreencastRecorder
+from .tiled import TiledReport, capture_tiled
+from .webmetrics import OBSERVER_SCRIPT, PageMetrics, collect_metrics
+
+StorageState = str | Path | dict
 
 
 def parse_basic_auth_url(url: str) -> tuple[str, dict[str, str] | None]:
@@ -16,20 +37,81 @@ def parse_basic_auth_url(url: str) -> tuple[str, dict[str, str] | None]:
     return url, None
 
 
+def default_session_path(url: str) -> Path:
+    """URL のオリジンごとのセッション保存先 ($XDG_CACHE_HOME/virtual-resolution/sessions/)"""
+    netloc = urlparse(url).netloc.rsplit("@", 1)[-1] or "default"
+    return cache_dir() / "sessions" / f"{netloc.replace(':', '_')}.json"
+
+
+KEY_BINDING = "__virtualResolutionKey"
+_KEY_CAPTURE_SCRIPT = f"""
+(() => {{
+    if (window.__virtualResolutionKeyCapture) return;
+    window.__virtualResolutionKeyCapture = true;
+    document.addEventListener('keydown', (e) => {{
+        let action = null;
+        if (e.code === 'F9') {{
+            action = 'screenshot';
+        }} else if (e.code === 'F8') {{
+            action = 'record';
+        }} else if (e.code === 'Escape') {{
+            action = 'quit';
+        }}
+        if (action) {{
+            e.preventDefault();
+            window.{KEY_BINDING}(action);
+        }}
+    }}, true);
+}})();
+"""
+
+
+@dataclass
+class LoginForm:
+    """フォームログインの手順 (ログインページURL・入力値・送信ボタンのセレクタ)"""
+
+    url: str
+    fields: dict[str, str]
+    submit: str
+
+
 class BrowserLauncher:
     def __init__(
         self,
-        screen_info: ScreenInfo,
+        screen_info: ScreenInfo | None,
         viewport_offset: tuple[int, int] = (0, 0),
         headless: bool = False,
         http_credentials: dict[str, str] | None = None,
         browser_channel: str | None = None,
+        storage_state: str | Path | None = None,
+        readiness: ReadinessOptions | None = None,
+        profiler: Profiler | None = None,
+        trace_path: str | Path | None = None,
+        interceptor: RequestInterceptor | None = None,
+        preload: PreloadOptions | None = None,
+        incremental: IncrementalManifest | None = None,
+        metrics: bool = False,
+        launch_profile: LaunchProfile | None = None,
     ):
         self.screen_info = screen_info
         self.viewport_offset = viewport_offset
-        self.headless = headless
+        self.launch_profile = launch_profile or INTERACTIVE
+        self.headless = headless or self.launch_profile.headless
         self.http_credentials = http_credentials
         self.browser_channel = browser_channel
+        self.storage_state = Path(storage_state) if storage_state else None
+        self.readiness = readiness
+        self.readiness_reports: list[ReadinessReport] = []
+        self.profiler = profiler or Profiler(enabled=False)
+        self.trace_path = Path(trace_path) if trace_path else None
+        self._traces = 0
+        self.interceptor = interceptor
+        self.preload = preload
+        self.incremental = incremental
+        self.metrics = metrics
+        # 作り直しのために閉じるページ (閉じてもキー入力の "quit" を送らない)
+        self._retired: weakref.WeakSet[Page] = weakref.WeakSet()
+        self._key_contexts: weakref.WeakSet[BrowserContext] = weakref.WeakSet()
 
     def get_viewport_size(self) -> dict[str, int]:
         """Always return FullHD (1920x1080) viewport."""
@@ -38,84 +120,560 @@ class BrowserLauncher:
             "height": 1080 - self.viewport_offset[1],
         }
 
+    def _launch_options(self) -> dict:
+        viewport = self.get_viewport_size()
+        args = ["--lang=ja-JP", "--accept-lang=ja-JP,ja", "--no-sandbox"]
+        if self.launch_profile.window_size:
+            args.append(f"--window-size={viewport['width']},{viewport['height']}")
+        launch_options: dict = {
+            "headless": self.headless,
+            "args": [*args, *self.launch_profile.args],
+        }
+        if self.browser_channel:
+            launch_options["channel"] = self.browser_channel
+        return launch_options
+
+    def _context_options(
+        self,
+        http_credentials: dict[str, str] | None = None,
+        storage_state: StorageState | None = None,
+        variant: ViewportVariant | None = None,
+    ) -> dict:
+        context_options: dict = {
+            "viewport": variant.viewport if variant else self.get_viewport_size(),
+            "locale": "ja-JP",
+            "timezone_id": "Asia/Tokyo",
+            "extra_http_headers": {
+                "Accept-Language": "ja-JP,ja;q=0.9",
+            },
+            "ignore_https_errors": True,
+        }
+        if self.launch_profile.geolocation:
+            context_options["geolocation"] = {"latitude": 35.6762, "longitude": 139.6503}
+            context_options["permissions"] = ["geolocation"]
+        http_credentials = http_credentials or self.http_credentials
+        if http_credentials:
+            context_options["http_credentials"] = http_credentials
+        if storage_state is None and self.storage_state and self.storage_state.exists():
+            storage_state = self.storage_state
+        if storage_state is not None:
+            context_options["storage_state"] = storage_state if isinstance(storage_state, dict) else str(storage_state)
+        if variant and variant.device_scale_factor != 1.0:
+            context_options["device_scale_factor"] = variant.device_scale_factor
+        return context_options
+
+    def _init_script(self, viewport: dict[str, int] | None = None) -> str:
+        viewport = viewport or self.get_viewport_size()
+        script = """
+            Object.defineProperty(navigator, 'language', { get: () => 'ja-JP' });
+            Object.defineProperty(navigator, 'languages', { get: () => ['ja-JP', 'ja'] });
+        """
+        if not self.launch_profile.resize_guard:
+            return script
+        return script + f"""
+            // Resize prevention
+            const _targetWidth = {viewport['width']};
+            const _targetHeight = {viewport['height']};
+            window.addEventListener('resize', () => {{
+                if (window.innerWidth !== _targetWidth || window.innerHeight !== _targetHeight) {{
+                    window.resizeTo(_targetWidth, _targetHeight);
+                }}
+            }});
+        """
+
+    @asynccontextmanager
+    async def launch_browser(self) -> AsyncIterator[Browser]:
+        """ブラウザのみを起動する (コンテキストは `new_context` で作成)"""
+        async with AsyncExitStack() as stack:
+            with self.profiler.phase("playwright_start"):
+                p = await stack.enter_async_context(async_playwright())
+            with self.profiler.phase("browser_launch"):
+                browser = await p.chromium.launch(**self._launch_options())
+            try:
+                yield browser
+            finally:
+                with self.profiler.phase("browser_close"):
+                    await browser.close()
+
+    async def new_context(
+        self,
+        browser: Browser,
+        http_credentials: dict[str, str] | None = None,
+        storage_state: StorageState | None = None,
+        variant: ViewportVariant | None = None,
+        shared: SharedResponseCache | None = None,
+    ) -> BrowserContext:
+        """言語設定・認証情報・初期化スクリプトを適用したコンテキストを作成
+
+        `http_credentials` / `storage_state` を指定した場合はランチャーの設定より優先する。
+        保存済みの storage state (Cookie / localStorage) があれば読み込む。
+        `variant` を指定するとそのビューポート / デバイスピクセル比で作成する。
+        `interceptor` が設定されていれば、リソースのブロックとディスクキャッシュを適用する。
+        `shared` を指定するとコンテキスト間で静的リソースを共有する (ブロックの判定の後に適用する)。
+        `metrics` が有効なら表示性能の指標を記録する PerformanceObserver を登録する。
+        """
+        with self.profiler.phase("new_context", variant.label if variant else None):
+            context = await browser.new_context(**self._context_options(http_credentials, storage_state, variant))
+            await context.add_init_script(self._init_script(variant.viewport if variant else None))
+            if self.metrics:
+                await context.add_init_script(OBSERVER_SCRIPT)
+            # ルートは後に登録したものから呼ばれるため、ブロックの判定が先になるよう共有キャッシュを先に登録する
+            if shared:
+                await shared.install(context)
+            if self.interceptor:
+                await self.interceptor.install(context)
+        if self.trace_path:
+            await context.tracing.start(screenshots=True, snapshots=True)
+        return context
+
+    async def close_context(self, context: BrowserContext) -> None:
+        """コンテキストを閉じる (Playwright トレース有効時は先に保存する)
+
+        2つ目以降のコンテキストのトレースは `trace.zip` → `trace-1.zip` のように連番で保存する。
+        """
+        if self.trace_path:
+            path = self.trace_path
+            if self._traces:
+                path = path.with_name(f"{path.stem}-{self._traces}{path.suffix}")
+            self._traces += 1
+            path.parent.mkdir(parents=True, exist_ok=True)
+            await context.tracing.stop(path=str(path))
+        await context.close()
+
     @asynccontextmanager
     async def launch(self) -> AsyncIterator[Page]:
-        async with async_playwright() as p:
-            viewport = self.get_viewport_size()
-            launch_options: dict = {
-                "headless": self.headless,
-                "args": [
-                    "--lang=ja-JP",
-                    "--accept-lang=ja-JP,ja",
-                    "--no-sandbox",
-                    f"--window-size={viewport['width']},{viewport['height']}",
-                ],
-            }
-            if self.browser_channel:
-                launch_options["channel"] = self.browser_channel
-            browser = await p.chromium.launch(**launch_options)
-            context_options: dict = {
-                "viewport": self.get_viewport_size(),
-                "locale": "ja-JP",
-                "timezone_id": "Asia/Tokyo",
-                "extra_http_headers": {
-                    "Accept-Language": "ja-JP,ja;q=0.9",
-                },
-                "geolocation": {"latitude": 35.6762, "longitude": 139.6503},
-                "permissions": ["geolocation"],
-                "ignore_https_errors": True,
-            }
-            if self.http_credentials:
-                context_options["http_credentials"] = self.http_credentials
-            context = await browser.new_context(**context_options)
-            await context.add_init_script(f"""
-                Object.defineProperty(navigator, 'language', {{ get: () => 'ja-JP' }});
-                Object.defineProperty(navigator, 'languages', {{ get: () => ['ja-JP', 'ja'] }});
-
-                // Resize prevention
-                const _targetWidth = {viewport['width']};
-                const _targetHeight = {viewport['height']};
-                window.addEventListener('resize', () => {{
-                    if (window.innerWidth !== _targetWidth || window.innerHeight !== _targetHeight) {{
-                        window.resizeTo(_targetWidth, _targetHeight);
-                    }}
-                }});
-            """)
+        async with self.launch_browser() as browser:
+            context = await self.new_context(browser)
             page = await context.new_page()
             try:
                 yield page
             finally:
-                await context.close()
-                await browser.close()
+                await self.close_context(context)
+
+    async def capture_batch(
+        self,
+        items: list[CaptureItem],
+        concurrency: int = 4,
+        isolate: bool = False,
+        on_result: Callable[[CaptureResult], None] | None = None,
+        encoder: ImageEncoder | None = None,
+        tiled: bool = False,
+        tile_height: int | None = None,
+    ) -> list[CaptureResult]:
+        """1つのブラウザで複数URLのスクリーンショットを撮影
+
+        `concurrency` 個のページ (isolate=True の場合はコンテキスト) を並行に使い回す。
+        個々の失敗は結果に記録し、バッチ全体は中断しない。`encoder` を指定すると
+        エンコードと書き込みをバックグラウンドで行い、ページはすぐ次の撮影へ進む。
+        `tiled=True` の場合、full_page の項目はタイル分割で撮影する (常に PNG)。
+        `incremental` が設定されていれば、前回から変化のないページは撮影を省略する。
+        """
+        queue: asyncio.Queue[int] = asyncio.Queue()
+        for index in range(len(items)):
+            queue.put_nowait(index)
+
+        async def next_item() -> tuple[int, CaptureItem] | None:
+            try:
+                index = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return None
+            return index, items[index]
+
+        return await self.capture_stream(
+            next_item,
+            concurrency=max(1, min(concurrency, len(items))),
+            isolate=isolate,
+            on_result=on_result,
+            encoder=encoder,
+            tiled=tiled,
+            tile_height=tile_height,
+        )
+
+    async def capture_stream(
+        self,
+        next_item: Callable[[], Awaitable[tuple[int, CaptureItem] | None]],
+        concurrency: int = 4,
+        isolate: bool = False,
+        on_result: Callable[[CaptureResult], None] | None = None,
+        encoder: ImageEncoder | None = None,
+        tiled: bool = False,
+        tile_height: int | None = None,
+    ) -> list[CaptureResult]:
+        """`next_item` が None を返すまで (番号, 項目) を取り出して撮影する
+
+        `capture_batch` の本体。ページは `concurrency` 個のワーカーがそれぞれ1つずつ使い回し、
+        各ワーカーは `next_item` が None を返した時点で終了する。結果は番号順に返す。
+        """
+        results: dict[int, CaptureResult] = {}
+        encoding: list[asyncio.Task] = []
+
+        def finish(index: int, result: CaptureResult) -> None:
+            results[index] = result
+            if on_result:
+                on_result(result)
+
+        async def finish_encoding(index: int, result: CaptureResult, written: asyncio.Future[Path]) -> None:
+            try:
+                result.path = str(await written)
+            except (OSError, RuntimeError, ValueError) as e:
+                result = CaptureResult(result.item, ok=False, error=f"encode failed: {e}", elapsed=result.elapsed)
+                if self.incremental:
+                    self.incremental.forget(result.item.url)
+            finish(index, result)
+
+        async with self.launch_browser() as browser:
+            shared_context = None if isolate else await self.new_context(browser)
+
+            async def worker() -> None:
+                context = shared_context or await self.new_context(browser)
+                page = await context.new_page()
+                try:
+                    while (entry := await next_item()) is not None:
+                        index, item = entry
+                        if page.is_closed():
+                            page = await context.new_page()
+                        result, written = await self._capture_item(
+                            page, item, encoder, tile_height if tiled else None, tiled
+                        )
+                        if written is None:
+                            finish(index, result)
+                        else:
+                            encoding.append(asyncio.create_task(finish_encoding(index, result, written)))
+                finally:
+                    if shared_context is None:
+                        await self.close_context(context)
+                    elif not page.is_closed():
+                        await page.close()
+
+            try:
+                await asyncio.gather(*(worker() for _ in range(max(1, concurrency))))
+            finally:
+                if shared_context is not None:
+                    await self.close_context(shared_context)
+
+        await asyncio.gather(*encoding)
+        return [results[index] for index in sorted(results)]
+
+    async def capture_matrix(
+        self,
+        url: str,
+        variants: list[ViewportVariant],
+        output: str | Path,
+        full_page: bool = False,
+        login: LoginForm | None = None,
+        on_result: Callable[[CaptureResult], None] | None = None,
+        shared: SharedResponseCache | None = None,
+    ) -> list[CaptureResult]:
+        """1つのブラウザで同じページを複数のビューポートで撮影する
+
+        最初のバリエーションでログイン・セッション確認を行い、その storage state と
+        取得済みの静的リソース (`shared`) を残りのバリエーションと共有して並行に撮影する。
+        出力ファイル名は `output` にバリエーション名を付加したもの。
+        ディスクキャッシュ (`interceptor`) が有効な場合はそちらで共有されるため `shared` は使わない。
+        """
+        if not variants:
+            return []
+        shared = shared or SharedResponseCache()
+        use_shared = not (self.interceptor and self.interceptor.cache)
+
+        async with self.launch_browser() as browser:
+
+            async def capture_variant(
+                variant: ViewportVariant, state: StorageState | None, primary: bool
+            ) -> tuple[CaptureResult, dict | None]:
+                item = CaptureItem(url, str(variant.output_path(output)), full_page)
+                start = time.monotonic()
+                context = None
+                new_state = None
+                try:
+                    # コンテキストの作成に失敗しても、このバリエーションの失敗として扱う
+                    context = await self.new_context(
+                        browser, storage_state=state, variant=variant, shared=shared if use_shared else None
+                    )
+                    page = await context.new_page()
+                    if primary and login:
+                        await self.open_authenticated(page, url, login)
+                    elif primary:
+                        await self.navigate_with_session(page, url)
+                    else:
+                        await self.navigate(page, url)
+                    if primary:
+                        new_state = await context.storage_state()
+                    if full_page:
+                        await self.preload_lazy_content(page)
+                    Path(item.output).parent.mkdir(parents=True, exist_ok=True)
+                    await self.take_screenshot(page, item.output, full_page=full_page)
+                except (PlaywrightError, OSError) as e:
+                    result = CaptureResult(item, ok=False, error=str(e), elapsed=time.monotonic() - start)
+                else:
+                    result = CaptureResult(item, ok=True, elapsed=time.monotonic() - start, path=item.output)
+                finally:
+                    if context is not None:
+                        await self.close_context(context)
+                if on_result:
+                    on_result(result)
+                return result, new_state
+
+            first, state = await capture_variant(variants[0], None, primary=True)
+            rest = await asyncio.gather(*(capture_variant(v, state, primary=False) for v in variants[1:]))
+        return [first, *(result for result, _ in rest)]
+
+    async def _capture_item(
+        self,
+        page: Page,
+        item: CaptureItem,
+        encoder: ImageEncoder | None = None,
+        tile_height: int | None = None,
+        tiled: bool = False,
+    ) -> tuple[CaptureResult, asyncio.Future[Path] | None]:
+        """1件を撮影する。encoder 指定時は書き込み完了を表す Future も返す"""
+        start = time.monotonic()
+        written = None
+        incremental = self.incremental
+        tiled = tiled and item.full_page
+        output = encoder.options.output_path(item.output) if encoder and not tiled else Path(item.output)
+        previous = incremental.previous(item, output) if incremental else None
+
+        def skipped(
+            reason: str, metrics: PageMetrics | None = None, headers: dict[str, str] | None = None
+        ) -> CaptureResult:
+            elapsed = time.monotonic() - start
+            incremental.skip(previous, reason, elapsed, headers)
+            return CaptureResult(item, ok=True, elapsed=elapsed, path=str(output), skipped=reason, metrics=metrics)
+
+        try:
+            if previous and await incremental.not_modified(page.context, previous):
+                return skipped(NOT_MODIFIED), None
+            with self.profiler.phase("goto", item.url):
+                response = await page.goto(item.url)
+            readiness = await self.wait_until_ready(page)
+            metrics = await self.collect_metrics(page, item.url)
+            dom_hash = await incremental.dom_hash(page) if incremental else None
+            if previous and dom_hash == previous.dom_hash:
+                return skipped(DOM_UNCHANGED, metrics, response.headers if response else {}), None
+            preload = await self.preload_lazy_content(page) if item.full_page and not item.regions else None
+            capture_start = time.monotonic()
+            regions = None
+            if item.regions:
+                regions = await self.capture_regions(page, item.regions, item.output, encoder)
+            elif tiled:
+                await self.take_tiled_screenshot(page, item.output, tile_height)
+            elif encoder is None:
+                Path(item.output).parent.mkdir(parents=True, exist_ok=True)
+                await self.take_screenshot(page, item.output, full_page=item.full_page)
+            else:
+                data = await self.capture(page, full_page=item.full_page, item=item.url)
+                written = await encoder.submit(data, item.output)
+            if incremental and not item.regions:
+                headers = response.headers if response else {}
+                now = time.monotonic()
+                incremental.record(item, output, headers, dom_hash, now - start, now - capture_start)
+        except (PlaywrightError, OSError, RuntimeError) as e:
+            return CaptureResult(item, ok=False, error=str(e), elapsed=time.monotonic() - start), None
+        failed = regions.failed if regions else []
+        result = CaptureResult(
+            item,
+            ok=not failed,
+            error="; ".join(f"{r.region.name}: {r.error}" for r in failed) or None,
+            elapsed=time.monotonic() - start,
+            readiness=readiness,
+            path=item.output,
+            preload=preload,
+            metrics=metrics,
+            regions=regions,
+        )
+        return result, written
+
+    async def capture_regions(
+        self,
+        page: Page,
+        regions: list[Region],
+        output: str | Path,
+        encoder: ImageEncoder | None = None,
+    ) -> RegionReport:
+        """複数の領域を1回の撮影から切り出し、`output` に領域名を付けたファイルに保存する
+
+        全領域を囲む範囲だけを撮影する (表示領域の外の領域があればページ全体から)。
+        見つからない要素は結果に記録し、他の領域の撮影は続ける。
+        """
+        start = time.monotonic()
+        with self.profiler.phase("locate_regions", page.url):
+            plan = await locate_regions(page, regions)
+        if plan.full_page and self.preload:
+            # 遅延読み込みでレイアウトが変わるため、先読みの後に位置を取り直す
+            await self.preload_lazy_content(page)
+            with self.profiler.phase("locate_regions", page.url):
+                plan = await locate_regions(page, regions)
+        crops: dict[str, bytes] = {}
+        if plan.boxes:
+            with self.profiler.phase("screenshot", page.url):
+                data = await page.screenshot(full_page=plan.full_page, clip=plan.clip)
+            with self.profiler.phase("crop_regions", page.url):
+                crops = await asyncio.to_thread(crop_regions, data, plan)
+            del data
+
+        report = RegionReport(
+            raster=(round(plan.clip["width"]), round(plan.clip["height"])), full_page=plan.full_page
+        )
+        writes: list[tuple[RegionResult, asyncio.Future[Path]]] = []
+        for region in regions:
+            result = RegionResult(region)
+            report.results.append(result)
+            if region.name in plan.errors:
+                result.error = plan.errors[region.name]
+            elif (crop := crops.pop(region.name, None)) is None:
+                result.error = "outside the page"
+            elif encoder is not None:
+                writes.append((result, await encoder.submit(crop, region.output_path(output))))
+            else:
+                path = region.output_path(output)
+                path.parent.mkdir(parents=True, exist_ok=True)
+                await asyncio.to_thread(path.write_bytes, crop)
+                result.path = str(path)
+        for result, written in writes:
+            try:
+                result.path = str(await written)
+            except (OSError, RuntimeError, ValueError) as e:
+                result.error = f"encode failed: {e}"
+        report.elapsed = time.monotonic() - start
+        return report
 
     async def take_screenshot(
         self, page: Page, path: str, full_page: bool = False
     ) -> None:
-        await page.screenshot(path=path, full_page=full_page)
-
-    async def navigate(self, page: Page, url: str) -> None:
-        await page.goto(url)
-
-    async def setup_key_capture(self, page: Page) -> None:
-        """ブラウザ内キーキャプチャを設定 (F9, Escape)"""
-        await page.evaluate("""
-            window.__keyEvents = [];
-            document.addEventListener('keydown', (e) => {
-                if (e.code === 'F9') {
-                    e.preventDefault();
-                    window.__keyEvents.push('screenshot');
-                } else if (e.code === 'Escape') {
-                    e.preventDefault();
-                    window.__keyEvents.push('quit');
-                }
-            });
-        """)
-
-    async def poll_key_events(self, page: Page) -> list[str]:
-        """キーイベントを取得してクリア"""
-        events = await page.evaluate("""
-            const events = window.__keyEvents || [];
-            window.__keyEvents = [];
-            events;
-        """)
-        return events
+        with self.profiler.phase("screenshot_write", str(path)):
+            await page.screenshot(path=path, full_page=full_page)
+
+    async def take_tiled_screenshot(
+        self, page: Page, path: str, tile_height: int | None = None
+    ) -> TiledReport:
+        """ページ全体を表示領域ごとのタイルに分けて撮影し、1枚の PNG に結合する"""
+        with self.profiler.phase("tiled_capture", str(path)):
+            return await capture_tiled(page, path, tile_height=tile_height)
+
+    async def capture(self, page: Page, full_page: bool = False, item: str | None = None) -> bytes:
+        """スクリーンショットを PNG のバイト列として取得 (書き込みは呼び出し側)"""
+        with self.profiler.phase("screenshot", item):
+            return await page.screenshot(full_page=full_page)
+
+    async def navigate(self, page: Page, url: str, readiness: ReadinessOptions | None = None) -> Response | None:
+        with self.profiler.phase("goto", url):
+            response = await page.goto(url)
+        await self.wait_until_ready(page, readiness)
+        return response
+
+    async def wait_until_ready(self, page: Page, readiness: ReadinessOptions | None = None) -> ReadinessReport | None:
+        """描画完了まで待つ (`readiness` 未指定ならランチャーの設定、どちらもなければ何もしない)
+
+        結果は `readiness_reports` に記録される。
+        """
+        options = readiness or self.readiness
+        if options is None:
+            return None
+        with self.profiler.phase("readiness", page.url):
+            report = await wait_for_ready(page, options)
+        self.readiness_reports.append(report)
+        return report
+
+    async def collect_metrics(self, page: Page, item: str | None = None) -> PageMetrics | None:
+        """描画完了後のページの表示性能の指標 (`metrics` が無効なら None)"""
+        if not self.metrics:
+            return None
+        with self.profiler.phase("metrics", item):
+            return await collect_metrics(page)
+
+    async def preload_lazy_content(
+        self, page: Page, options: PreloadOptions | None = None
+    ) -> PreloadReport | None:
+        """ページ全体の撮影前に遅延読み込みのコンテンツを読み込ませる
+
+        `options` 未指定ならランチャーの設定を使い、どちらもなければ何もしない。
+        """
+        options = options or self.preload
+        if options is None:
+            return None
+        with self.profiler.phase("preload", page.url):
+            return await preload_lazy_content(page, options)
+
+    async def login(self, page: Page, form: LoginForm) -> None:
+        """ログインフォームに入力して送信する"""
+        with self.profiler.phase("login", form.url):
+            await page.goto(form.url)
+            await page.wait_for_load_state("networkidle")
+            for selector, value in form.fields.items():
+                await page.fill(selector, value)
+            await page.click(form.submit)
+            await page.wait_for_load_state("networkidle")
+
+    async def save_storage_state(self, page: Page, path: str | Path | None = None) -> Path | None:
+        """コンテキストの Cookie / localStorage を保存する (保存先未設定なら何もしない)"""
+        path = Path(path) if path else self.storage_state
+        if path is None:
+            return None
+        path.parent.mkdir(parents=True, exist_ok=True)
+        await page.context.storage_state(path=str(path))
+        path.chmod(0o600)
+        return path
+
+    async def navigate_with_session(
+        self, page: Page, url: str, readiness: ReadinessOptions | None = None
+    ) -> Response | None:
+        """保存済みセッションで URL を開く。401/403 なら Cookie を破棄して再試行する"""
+        with self.profiler.phase("goto", url):
+            response = await page.goto(url)
+            if response and response.status in (401, 403) and await page.context.cookies():
+                await page.context.clear_cookies()
+                response = await page.goto(url)
+        await self.wait_until_ready(page, readiness)
+        return response
+
+    async def open_authenticated(
+        self,
+        page: Page,
+        url: str,
+        form: LoginForm,
+        storage_state: str | Path | None = None,
+        readiness: ReadinessOptions | None = None,
+    ) -> bool:
+        """保存済みセッションで URL を開き、ログインページへ戻された場合のみログインする
+
+        セッションが有効なら追加のナビゲーションは発生しない。ログインした場合は
+        storage state を保存して True を返す。
+        """
+        with self.profiler.phase("goto", url):
+            await page.goto(url)
+        if urlparse(page.url).path != urlparse(form.url).path:
+            await self.wait_until_ready(page, readiness)
+            return False
+        await self.login(page, form)
+        await self.save_storage_state(page, storage_state)
+        await self.navigate(page, url, readiness)
+        return True
+
+    def screencast(
+        self, page: Page, output: str | Path, options: ScreencastOptions | None = None
+    ) -> ScreencastRecorder:
+        """ページの録画を用意する (`async with` で開始・停止)"""
+        return ScreencastRecorder(page, output, options, profiler=self.profiler)
+
+    def retire_page(self, page: Page) -> None:
+        """作り直しのために閉じるページとして登録する (閉じても終了とみなさない)"""
+        self._retired.add(page)
+
+    async def setup_key_capture(self, page: Page, queue: asyncio.Queue[str] | None = None) -> asyncio.Queue[str]:
+        """ブラウザ内キーキャプチャを設定 (F9, F8, Escape)
+
+        キー入力は公開バインディング経由でキューに push される。初期化スクリプトとして
+        登録するため、ナビゲーション後も再設定は不要。ページが閉じられると "quit" を送る
+        (`retire_page` で登録したページを除く)。作り直したページには同じ `queue` を渡して再設定する。
+        """
+        queue = queue or asyncio.Queue()
+        context = page.context
+        if context not in self._key_contexts:
+            await context.expose_binding(KEY_BINDING, lambda source, action: queue.put_nowait(action))
+            await context.add_init_script(_KEY_CAPTURE_SCRIPT)
+            self._key_contexts.add(context)
+        # 読み込み済みのドキュメントには初期化スクリプトが適用されないため直接実行
+        await page.evaluate(_KEY_CAPTURE_SCRIPT)
+        page.on("close", lambda closed: None if closed in self._retired else queue.put_nowait("quit"))
+        return queue
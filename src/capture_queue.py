@@ -0,0 +1,184 @@
+"""インタラクティブモードの撮影をキー入力の処理から切り離すキュー
+
+キー入力のループは撮影要求をキューに入れるだけですぐ次のキー入力を待つ。撮影 (ページ全体の描画を含む)
+はバックグラウンドの1つのワーカーが順に行い、エンコードと書き込みは `ImageEncoder` に渡すため、
+撮影と書き込みも重なって進む。キューが満杯のときの要求は捨てて数える。
+`store` を指定した場合は、個別のファイルではなく重複を除く保存先 (`ScreenshotStore`) に保存する。
+"""
+import asyncio
+import time
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+from functools import partial
+from pathlib import Path
+
+from playwright.async_api import Error as PlaywrightError, Page
+
+from .browser_launcher import BrowserLauncher
+from .encoder import ImageEncoder
+from .profiling import percentile
+from .screenshot_store import ScreenshotStore, StoredCapture
+
+
+@dataclass
+class ShotResult:
+    path: Path
+    # キーを押してから書き込みが終わるまで
+    latency: float
+    # 撮影そのもの (page.screenshot) の時間
+    capture_seconds: float = 0.0
+    error: str | None = None
+    stored: StoredCapture | None = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+@dataclass
+class CaptureQueueStats:
+    requested: int = 0
+    dropped: int = 0
+    saved: int = 0
+    failed: int = 0
+    latencies: list[float] = field(default_factory=list)
+
+    def summary(self) -> str:
+        text = f"{self.saved} saved, {self.failed} failed, {self.dropped} dropped (queue full)"
+        if self.latencies:
+            text += (
+                f", latency p50 {percentile(self.latencies, 50):.2f}s"
+                f" / p95 {percentile(self.latencies, 95):.2f}s"
+            )
+        return text
+
+
+class CaptureQueue:
+    """撮影要求を順に処理するバックグラウンドワーカー (`async with` で開始・終了)"""
+
+    def __init__(
+        self,
+        launcher: BrowserLauncher,
+        page: Page,
+        encoder: ImageEncoder,
+        full_page: bool = False,
+        maxsize: int = 8,
+        on_done: Callable[[ShotResult], None] | None = None,
+        after_capture: Callable[[], Awaitable[object]] | None = None,
+        store: ScreenshotStore | None = None,
+    ):
+        self.launcher = launcher
+        self.page = page
+        self.encoder = encoder
+        self.full_page = full_page
+        self.on_done = on_done
+        # 撮影のたびにワーカー内で呼ぶ (次の撮影の前にページを作り直す場合など)
+        self.after_capture = after_capture
+        self.store = store
+        self.stats = CaptureQueueStats()
+        self._queue: asyncio.Queue[tuple[Path, float] | None] = asyncio.Queue(maxsize)
+        self._worker: asyncio.Task | None = None
+        self._writing: set[asyncio.Future] = set()
+        self._bursts: set[asyncio.Task] = set()
+
+    @property
+    def depth(self) -> int:
+        """撮影待ちと書き込み中の件数"""
+        return self._queue.qsize() + len(self._writing)
+
+    def request(self, path: str | Path) -> bool:
+        """撮影を予約する。キューが満杯なら捨てて False を返す"""
+        self.stats.requested += 1
+        try:
+            self._queue.put_nowait((Path(path), time.perf_counter()))
+        except asyncio.QueueFull:
+            self.stats.dropped += 1
+            return False
+        return True
+
+    def burst(self, paths: Callable[[int], Path], count: int, interval: float) -> None:
+        """`interval` 秒ごとに `count` 回撮影を予約する (予約自体もバックグラウンドで行う)"""
+
+        async def schedule() -> None:
+            start = time.perf_counter()
+            for index in range(count):
+                # 撮影にかかった時間に関係なく、開始時刻からの一定間隔で予約する
+                await asyncio.sleep(max(0.0, start + index * interval - time.perf_counter()))
+                self.request(paths(index))
+
+        task = asyncio.create_task(schedule())
+        self._bursts.add(task)
+        task.add_done_callback(self._bursts.discard)
+
+    async def _run(self) -> None:
+        while (shot := await self._queue.get()) is not None:
+            path, requested = shot
+            start = time.perf_counter()
+            try:
+                data = await self.launcher.capture(self.page, full_page=self.full_page, item=str(path))
+            except PlaywrightError as e:
+                self._finish(ShotResult(path, time.perf_counter() - requested, error=str(e)))
+                continue
+            capture_seconds = time.perf_counter() - start
+            if self.store is not None:
+                viewport = self.page.viewport_size
+                size = f"{viewport['width']}x{viewport['height']}" if viewport else None
+                written = asyncio.ensure_future(self.store.add(data, self.page.url, size))
+            else:
+                written = await self.encoder.submit(data, path)
+            self._writing.add(written)
+            written.add_done_callback(partial(self._written, path, requested, capture_seconds))
+            if self.after_capture:
+                try:
+                    await self.after_capture()
+                except Exception as e:
+                    # ページの作り直しに失敗しても、ワーカーを止めずに次の撮影を続ける
+                    self._finish(ShotResult(path, time.perf_counter() - requested, error=f"after capture: {e}"))
+
+    def _written(
+        self, path: Path, requested: float, capture_seconds: float, written: "asyncio.Future[Path | StoredCapture]"
+    ) -> None:
+        self._writing.discard(written)
+        latency = time.perf_counter() - requested
+        if written.cancelled():
+            return
+        if (error := written.exception()) is not None:
+            self._finish(ShotResult(path, latency, capture_seconds, error=str(error)))
+        elif isinstance(saved := written.result(), StoredCapture):
+            self._finish(ShotResult(saved.path, latency, capture_seconds, stored=saved))
+        else:
+            self._finish(ShotResult(saved, latency, capture_seconds))
+
+    def _finish(self, result: ShotResult) -> None:
+        if result.ok:
+            self.stats.saved += 1
+            self.stats.latencies.append(result.latency)
+        else:
+            self.stats.failed += 1
+        if self.on_done:
+            self.on_done(result)
+
+    async def start(self) -> None:
+        self._worker = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        """予約済みの連続撮影をやめ、キューに残った撮影と書き込みが終わるまで待つ"""
+        for task in list(self._bursts):
+            task.cancel()
+        if self._worker is not None:
+            # 終了済みのワーカーには終端を送らない (キューが満杯だと put が返らない)
+            if not self._worker.done():
+                await self._queue.put(None)
+            await asyncio.gather(self._worker, return_exceptions=True)
+            self._worker = None
+        if self._writing:
+            await asyncio.gather(*self._writing, return_exceptions=True)
+            # 書き込み済みの Future の完了通知 (_written) は次のループで呼ばれるため、それを待つ
+            await asyncio.sleep(0)
+
+    async def __aenter__(self) -> "CaptureQueue":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.close()
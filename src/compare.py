@@ -0,0 +1,257 @@
+"""スクリーンショットとベースラインの差分検出
+
+画像をタイルに分割し、完全に一致したタイルは画素ごとの差分計算を省略する
+(画像の読み込みと一致の確認では全画素を読む)。異なるタイルだけを NumPy でチャンネルごとに比較し、
+許容誤差を超えた画素を数える。アンチエイリアスは pixelmatch と同じく、明るい画素と暗い画素の間にある
+エッジ上の画素で、最も明るい・暗い隣接画素が両方の画像で平坦な領域にあるものだけを除外する
+(くっきりした線の1画素のずれは差分として検出する)。
+NumPy と Pillow が必要 (`uv sync --extra compare`)。
+"""
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+IMAGE_SUFFIXES = {".png", ".jpg", ".jpeg", ".webp"}
+
+_FADE = 0.25
+_DIFF_COLOR = (255, 0, 0)
+_ANTIALIAS_COLOR = (255, 200, 0)
+# 周囲8画素の相対位置
+_NEIGHBOURS = [(dy, dx) for dy in (-1, 0, 1) for dx in (-1, 0, 1) if dy or dx]
+# 輝度の重み (ITU-R BT.601, 整数演算で同じ色が同じ輝度になるように1000倍)
+_LUMA = np.array([299, 587, 114], dtype=np.int32)
+
+
+@dataclass
+class CompareOptions:
+    tolerance: int = 0
+    antialias: bool = True
+    tile_size: int = 64
+    max_diff_ratio: float = 0.0
+
+
+@dataclass
+class CompareResult:
+    baseline: str
+    capture: str
+    width: int
+    height: int
+    diff_pixels: int
+    antialiased_pixels: int
+    tiles_total: int
+    tiles_identical: int
+    diff_ratio: float
+    passed: bool
+    size_mismatch: bool = False
+    diff_image: str | None = None
+    error: str | None = None
+    changed_tiles: list[tuple[int, int, int, int]] = field(default_factory=list)
+
+
+def _load_rgb(path: str | Path) -> np.ndarray:
+    with Image.open(path) as image:
+        return np.asarray(image.convert("RGB"))
+
+
+def _neighbours(padded: np.ndarray, h: int, w: int) -> np.ndarray:
+    """周囲1画素ずつ広げた配列から、各画素の周囲8画素を (8, h, w, ...) で返す"""
+    return np.stack([padded[1 + dy:1 + dy + h, 1 + dx:1 + dx + w] for dy, dx in _NEIGHBOURS])
+
+
+def _sibling_counts(padded: np.ndarray, h: int, w: int) -> np.ndarray:
+    """各画素と同じ色の隣接画素の数"""
+    center = padded[1:1 + h, 1:1 + w]
+    return (_neighbours(padded, h, w) == center).all(axis=-1).sum(axis=0)
+
+
+def _antialiased(own: np.ndarray, other: np.ndarray, h: int, w: int) -> np.ndarray:
+    """own の各画素がアンチエイリアスされたエッジか (pixelmatch の判定)
+
+    `own` / `other` は上下左右に2画素ずつ広げた配列。同じ輝度の隣接画素が2つ以下で、
+    より暗い・明るい隣接画素が両方あり、最も暗いか最も明るい隣接画素が両方の画像で
+    平坦な領域 (同じ色の隣接画素が3つ以上) にあるものをアンチエイリアスとみなす。
+    """
+    luma = own[1:h + 3, 1:w + 3] @ _LUMA
+    delta = _neighbours(luma, h, w) - luma[1:h + 1, 1:w + 1]
+    edge = ((delta == 0).sum(axis=0) <= 2) & (delta.min(axis=0) < 0) & (delta.max(axis=0) > 0)
+    flat = (_neighbours(_sibling_counts(own, h + 2, w + 2), h, w) >= 3) & (
+        _neighbours(_sibling_counts(other, h + 2, w + 2), h, w) >= 3
+    )
+    darkest = np.take_along_axis(flat, delta.argmin(axis=0)[None], axis=0)[0]
+    brightest = np.take_along_axis(flat, delta.argmax(axis=0)[None], axis=0)[0]
+    return edge & (darkest | brightest)
+
+
+def _with_border(image: np.ndarray, y: int, x: int, h: int, w: int, border: int = 2) -> np.ndarray:
+    """タイルを上下左右 border 画素ずつ広げて切り出す (画像端は端の画素を複製)"""
+    y0, y1 = max(0, y - border), min(image.shape[0], y + h + border)
+    x0, x1 = max(0, x - border), min(image.shape[1], x + w + border)
+    padding = ((border - (y - y0), border - (y1 - y - h)), (border - (x - x0), border - (x1 - x - w)), (0, 0))
+    return np.pad(image[y0:y1, x0:x1].astype(np.int32), padding, mode="edge")
+
+
+def _diff_region(
+    baseline: np.ndarray, capture: np.ndarray, y: int, x: int, h: int, w: int, options: CompareOptions
+) -> tuple[np.ndarray, np.ndarray]:
+    """タイル内の (差分画素, アンチエイリアスとみなした画素) のマスクを返す"""
+    a = baseline[y:y + h, x:x + w].astype(np.int16)
+    b = capture[y:y + h, x:x + w].astype(np.int16)
+    diff = np.abs(a - b).max(axis=2) > options.tolerance
+    antialiased = np.zeros_like(diff)
+    if options.antialias and diff.any():
+        pad_a = _with_border(baseline, y, x, h, w)
+        pad_b = _with_border(capture, y, x, h, w)
+        antialiased = diff & (_antialiased(pad_a, pad_b, h, w) | _antialiased(pad_b, pad_a, h, w))
+        diff = diff & ~antialiased
+    return diff, antialiased
+
+
+def compare_images(
+    baseline_path: str | Path,
+    capture_path: str | Path,
+    diff_path: str | Path | None = None,
+    options: CompareOptions | None = None,
+) -> CompareResult:
+    """ベースラインと撮影結果を比較し、差分画像 (任意) と集計結果を返す"""
+    options = options or CompareOptions()
+    baseline = _load_rgb(baseline_path)
+    capture = _load_rgb(capture_path)
+    height = max(baseline.shape[0], capture.shape[0])
+    width = max(baseline.shape[1], capture.shape[1])
+    size_mismatch = baseline.shape != capture.shape
+    if size_mismatch:
+        # 小さい方を白で埋めて同じサイズにし、はみ出した部分は差分として扱う
+        baseline = np.pad(
+            baseline, ((0, height - baseline.shape[0]), (0, width - baseline.shape[1]), (0, 0)), constant_values=255
+        )
+        capture = np.pad(
+            capture, ((0, height - capture.shape[0]), (0, width - capture.shape[1]), (0, 0)), constant_values=255
+        )
+
+    diff_mask = np.zeros((height, width), dtype=bool)
+    antialias_mask = np.zeros((height, width), dtype=bool)
+    tile = options.tile_size
+    tiles_total = tiles_identical = 0
+    changed_tiles: list[tuple[int, int, int, int]] = []
+    for y in range(0, height, tile):
+        for x in range(0, width, tile):
+            h, w = min(tile, height - y), min(tile, width - x)
+            tiles_total += 1
+            if np.array_equal(baseline[y:y + h, x:x + w], capture[y:y + h, x:x + w]):
+                tiles_identical += 1
+                continue
+            diff, antialiased = _diff_region(baseline, capture, y, x, h, w, options)
+            diff_mask[y:y + h, x:x + w] = diff
+            antialias_mask[y:y + h, x:x + w] = antialiased
+            if diff.any():
+                changed_tiles.append((x, y, w, h))
+
+    diff_pixels = int(diff_mask.sum())
+    diff_ratio = diff_pixels / (width * height) if width and height else 0.0
+    result = CompareResult(
+        baseline=str(baseline_path),
+        capture=str(capture_path),
+        width=width,
+        height=height,
+        diff_pixels=diff_pixels,
+        antialiased_pixels=int(antialias_mask.sum()),
+        tiles_total=tiles_total,
+        tiles_identical=tiles_identical,
+        diff_ratio=diff_ratio,
+        passed=not size_mismatch and diff_ratio <= options.max_diff_ratio,
+        size_mismatch=size_mismatch,
+        changed_tiles=changed_tiles,
+    )
+    if diff_path is not None and not result.passed:
+        write_diff_image(baseline, diff_mask, antialias_mask, diff_path)
+        result.diff_image = str(diff_path)
+    return result
+
+
+def write_diff_image(
+    baseline: np.ndarray, diff_mask: np.ndarray, antialias_mask: np.ndarray, path: str | Path
+) -> None:
+    """ベースラインを薄いグレーで描き、差分を赤、アンチエイリアスを黄で塗った画像を保存"""
+    gray = baseline.mean(axis=2, keepdims=True)
+    out = (255 - (255 - gray) * _FADE).repeat(3, axis=2).astype(np.uint8)
+    out[antialias_mask] = _ANTIALIAS_COLOR
+    out[diff_mask] = _DIFF_COLOR
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    Image.fromarray(out).save(path)
+
+
+def _compare_pair(args: tuple[Path, Path, Path | None, CompareOptions]) -> CompareResult:
+    baseline, capture, diff, options = args
+    try:
+        return compare_images(baseline, capture, diff, options)
+    except (OSError, ValueError) as e:
+        return CompareResult(str(baseline), str(capture), 0, 0, 0, 0, 0, 0, 1.0, passed=False, error=str(e))
+
+
+def _image_files(directory: Path) -> set[Path]:
+    return {p.relative_to(directory) for p in directory.rglob("*") if p.suffix.lower() in IMAGE_SUFFIXES}
+
+
+@dataclass
+class DirectoryCompareResult:
+    results: list[CompareResult]
+    missing: list[str]
+    added: list[str]
+
+    @property
+    def passed(self) -> bool:
+        return not self.missing and all(r.passed for r in self.results)
+
+    def to_dict(self) -> dict:
+        return {
+            "passed": self.passed,
+            "compared": len(self.results),
+            "failed": sum(1 for r in self.results if not r.passed),
+            "missing": self.missing,
+            "added": self.added,
+            "results": [asdict(r) for r in self.results],
+        }
+
+
+def compare_directories(
+    baseline_dir: str | Path,
+    capture_dir: str | Path,
+    diff_dir: str | Path | None = None,
+    options: CompareOptions | None = None,
+    workers: int | None = None,
+) -> DirectoryCompareResult:
+    """同じ相対パスの画像どうしを全コアで並列に比較する
+
+    ベースラインにしかない画像は missing、撮影結果にしかない画像は added として報告する。
+    """
+    options = options or CompareOptions()
+    baseline_dir, capture_dir = Path(baseline_dir), Path(capture_dir)
+    baseline_files = _image_files(baseline_dir)
+    capture_files = _image_files(capture_dir)
+    common = sorted(baseline_files & capture_files)
+    jobs = [
+        (
+            baseline_dir / rel,
+            capture_dir / rel,
+            Path(diff_dir) / rel.with_suffix(".png") if diff_dir else None,
+            options,
+        )
+        for rel in common
+    ]
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        results = list(pool.map(_compare_pair, jobs, chunksize=max(1, len(jobs) // (4 * (os.cpu_count() or 1)))))
+    return DirectoryCompareResult(
+        results=results,
+        missing=[str(p) for p in sorted(baseline_files - capture_files)],
+        added=[str(p) for p in sorted(capture_files - baseline_files)],
+    )
+
+
+def write_summary(summary: dict, path: str | Path) -> None:
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    Path(path).write_text(json.dumps(summary, indent=2, ensure_ascii=False))
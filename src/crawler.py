@@ -0,0 +1,328 @@
+"""同一オリジンのページを辿って撮影するクロールモード
+
+開始 URL (と任意で sitemap.xml) から同一オリジンのリンクを辿り、正規化して重複を除いた
+各ページを1回ずつ撮影する。1つのブラウザ・コンテキスト上の固定数のページを使い回し、
+深さとページ数に上限がある。未処理の URL (フロンティア) はファイルに保存するため、
+中断しても同じファイルを指定すれば続きから再開できる。
+"""
+import asyncio
+import hashlib
+import json
+import os
+import posixpath
+import re
+import time
+import xml.etree.ElementTree as ET
+from dataclasses import dataclass, field
+from fnmatch import fnmatch
+from pathlib import Path
+from typing import Callable
+from urllib.parse import urlparse
+
+from playwright.async_api import BrowserContext, Error as PlaywrightError, Page
+
+from .batch import CaptureItem, CaptureResult
+from .browser_launcher import BrowserLauncher, LoginForm
+from .urls import DEFAULT_DROP_PARAMS, DEFAULT_EXCLUDE, canonicalize_url, origin_of
+
+# HTML 以外と分かるリンク
+_SKIP_EXTENSIONS = {
+    ".pdf", ".zip", ".gz", ".png", ".jpg", ".jpeg", ".gif", ".webp", ".svg", ".ico",
+    ".css", ".js", ".json", ".xml", ".csv", ".xlsx", ".docx", ".mp4", ".mp3", ".woff", ".woff2",
+}
+_UNSAFE_CHARS = re.compile(r"[^\w.-]")
+_LINKS_SCRIPT = "() => Array.from(document.querySelectorAll('a[href]'), (a) => a.href)"
+_SITEMAP_NS = "{http://www.sitemaps.org/schemas/sitemap/0.9}"
+
+
+@dataclass
+class CrawlOptions:
+    max_depth: int = 3
+    max_pages: int = 500
+    concurrency: int = 4
+    sitemap: bool = False
+    drop_params: tuple[str, ...] = DEFAULT_DROP_PARAMS
+    ignore_query: bool = False
+    exclude: tuple[str, ...] = DEFAULT_EXCLUDE
+    full_page: bool = False
+
+
+def output_path_for(url: str, directory: str | Path, suffix: str = ".png") -> Path:
+    """`https://host/a/b?x=1` -> `DIR/a/b_<hash>.png`、`/` -> `DIR/index.png`"""
+    parsed = urlparse(url)
+    parts = [_UNSAFE_CHARS.sub("_", part) for part in parsed.path.split("/") if part]
+    if not parts or parsed.path.endswith("/"):
+        parts.append("index")
+    name = "/".join(parts)
+    if parsed.query:
+        name += "_" + hashlib.sha1(parsed.query.encode()).hexdigest()[:8]
+    return Path(directory) / f"{name}{suffix}"
+
+
+@dataclass
+class Frontier:
+    """クロールの状態 (未処理の URL と深さ、処理済み・失敗した URL)"""
+
+    origin: str
+    queued: list[tuple[str, int]] = field(default_factory=list)
+    done: list[str] = field(default_factory=list)
+    failed: list[str] = field(default_factory=list)
+
+    def __post_init__(self) -> None:
+        self._seen = {url for url, _ in self.queued} | set(self.done) | set(self.failed)
+
+    def seen(self, url: str) -> bool:
+        return url in self._seen
+
+    def add(self, url: str, depth: int) -> bool:
+        if url in self._seen:
+            return False
+        self._seen.add(url)
+        self.queued.append((url, depth))
+        return True
+
+    def mark(self, url: str, ok: bool) -> None:
+        self._seen.add(url)
+        self.queued = [(u, d) for u, d in self.queued if u != url]
+        (self.done if ok else self.failed).append(url)
+
+    def to_dict(self) -> dict:
+        return {"origin": self.origin, "queued": self.queued, "done": self.done, "failed": self.failed}
+
+    def save(self, path: str | Path) -> None:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(self.to_dict(), ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str | Path) -> "Frontier":
+        data = json.loads(Path(path).read_text(encoding="utf-8"))
+        return cls(
+            data["origin"],
+            [(url, depth) for url, depth in data["queued"]],
+            list(data["done"]),
+            list(data["failed"]),
+        )
+
+
+@dataclass
+class CrawlReport:
+    results: list[CaptureResult]
+    skipped: int
+    remaining: int
+    elapsed: float
+
+    @property
+    def failed(self) -> int:
+        return sum(1 for r in self.results if not r.ok)
+
+    def summary(self) -> str:
+        return (
+            f"{len(self.results) - self.failed} captured, {self.failed} failed, {self.skipped} skipped, "
+            f"{self.remaining} remaining ({self.elapsed:.1f}s)"
+        )
+
+
+def parse_sitemap(xml: str | bytes) -> tuple[list[str], list[str]]:
+    """sitemap.xml を解析して (ページの URL, 入れ子のサイトマップの URL) を返す"""
+    try:
+        root = ET.fromstring(xml)
+    except ET.ParseError:
+        return [], []
+    locs = [loc.text.strip() for loc in root.iter(f"{_SITEMAP_NS}loc") if loc.text]
+    if root.tag == f"{_SITEMAP_NS}sitemapindex":
+        return [], locs
+    return locs, []
+
+
+async def fetch_sitemap(context: BrowserContext, origin: str, limit: int = 10) -> list[str]:
+    """`/sitemap.xml` (とそこから参照されるサイトマップ) のページ URL を取得する
+
+    コンテキストの Cookie / Basic 認証を使って取得する。取得できなければ空リスト。
+    """
+    pending = [f"{origin}/sitemap.xml"]
+    urls: list[str] = []
+    fetched = 0
+    while pending and fetched < limit:
+        fetched += 1
+        try:
+            response = await context.request.get(pending.pop(0))
+            if not response.ok:
+                continue
+            pages, nested = parse_sitemap(await response.body())
+        except PlaywrightError:
+            continue
+        urls.extend(pages)
+        pending.extend(url for url in nested if origin_of(url) == origin)
+    return urls
+
+
+class Crawler:
+    def __init__(
+        self,
+        launcher: BrowserLauncher,
+        start_url: str,
+        output_dir: str | Path,
+        options: CrawlOptions | None = None,
+        frontier_path: str | Path | None = None,
+        login: LoginForm | None = None,
+        on_result: Callable[[CaptureResult], None] | None = None,
+    ):
+        self.launcher = launcher
+        self.options = options or CrawlOptions()
+        self.output_dir = Path(output_dir)
+        self.frontier_path = Path(frontier_path) if frontier_path else self.output_dir / "frontier.json"
+        self.login = login
+        self.on_result = on_result
+        self.start_url = self.canonicalize(start_url)
+        if self.start_url is None:
+            raise ValueError(f"Invalid start URL: {start_url!r}")
+        self.origin = origin_of(self.start_url)
+        self.frontier = self._load_frontier()
+        self.resumed = bool(self.frontier.done or self.frontier.failed)
+        self.results: list[CaptureResult] = []
+        self.skipped = 0
+
+    def canonicalize(self, url: str, base: str | None = None) -> str | None:
+        return canonicalize_url(url, base, self.options.drop_params, self.options.ignore_query)
+
+    def _load_frontier(self) -> Frontier:
+        if self.frontier_path.exists():
+            try:
+                frontier = Frontier.load(self.frontier_path)
+            except (OSError, ValueError, KeyError, TypeError):
+                frontier = None
+            if frontier and frontier.origin == self.origin and (frontier.queued or frontier.done):
+                return frontier
+        frontier = Frontier(self.origin)
+        frontier.add(self.start_url, 0)
+        return frontier
+
+    def accepts(self, url: str) -> bool:
+        """同一オリジンで、除外パターン・HTML 以外の拡張子に当たらない URL か"""
+        if origin_of(url) != self.origin:
+            return False
+        path = urlparse(url).path
+        if posixpath.splitext(path)[1].lower() in _SKIP_EXTENSIONS:
+            return False
+        return not any(fnmatch(url, pattern) or fnmatch(path, pattern) for pattern in self.options.exclude)
+
+    def enqueue(self, links: list[str], base: str, depth: int) -> None:
+        if depth > self.options.max_depth:
+            return
+        for link in links:
+            url = self.canonicalize(link, base)
+            if url and self.accepts(url):
+                self.frontier.add(url, depth)
+
+    def _save_frontier(self) -> None:
+        try:
+            self.frontier.save(self.frontier_path)
+        except OSError:
+            pass
+
+    def _budget_left(self, in_flight: set[str]) -> bool:
+        return len(self.frontier.done) + len(self.frontier.failed) + len(in_flight) < self.options.max_pages
+
+    async def _visit(self, page: Page, url: str, depth: int, first: bool = False) -> None:
+        item = CaptureItem(url, str(output_path_for(url, self.output_dir)), self.options.full_page)
+        start = time.monotonic()
+        launcher = self.launcher
+        try:
+            if first and self.login:
+                await launcher.open_authenticated(page, url, self.login)
+                response = None
+            elif first:
+                response = await launcher.navigate_with_session(page, url)
+            else:
+                response = await launcher.navigate(page, url)
+            content_type = response.headers.get("content-type", "") if response else "text/html"
+            final = self.canonicalize(page.url) or url
+            # HTML 以外、またはリダイレクト先が対象外・撮影済みの場合は撮影しない
+            redirected_away = final != url and (not self.accepts(final) or self.frontier.seen(final))
+            if "html" not in content_type or redirected_away:
+                self.skipped += 1
+                self.frontier.mark(url, ok=True)
+                return
+            if final != url:
+                self.frontier.mark(final, ok=True)
+            metrics = await launcher.collect_metrics(page, url)
+            if item.full_page:
+                await launcher.preload_lazy_content(page)
+            Path(item.output).parent.mkdir(parents=True, exist_ok=True)
+            await launcher.take_screenshot(page, item.output, full_page=item.full_page)
+            if depth < self.options.max_depth:
+                self.enqueue(await page.evaluate(_LINKS_SCRIPT), page.url, depth + 1)
+        except (PlaywrightError, OSError) as e:
+            result = CaptureResult(item, ok=False, error=str(e), elapsed=time.monotonic() - start)
+        else:
+            result = CaptureResult(
+                item, ok=True, elapsed=time.monotonic() - start, path=item.output, metrics=metrics
+            )
+        self.frontier.mark(url, result.ok)
+        self.results.append(result)
+        if self.on_result:
+            self.on_result(result)
+        self._save_frontier()
+
+    async def run(self) -> CrawlReport:
+        start = time.monotonic()
+        launcher = self.launcher
+        async with launcher.launch_browser() as browser:
+            context = await launcher.new_context(browser)
+            try:
+                if self.options.sitemap:
+                    self.enqueue(await fetch_sitemap(context, self.origin), self.origin, 0)
+
+                # 最初のページでセッションを確認 (必要ならログイン) してから並行に辿る
+                # (中断したクロールの再開時も、保存済みのセッションが切れている場合があるので確認する)
+                if self.frontier.queued and self._budget_left(set()):
+                    page = await context.new_page()
+                    try:
+                        url, depth = self.frontier.queued[0]
+                        await self._visit(page, url, depth, first=True)
+                        await launcher.save_storage_state(page)
+                    finally:
+                        await page.close()
+
+                in_flight: set[str] = set()
+                wakeup = asyncio.Event()
+
+                def next_url() -> tuple[str, int] | None:
+                    for url, depth in self.frontier.queued:
+                        if url not in in_flight:
+                            return url, depth
+                    return None
+
+                async def worker() -> None:
+                    page = await context.new_page()
+                    try:
+                        while True:
+                            pending = next_url() if self._budget_left(in_flight) else None
+                            if pending is None:
+                                if not in_flight:
+                                    wakeup.set()
+                                    return
+                                wakeup.clear()
+                                await wakeup.wait()
+                                continue
+                            url, depth = pending
+                            in_flight.add(url)
+                            try:
+                                if page.is_closed():
+                                    page = await context.new_page()
+                                await self._visit(page, url, depth)
+                            finally:
+                                in_flight.discard(url)
+                                wakeup.set()
+                    finally:
+                        if not page.is_closed():
+                            await page.close()
+
+                await asyncio.gather(*(worker() for _ in range(max(1, self.options.concurrency))))
+            finally:
+                self._save_frontier()
+                await launcher.close_context(context)
+        return CrawlReport(self.results, self.skipped, len(self.frontier.queued), time.monotonic() - start)
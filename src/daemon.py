@@ -0,0 +1,229 @@
+"""常駐ブラウザデーモン
+
+起動済みの Chromium を保持し、Unix ソケット経由で撮影ジョブを受け付ける。
+プロトコルは1行1メッセージの JSON (リクエスト1行に対しレスポンス1行)。
+ジョブごとに新しいコンテキストを作成するため、Cookie などはジョブ間で共有されない。
+"""
+import asyncio
+import base64
+import json
+import os
+import signal
+import tempfile
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+
+from playwright.async_api import Browser
+
+from .browser_launcher import BrowserLauncher, LoginForm
+from .encoder import EncodeOptions, encode_and_write
+from .lazyload import PreloadOptions
+from .readiness import ReadinessOptions
+
+SOCKET_ENV = "VIRTUAL_RESOLUTION_SOCKET"
+# 1行 (1メッセージ) の上限。撮影結果を base64 で返すため、StreamReader の既定 (64 KiB) では足りない
+MAX_MESSAGE_BYTES = 512 * 1024 * 1024
+
+
+class DaemonUnavailable(ConnectionError):
+    """デーモンが起動していない、または接続できない"""
+
+
+def default_socket_path() -> Path:
+    if env := os.environ.get(SOCKET_ENV):
+        return Path(env)
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR") or tempfile.gettempdir()
+    return Path(runtime_dir) / f"virtual-resolution-{os.getuid()}.sock"
+
+
+@dataclass
+class CaptureJob:
+    url: str
+    output: str | None = None
+    full_page: bool = False
+    http_credentials: dict[str, str] | None = None
+    login: LoginForm | None = None
+    storage_state: str | None = None
+    readiness: ReadinessOptions | None = None
+    encode: EncodeOptions | None = None
+    return_bytes: bool = False
+    preload: PreloadOptions | None = None
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "CaptureJob":
+        data = dict(data)
+        if data.get("login"):
+            data["login"] = LoginForm(**data["login"])
+        if data.get("readiness"):
+            data["readiness"] = ReadinessOptions(**data["readiness"])
+        if data.get("encode"):
+            data["encode"] = EncodeOptions(**data["encode"])
+        if data.get("preload"):
+            data["preload"] = PreloadOptions(**data["preload"])
+        return cls(**data)
+
+
+@dataclass
+class JobResult:
+    ok: bool
+    path: str | None = None
+    data: bytes | None = field(default=None, repr=False)
+    error: str | None = None
+    elapsed: float = 0.0
+
+
+class CaptureDaemon:
+    def __init__(self, launcher: BrowserLauncher, socket_path: Path | None = None, max_jobs: int = 4):
+        self.launcher = launcher
+        self.socket_path = socket_path or default_socket_path()
+        self._semaphore = asyncio.Semaphore(max_jobs)
+        self._stop = asyncio.Event()
+        self._browser: Browser | None = None
+
+    async def serve(self) -> None:
+        """ブラウザを起動してジョブを受け付ける (shutdown 要求またはシグナルまで)"""
+        if self.socket_path.exists():
+            if await is_daemon_running(self.socket_path):
+                raise RuntimeError(f"Daemon already running: {self.socket_path}")
+            self.socket_path.unlink()
+
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, self._stop.set)
+
+        async with self.launcher.launch_browser() as browser:
+            self._browser = browser
+            server = await asyncio.start_unix_server(
+                self._handle_client, path=str(self.socket_path), limit=MAX_MESSAGE_BYTES
+            )
+            os.chmod(self.socket_path, 0o600)
+            print(f"Daemon listening on: {self.socket_path}")
+            try:
+                async with server:
+                    await self._stop.wait()
+            finally:
+                self._browser = None
+                self.socket_path.unlink(missing_ok=True)
+                for sig in (signal.SIGINT, signal.SIGTERM):
+                    loop.remove_signal_handler(sig)
+
+    async def _handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while line := await reader.readline():
+                response = await self._dispatch(json.loads(line))
+                writer.write(json.dumps(response).encode() + b"\n")
+                await writer.drain()
+        except (ConnectionError, ValueError):
+            # 切断・不正な JSON・上限を超えたメッセージ
+            pass
+        finally:
+            writer.close()
+
+    async def _dispatch(self, message: dict) -> dict:
+        command = message.get("cmd", "capture")
+        if command == "ping":
+            return {"ok": True}
+        if command == "shutdown":
+            self._stop.set()
+            return {"ok": True}
+        if command != "capture":
+            return {"ok": False, "error": f"unknown command: {command}"}
+        try:
+            job = CaptureJob.from_dict(message.get("job", {}))
+        except TypeError as e:
+            return {"ok": False, "error": f"invalid job: {e}"}
+        async with self._semaphore:
+            result = await self.run_job(job)
+        response = {"ok": result.ok, "path": result.path, "error": result.error, "elapsed": result.elapsed}
+        if result.data is not None:
+            response["data"] = base64.b64encode(result.data).decode("ascii")
+        return response
+
+    async def run_job(self, job: CaptureJob) -> JobResult:
+        assert self._browser is not None
+        start = time.monotonic()
+        storage_state = job.storage_state if job.storage_state and Path(job.storage_state).exists() else None
+        context = await self.launcher.new_context(
+            self._browser, http_credentials=job.http_credentials, storage_state=storage_state
+        )
+        try:
+            page = await context.new_page()
+            if job.login:
+                await self.launcher.open_authenticated(page, job.url, job.login, job.storage_state, job.readiness)
+            else:
+                await self.launcher.navigate_with_session(page, job.url, job.readiness)
+                if job.storage_state:
+                    await self.launcher.save_storage_state(page, job.storage_state)
+            if job.full_page:
+                await self.launcher.preload_lazy_content(page, job.preload)
+            data = None
+            path = job.output
+            if job.output and (job.encode is None or job.encode.passthrough) and not job.return_bytes:
+                Path(job.output).parent.mkdir(parents=True, exist_ok=True)
+                await self.launcher.take_screenshot(page, job.output, full_page=job.full_page)
+            elif job.output or job.return_bytes:
+                # 保存と返送の両方が必要でも撮影は1回にする
+                raw = await self.launcher.capture(page, full_page=job.full_page)
+                if job.output:
+                    encode = job.encode or EncodeOptions()
+                    output = encode.output_path(job.output)
+                    await asyncio.to_thread(encode_and_write, raw, output, encode)
+                    path = str(output)
+                if job.return_bytes:
+                    data = raw
+        except Exception as e:
+            # 接続を切るとクライアントはデーモン未起動とみなしてローカルで撮影し直すため、失敗として返す
+            return JobResult(ok=False, error=str(e), elapsed=time.monotonic() - start)
+        finally:
+            await context.close()
+        return JobResult(ok=True, path=path, data=data, elapsed=time.monotonic() - start)
+
+
+async def _send(message: dict, socket_path: Path | None = None) -> dict:
+    path = socket_path or default_socket_path()
+    try:
+        reader, writer = await asyncio.open_unix_connection(str(path), limit=MAX_MESSAGE_BYTES)
+    except (FileNotFoundError, ConnectionRefusedError) as e:
+        raise DaemonUnavailable(f"Daemon not running: {path}") from e
+    try:
+        writer.write(json.dumps(message).encode() + b"\n")
+        await writer.drain()
+        line = await reader.readline()
+    finally:
+        writer.close()
+    if not line:
+        raise DaemonUnavailable(f"Daemon closed connection: {path}")
+    return json.loads(line)
+
+
+async def is_daemon_running(socket_path: Path | None = None) -> bool:
+    try:
+        await _send({"cmd": "ping"}, socket_path)
+    except DaemonUnavailable:
+        return False
+    return True
+
+
+async def request_capture(job: CaptureJob, socket_path: Path | None = None) -> JobResult:
+    """デーモンに撮影ジョブを送信する (未起動時は DaemonUnavailable)"""
+    if job.output:
+        job.output = str(Path(job.output).resolve())
+    if job.storage_state:
+        job.storage_state = str(Path(job.storage_state).resolve())
+    response = await _send({"cmd": "capture", "job": job.to_dict()}, socket_path)
+    data = base64.b64decode(response["data"]) if response.get("data") else None
+    return JobResult(
+        ok=response["ok"],
+        path=response.get("path"),
+        data=data,
+        error=response.get("error"),
+        elapsed=response.get("elapsed", 0.0),
+    )
+
+
+async def shutdown_daemon(socket_path: Path | None = None) -> None:
+    await _send({"cmd": "shutdown"}, socket_path)
@@ -0,0 +1,179 @@
+"""スクリーンショットのエンコード・書き込みをイベントループ外で行うパイプライン
+
+ブラウザからは PNG のバイト列だけを受け取り、再エンコード (PNG 圧縮レベル /
+JPEG / WebP / 縮小) とディスク書き込みはスレッドまたはプロセスプールで実行する。
+その間にブラウザは次の撮影へ進める。再エンコードには Pillow が必要
+(`uv sync --extra image`)。PNG をそのまま書き込む場合は不要。
+"""
+import asyncio
+import io
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+
+from .profiling import Profiler
+
+FORMATS = {"png": ".png", "jpeg": ".jpg", "webp": ".webp"}
+_SUFFIXES = {".png": "png", ".jpg": "jpeg", ".jpeg": "jpeg", ".webp": "webp"}
+
+
+@dataclass
+class EncodeOptions:
+    format: str = "png"
+    quality: int = 90
+    compress_level: int | None = None
+    scale: float = 1.0
+
+    def __post_init__(self) -> None:
+        if self.format not in FORMATS:
+            raise ValueError(f"Unsupported format: {self.format} (choose from {', '.join(FORMATS)})")
+        if not 0 < self.scale <= 1.0:
+            raise ValueError(f"scale must be in (0, 1]: {self.scale}")
+
+    @property
+    def passthrough(self) -> bool:
+        """ブラウザの PNG をそのまま書き込めるか"""
+        return self.format == "png" and self.compress_level is None and self.scale == 1.0
+
+    def output_path(self, path: str | Path) -> Path:
+        """出力形式に合わせて拡張子を補正する (.png 指定で JPEG 出力など)"""
+        path = Path(path)
+        if _SUFFIXES.get(path.suffix.lower()) == self.format:
+            return path
+        return path.with_suffix(FORMATS[self.format])
+
+
+def encode_image(data: bytes, options: EncodeOptions) -> bytes:
+    if options.passthrough:
+        return data
+    try:
+        from PIL import Image
+    except ImportError as e:
+        raise RuntimeError("Re-encoding screenshots requires Pillow: uv sync --extra image") from e
+
+    with Image.open(io.BytesIO(data)) as image:
+        if options.scale != 1.0:
+            size = (max(1, round(image.width * options.scale)), max(1, round(image.height * options.scale)))
+            image = image.resize(size, Image.Resampling.LANCZOS)
+        out = io.BytesIO()
+        if options.format == "png":
+            level = 6 if options.compress_level is None else options.compress_level
+            image.save(out, "PNG", compress_level=level)
+        elif options.format == "jpeg":
+            image.convert("RGB").save(out, "JPEG", quality=options.quality, optimize=True)
+        else:
+            image.save(out, "WEBP", quality=options.quality, method=4)
+        return out.getvalue()
+
+
+def encode_and_write(data: bytes, path: Path, options: EncodeOptions) -> tuple[int, float]:
+    """エンコードして書き込み、(書き込んだバイト数, 所要秒数) を返す (ワーカー内で実行)"""
+    start = time.perf_counter()
+    encoded = encode_image(data, options)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(encoded)
+    return len(encoded), time.perf_counter() - start
+
+
+@dataclass
+class EncoderStats:
+    images: int = 0
+    failures: int = 0
+    bytes_in: int = 0
+    bytes_out: int = 0
+    busy_seconds: float = 0.0
+    wall_seconds: float = 0.0
+
+    @property
+    def images_per_second(self) -> float:
+        return self.images / self.wall_seconds if self.wall_seconds else 0.0
+
+    @property
+    def megabytes_per_second(self) -> float:
+        return self.bytes_in / 1_000_000 / self.wall_seconds if self.wall_seconds else 0.0
+
+    def summary(self) -> str:
+        return (
+            f"{self.images} images, {self.bytes_in / 1_000_000:.1f}MB -> {self.bytes_out / 1_000_000:.1f}MB, "
+            f"{self.images_per_second:.1f} img/s, {self.megabytes_per_second:.1f}MB/s"
+            + (f", {self.failures} failed" if self.failures else "")
+        )
+
+
+class ImageEncoder:
+    """撮影済みのバイト列をバックグラウンドでエンコード・書き込みする
+
+    `max_pending` 件を超えて未処理の画像が溜まると `submit` が待機する (メモリ上限)。
+    """
+
+    def __init__(
+        self,
+        options: EncodeOptions | None = None,
+        workers: int | None = None,
+        processes: bool = False,
+        max_pending: int = 16,
+        profiler: Profiler | None = None,
+    ):
+        self.options = options or EncodeOptions()
+        self.profiler = profiler or Profiler(enabled=False)
+        self.stats = EncoderStats()
+        self._executor: Executor = (
+            ProcessPoolExecutor(max_workers=workers) if processes else ThreadPoolExecutor(max_workers=workers)
+        )
+        self._slots = asyncio.Semaphore(max_pending)
+        self._pending: set[asyncio.Future] = set()
+        self._started: float | None = None
+        self._last_done: float | None = None
+
+    async def submit(self, data: bytes, path: str | Path) -> "asyncio.Future[Path]":
+        """エンコードを予約し、書き込み完了時に出力パスを返す Future を返す"""
+        await self._slots.acquire()
+        if self._started is None:
+            self._started = time.perf_counter()
+        output = self.options.output_path(path)
+        loop = asyncio.get_running_loop()
+        work = loop.run_in_executor(self._executor, encode_and_write, data, output, self.options)
+        future: asyncio.Future[Path] = loop.create_future()
+
+        def done(work: asyncio.Future) -> None:
+            self._slots.release()
+            self._pending.discard(future)
+            self._last_done = time.perf_counter()
+            if work.cancelled():
+                future.cancel()
+            elif (error := work.exception()) is not None:
+                self.stats.failures += 1
+                future.set_exception(error)
+            else:
+                written, seconds = work.result()
+                self.stats.images += 1
+                self.stats.bytes_in += len(data)
+                self.stats.bytes_out += written
+                self.stats.busy_seconds += seconds
+                self.profiler.record("encode_write", self._last_done - seconds, self._last_done, str(output))
+                future.set_result(output)
+            if self._started is not None:
+                self.stats.wall_seconds = self._last_done - self._started
+
+        work.add_done_callback(done)
+        self._pending.add(future)
+        return future
+
+    async def write(self, data: bytes, path: str | Path) -> Path:
+        return await (await self.submit(data, path))
+
+    async def drain(self) -> None:
+        """予約済みのエンコードがすべて終わるまで待つ"""
+        if self._pending:
+            await asyncio.gather(*self._pending, return_exceptions=True)
+
+    async def close(self) -> None:
+        await self.drain()
+        self._executor.shutdown(wait=True)
+
+    async def __aenter__(self) -> "ImageEncoder":
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.close()
@@ -0,0 +1,188 @@
+"""前回から変化のないページの撮影を省略する (差分撮影)
+
+URL ごとに、レスポンスの検証子 (ETag / Last-Modified) と描画後の DOM のハッシュを
+マニフェスト (JSON) に記録する。次回は
+1. HEAD リクエストの検証子が前回と同じなら、ページを開かずに省略し、
+2. そうでなければページを開いて DOM のハッシュを計算し、同じなら撮影せずに省略する。
+出力ファイルが無い・撮影条件が変わった場合は常に撮影する。
+"""
+import json
+import os
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+from playwright.async_api import BrowserContext, Error as PlaywrightError, Page
+
+from .batch import CaptureItem
+
+MANIFEST_NAME = ".capture-manifest.json"
+NOT_MODIFIED = "not-modified"
+DOM_UNCHANGED = "dom-unchanged"
+
+# スクリプト・nonce・hidden の値など、表示に関係なく読み込みごとに変わる部分を除いて
+# DOM をハッシュする (crypto.subtle は https でしか使えないため cyrb53 を2系統使う)
+_DOM_HASH_SCRIPT = """
+(mode) => {
+    let text;
+    if (mode === 'text') {
+        text = document.body ? document.body.innerText : '';
+    } else {
+        const root = document.documentElement.cloneNode(true);
+        root.querySelectorAll('script, noscript, template').forEach((el) => el.remove());
+        root.querySelectorAll('[nonce]').forEach((el) => el.removeAttribute('nonce'));
+        root.querySelectorAll('input[type=hidden]').forEach((el) => el.removeAttribute('value'));
+        text = root.outerHTML;
+    }
+    const scroller = document.scrollingElement || document.documentElement;
+    text += `|${window.innerWidth}x${window.innerHeight}|${scroller.scrollWidth}x${scroller.scrollHeight}`;
+    const cyrb53 = (str, seed) => {
+        let h1 = 0xdeadbeef ^ seed, h2 = 0x41c6ce57 ^ seed;
+        for (let i = 0; i < str.length; i++) {
+            const ch = str.charCodeAt(i);
+            h1 = Math.imul(h1 ^ ch, 2654435761);
+            h2 = Math.imul(h2 ^ ch, 1597334677);
+        }
+        h1 = Math.imul(h1 ^ (h1 >>> 16), 2246822507) ^ Math.imul(h2 ^ (h2 >>> 13), 3266489909);
+        h2 = Math.imul(h2 ^ (h2 >>> 16), 2246822507) ^ Math.imul(h1 ^ (h1 >>> 13), 3266489909);
+        return (4294967296 * (2097151 & h2) + (h1 >>> 0)).toString(16).padStart(14, '0');
+    };
+    return cyrb53(text, 0) + cyrb53(text, 0x9e3779b9);
+}
+"""
+
+
+@dataclass
+class CaptureRecord:
+    url: str
+    output: str
+    full_page: bool
+    etag: str | None = None
+    last_modified: str | None = None
+    dom_hash: str | None = None
+    captured_at: float = 0.0
+    elapsed: float = 0.0
+    capture_seconds: float = 0.0
+
+    @property
+    def validators(self) -> bool:
+        return bool(self.etag or self.last_modified)
+
+
+@dataclass
+class IncrementalStats:
+    not_modified: int = 0
+    dom_unchanged: int = 0
+    captured: int = 0
+    saved_seconds: float = 0.0
+
+    @property
+    def skipped(self) -> int:
+        return self.not_modified + self.dom_unchanged
+
+    def summary(self) -> str:
+        return (
+            f"{self.skipped} skipped ({self.not_modified} not modified, {self.dom_unchanged} unchanged DOM), "
+            f"{self.captured} captured, saved ~{self.saved_seconds:.1f}s"
+        )
+
+
+class IncrementalManifest:
+    """URL ごとの前回の撮影記録 (検証子と DOM のハッシュ)"""
+
+    def __init__(self, path: str | Path, hash_mode: str = "dom"):
+        if hash_mode not in ("dom", "text"):
+            raise ValueError(f"Unknown hash mode: {hash_mode!r} (expected dom or text)")
+        self.path = Path(path)
+        self.hash_mode = hash_mode
+        self.stats = IncrementalStats()
+        self.records: dict[str, CaptureRecord] = {}
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+            self.records = {url: CaptureRecord(**record) for url, record in data["records"].items()}
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+
+    @staticmethod
+    def default_path(items: list[CaptureItem]) -> Path:
+        """出力先に共通するディレクトリに置く"""
+        parents = [str(Path(item.output).resolve().parent) for item in items] or [os.getcwd()]
+        return Path(os.path.commonpath(parents)) / MANIFEST_NAME
+
+    def previous(self, item: CaptureItem, output: str | Path) -> CaptureRecord | None:
+        """撮影条件が同じで出力ファイルが残っている前回の記録"""
+        record = self.records.get(item.url)
+        if record is None or record.output != str(output) or record.full_page != item.full_page:
+            return None
+        return record if Path(output).exists() else None
+
+    async def not_modified(self, context: BrowserContext, record: CaptureRecord) -> bool:
+        """HEAD リクエストの ETag / Last-Modified が前回と同じか (判断できなければ False)"""
+        if not record.validators:
+            return False
+        try:
+            response = await context.request.head(record.url, fail_on_status_code=False)
+        except PlaywrightError:
+            return False
+        if response.status != 200:
+            return False
+        etag = response.headers.get("etag")
+        last_modified = response.headers.get("last-modified")
+        if record.etag and etag:
+            return etag == record.etag
+        return bool(record.last_modified and last_modified == record.last_modified)
+
+    async def dom_hash(self, page: Page) -> str:
+        return await page.evaluate(_DOM_HASH_SCRIPT, self.hash_mode)
+
+    def skip(
+        self, record: CaptureRecord, reason: str, elapsed: float, headers: dict[str, str] | None = None
+    ) -> float:
+        """省略を記録し、省略によって節約できた時間 (前回の所要時間との差) を返す
+
+        DOM が同じで省略した場合は、ページを開いたときの応答 `headers` の検証子で記録を更新する
+        (サーバーが ETag などを変えても、次回から HEAD リクエストで省略できるように)。
+        """
+        if reason == NOT_MODIFIED:
+            self.stats.not_modified += 1
+            saved = max(0.0, record.elapsed - elapsed)
+        else:
+            self.stats.dom_unchanged += 1
+            saved = record.capture_seconds
+            if headers is not None:
+                record.etag = headers.get("etag")
+                record.last_modified = headers.get("last-modified")
+        self.stats.saved_seconds += saved
+        return saved
+
+    def record(
+        self,
+        item: CaptureItem,
+        output: str | Path,
+        headers: dict[str, str],
+        dom_hash: str | None,
+        elapsed: float,
+        capture_seconds: float,
+    ) -> None:
+        self.stats.captured += 1
+        self.records[item.url] = CaptureRecord(
+            url=item.url,
+            output=str(output),
+            full_page=item.full_page,
+            etag=headers.get("etag"),
+            last_modified=headers.get("last-modified"),
+            dom_hash=dom_hash,
+            captured_at=time.time(),
+            elapsed=elapsed,
+            capture_seconds=capture_seconds,
+        )
+
+    def forget(self, url: str) -> None:
+        self.records.pop(url, None)
+
+    def save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(f".{self.path.name}.{os.getpid()}.tmp")
+        data = {"records": {url: asdict(record) for url, record in sorted(self.records.items())}}
+        tmp.write_text(json.dumps(data, ensure_ascii=False, indent=1), encoding="utf-8")
+        os.replace(tmp, self.path)
@@ -0,0 +1,43 @@
+"""ブラウザの起動・コンテキスト作成の設定 (起動プロファイル)
+
+`INTERACTIVE` は画面に表示して操作する従来の設定 (ウィンドウサイズの固定、リサイズ防止の
+初期化スクリプト、位置情報の許可)。`HEADLESS` は撮影だけを行う実行向けで、ヘッドレスで起動し
+(同梱の Chromium では chromium-headless-shell、`--chrome` では Chrome の新しいヘッドレスモード)、
+画面表示のための初期化スクリプトと権限を省く。
+
+バックグラウンドの通信・拡張機能・コンポーネントの更新・同期・タイマーの間引きなどを止めるフラグは
+Playwright が常に付けているため、ここでは Playwright の既定にないものだけを追加する。
+`--disable-features=` は Playwright の指定を上書きしてしまう (最後の指定だけが有効になる) ため使わない。
+"""
+from dataclasses import dataclass
+
+# Playwright の既定のフラグに含まれない、撮影に関係しない通信を止めるフラグ
+LOW_OVERHEAD_ARGS = (
+    # ネットワークエラーの報告 (Domain Reliability) の送信
+    "--disable-domain-reliability",
+)
+
+
+@dataclass(frozen=True)
+class LaunchProfile:
+    name: str
+    headless: bool
+    args: tuple[str, ...] = ()
+    # ウィンドウサイズをビューポートに合わせる (表示する場合のみ意味がある)
+    window_size: bool = True
+    # ウィンドウのリサイズでビューポートが変わらないようにする初期化スクリプト
+    resize_guard: bool = True
+    # 位置情報 (東京) を許可する
+    geolocation: bool = True
+
+
+INTERACTIVE = LaunchProfile("interactive", headless=False)
+HEADLESS = LaunchProfile(
+    "headless",
+    headless=True,
+    args=LOW_OVERHEAD_ARGS,
+    window_size=False,
+    resize_guard=False,
+    geolocation=False,
+)
+PROFILES = {profile.name: profile for profile in (INTERACTIVE, HEADLESS)}
@@ -0,0 +1,135 @@
+"""ページ全体の撮影前に遅延読み込みのコンテンツを読み込ませる
+
+`loading="lazy"` の画像や無限スクロールの続きは表示領域に入るまで読み込まれないため、
+そのままページ全体を撮影すると空白のまま写る。ここでは表示領域の高さずつスクロールし、
+各位置で新しく表示された画像の読み込みと、DOM の変更・リソース取得が落ち着くまでだけ待つ。
+最後に先頭へ戻してから撮影する。高さと時間には上限がある。
+"""
+import time
+from dataclasses import dataclass
+
+from playwright.async_api import Page
+
+_PRELOAD_SCRIPT = """
+async ({ maxHeight, timeoutMs, quietMs, stepTimeoutMs }) => {
+    const start = performance.now();
+    const scroller = document.scrollingElement || document.documentElement;
+    // リソースタイミングのバッファ上限 (既定 250 件) に影響されないよう、観測で数える
+    let resources = 0;
+    const counter = new PerformanceObserver((list) => { resources += list.getEntries().length; });
+    counter.observe({ type: 'resource' });
+    const sleep = (ms) => new Promise((r) => setTimeout(r, ms));
+    const frame = () => new Promise((r) => requestAnimationFrame(() => r()));
+
+    // DOM の変更とリソースの取得完了がどちらも quietMs の間発生しなくなるまで待つ
+    const settle = () => new Promise((resolve) => {
+        let timer = setTimeout(finish, quietMs);
+        const bump = () => {
+            clearTimeout(timer);
+            timer = setTimeout(finish, quietMs);
+        };
+        const mutations = new MutationObserver(bump);
+        // アニメーション・カルーセルの style / class の変更は数えない (readiness と同じ)
+        mutations.observe(document, {
+            subtree: true, childList: true, characterData: true, attributeFilter: ['src', 'srcset'],
+        });
+        const resources = new PerformanceObserver(bump);
+        resources.observe({ type: 'resource' });
+        function finish() {
+            mutations.disconnect();
+            resources.disconnect();
+            resolve();
+        }
+    });
+
+    // 表示領域内で読み込み中の画像を待つ
+    const visibleImages = () => Promise.all(Array.from(document.images).filter((img) => {
+        if (img.complete) return false;
+        const r = img.getBoundingClientRect();
+        return r.bottom > 0 && r.top < window.innerHeight;
+    }).map((img) => new Promise((r) => {
+        img.addEventListener('load', r, { once: true });
+        img.addEventListener('error', r, { once: true });
+    })));
+
+    const step = Math.max(1, window.innerHeight);
+    let y = window.scrollY;
+    let steps = 0;
+    let timedOut = false;
+    while (y + step < Math.min(scroller.scrollHeight, maxHeight)) {
+        if (performance.now() - start > timeoutMs) {
+            timedOut = true;
+            break;
+        }
+        y += step;
+        window.scrollTo({ top: y, behavior: 'instant' });
+        steps += 1;
+        await frame();
+        await Promise.race([Promise.all([visibleImages(), settle()]), sleep(stepTimeoutMs)]);
+    }
+    window.scrollTo({ top: 0, behavior: 'instant' });
+    await frame();
+    await frame();
+    resources += counter.takeRecords().length;
+    counter.disconnect();
+    return {
+        steps,
+        height: scroller.scrollHeight,
+        truncated: scroller.scrollHeight > maxHeight,
+        timedOut,
+        resources,
+    };
+}
+"""
+
+
+@dataclass
+class PreloadOptions:
+    max_height: int = 50000
+    timeout_ms: int = 20000
+    quiet_ms: int = 300
+    step_timeout_ms: int = 3000
+
+
+@dataclass
+class PreloadReport:
+    steps: int
+    height: int
+    resources: int
+    elapsed: float
+    truncated: bool = False
+    timed_out: bool = False
+
+    def summary(self) -> str:
+        notes = []
+        if self.truncated:
+            notes.append("height limit reached")
+        if self.timed_out:
+            notes.append("timed out")
+        return (
+            f"{self.steps} steps, {self.height}px, {self.resources} resources, {self.elapsed:.2f}s"
+            + (f" ({', '.join(notes)})" if notes else "")
+        )
+
+
+async def preload_lazy_content(page: Page, options: PreloadOptions | None = None) -> PreloadReport:
+    """表示領域の高さずつスクロールして遅延読み込みを発生させ、先頭に戻す"""
+    options = options or PreloadOptions()
+    start = time.monotonic()
+    result = await page.evaluate(
+        _PRELOAD_SCRIPT,
+        {
+            "maxHeight": options.max_height,
+            "timeoutMs": options.timeout_ms,
+            "quietMs": options.quiet_ms,
+            "stepTimeoutMs": options.step_timeout_ms,
+        },
+    )
+    return PreloadReport(
+        steps=result["steps"],
+        height=result["height"],
+        resources=result["resources"],
+        elapsed=time.monotonic() - start,
+        truncated=result["truncated"],
+        timed_out=result["timedOut"],
+    )
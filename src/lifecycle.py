@@ -0,0 +1,173 @@
+"""長時間のセッションでページ・コンテキスト・ブラウザを作り直してメモリの増加を抑える
+
+`BrowserLauncher.launch` のページとコンテキストは `async with` を抜けるまで使い続けるため、
+長いインタラクティブセッションや撮影を繰り返すスクリプトでは Chromium の RSS が増え続ける。
+`ManagedSession` は撮影回数とブラウザのプロセスツリーの RSS を監視し、設定した回数または
+メモリの上限 (ウォーターマーク) に達したら、ページ・コンテキスト・ブラウザのいずれかを作り直す。
+作り直したコンテキストには初期化スクリプト・認証情報と、直前の Cookie / localStorage を引き継ぎ、
+元の URL を開き直す。
+"""
+import time
+from collections.abc import Awaitable, Callable
+from contextlib import AsyncExitStack
+from dataclasses import dataclass
+
+from playwright.async_api import Browser, BrowserContext, Error as PlaywrightError, Page
+
+from .browser_launcher import BrowserLauncher
+from .procstat import process_tree_rss, rss_available
+from .recycle_policy import RecyclePolicy
+
+PAGE = "page"
+CONTEXT = "context"
+BROWSER = "browser"
+_MIB = 1024 * 1024
+
+
+@dataclass
+class RecycleEvent:
+    level: str
+    reason: str
+    rss_before: int
+    rss_after: int
+    elapsed: float
+
+    def summary(self) -> str:
+        return (
+            f"recycled {self.level} ({self.reason}): RSS {self.rss_before / _MIB:.0f} MiB"
+            f" -> {self.rss_after / _MIB:.0f} MiB in {self.elapsed:.1f}s"
+        )
+
+
+class ManagedSession:
+    """作り直しても常に使えるページ (`page`) を提供する (`async with` で起動・終了)
+
+    撮影のたびに `after_capture` を呼ぶと、条件を満たした場合にだけ作り直す。
+    作り直しで新しいページができるたびに `on_page` を呼ぶ (キー入力の再設定など)。
+    """
+
+    def __init__(
+        self,
+        launcher: BrowserLauncher,
+        policy: RecyclePolicy | None = None,
+        on_page: Callable[[Page], Awaitable[None]] | None = None,
+        on_recycle: Callable[[RecycleEvent], None] | None = None,
+        rss: Callable[[], int] = process_tree_rss,
+    ):
+        self.launcher = launcher
+        self.policy = policy or RecyclePolicy()
+        if self.policy.watches_memory and rss is process_tree_rss and not rss_available():
+            # RSS が常に 0 になり、ウォーターマークが働かない
+            raise ValueError("Memory watermarks require /proc to measure RSS (Linux only)")
+        self.on_page = on_page
+        self.on_recycle = on_recycle
+        self.rss = rss
+        self.events: list[RecycleEvent] = []
+        self._stack: AsyncExitStack | None = None
+        self._browser: Browser | None = None
+        self._context: BrowserContext | None = None
+        self._page: Page | None = None
+        self._counts = {PAGE: 0, CONTEXT: 0, BROWSER: 0}
+
+    @property
+    def page(self) -> Page:
+        assert self._page is not None, "session is not started"
+        return self._page
+
+    async def start(self) -> None:
+        await self._open_browser()
+        await self._open_context()
+
+    async def _open_browser(self) -> None:
+        self._stack = AsyncExitStack()
+        self._browser = await self._stack.enter_async_context(self.launcher.launch_browser())
+
+    async def _open_context(self, storage_state: dict | None = None) -> None:
+        # new_context が初期化スクリプト・認証情報・リクエストの横取りを適用する
+        self._context = await self.launcher.new_context(self._browser, storage_state=storage_state)
+        await self._open_page()
+
+    async def _open_page(self) -> None:
+        self._page = await self._context.new_page()
+        if self.on_page:
+            await self.on_page(self._page)
+
+    async def _close_context(self) -> None:
+        for page in self._context.pages:
+            self.launcher.retire_page(page)
+        await self.launcher.close_context(self._context)
+        self._context = None
+
+    def due(self) -> tuple[str, str] | None:
+        """作り直しが必要なら (対象, 理由)"""
+        policy = self.policy
+        rss_mb = self.rss() / _MIB if policy.watches_memory else 0.0
+        if policy.browser_watermark_mb and rss_mb >= policy.browser_watermark_mb:
+            return BROWSER, f"RSS {rss_mb:.0f} MiB >= {policy.browser_watermark_mb:.0f} MiB"
+        if policy.browser_captures and self._counts[BROWSER] >= policy.browser_captures:
+            return BROWSER, f"{self._counts[BROWSER]} captures"
+        if policy.context_watermark_mb and rss_mb >= policy.context_watermark_mb:
+            return CONTEXT, f"RSS {rss_mb:.0f} MiB >= {policy.context_watermark_mb:.0f} MiB"
+        if policy.context_captures and self._counts[CONTEXT] >= policy.context_captures:
+            return CONTEXT, f"{self._counts[CONTEXT]} captures"
+        if policy.page_captures and self._counts[PAGE] >= policy.page_captures:
+            return PAGE, f"{self._counts[PAGE]} captures"
+        return None
+
+    async def after_capture(self) -> RecycleEvent | None:
+        """撮影1回を数え、条件を満たしていれば作り直す"""
+        for level in self._counts:
+            self._counts[level] += 1
+        if (due := self.due()) is None:
+            return None
+        event = await self.recycle(*due)
+        watermark = self.policy.context_watermark_mb
+        if event.level == CONTEXT and watermark and event.rss_after / _MIB >= watermark:
+            # コンテキストを作り直しても下がらない場合はブラウザごと作り直す
+            event = await self.recycle(BROWSER, "RSS still above the context watermark")
+        return event
+
+    async def recycle(self, level: str, reason: str) -> RecycleEvent:
+        """ページ・コンテキスト・ブラウザのいずれかを作り直し、元の URL を開き直す"""
+        start = time.monotonic()
+        before = self.rss()
+        url = self._page.url if self._page and not self._page.is_closed() else None
+        if level == PAGE:
+            self.launcher.retire_page(self._page)
+            await self._page.close()
+            await self._open_page()
+        else:
+            try:
+                storage_state = await self._context.storage_state()
+            except PlaywrightError:
+                storage_state = None
+            await self._close_context()
+            if level == BROWSER:
+                await self._stack.aclose()
+                await self._open_browser()
+            await self._open_context(storage_state)
+        if url and url != "about:blank":
+            await self.launcher.navigate(self._page, url)
+        levels = list(self._counts)
+        for reset in levels[: levels.index(level) + 1]:
+            self._counts[reset] = 0
+        event = RecycleEvent(level, reason, before, self.rss(), time.monotonic() - start)
+        self.events.append(event)
+        if self.on_recycle:
+            self.on_recycle(event)
+        return event
+
+    async def close(self) -> None:
+        if self._context is not None:
+            await self.launcher.close_context(self._context)
+            self._context = None
+        if self._stack is not None:
+            await self._stack.aclose()
+            self._stack = None
+
+    async def __aenter__(self) -> "ManagedSession":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.close()
@@ -0,0 +1,105 @@
+"""複数のビューポート / デバイスピクセル比での撮影 (マトリクス撮影)"""
+import re
+from dataclasses import dataclass
+from pathlib import Path
+
+from playwright.async_api import BrowserContext, Error as PlaywrightError, Route
+
+from .asset_cache import MAX_ENTRY_BYTES, replayable_headers
+from .screen_detector import ScreenInfo
+
+EFFECTIVE = "effective"
+_SPEC_PATTERN = re.compile(r"^\s*(\d+)\s*x\s*(\d+)\s*(?:@\s*(\d+(?:\.\d+)?)x?)?\s*$")
+# コンテキスト間で使い回す静的リソース
+_SHARED_RESOURCE_TYPES = {"stylesheet", "script", "font", "image"}
+# メモリに保持するレスポンスの合計の上限
+DEFAULT_SHARED_BYTES = 256 * 1024 * 1024
+
+
+@dataclass(frozen=True)
+class ViewportVariant:
+    width: int
+    height: int
+    device_scale_factor: float = 1.0
+
+    @property
+    def viewport(self) -> dict[str, int]:
+        return {"width": self.width, "height": self.height}
+
+    @property
+    def label(self) -> str:
+        return f"{self.width}x{self.height}@{self.device_scale_factor:g}x"
+
+    def output_path(self, template: str | Path) -> Path:
+        """`out/page.png` -> `out/page_1280x720@2x.png`"""
+        template = Path(template)
+        return template.with_name(f"{template.stem}_{self.label}{template.suffix or '.png'}")
+
+
+def parse_viewport_spec(spec: str, screen: ScreenInfo | None = None) -> ViewportVariant:
+    """`1280x720` / `390x844@3` / `effective` (検出した実効解像度 + スケーリング倍率)"""
+    if spec.strip() == EFFECTIVE:
+        if screen is None:
+            raise ValueError("'effective' viewport requires detected screen info")
+        return ViewportVariant(screen.effective_width, screen.effective_height, screen.scale_factor)
+    match = _SPEC_PATTERN.match(spec)
+    if not match:
+        raise ValueError(f"Invalid viewport spec: {spec!r} (expected WIDTHxHEIGHT[@SCALE])")
+    width, height, scale = match.groups()
+    variant = ViewportVariant(int(width), int(height), float(scale) if scale else 1.0)
+    if variant.width <= 0 or variant.height <= 0 or variant.device_scale_factor <= 0:
+        raise ValueError(f"Invalid viewport spec: {spec!r} (width, height and scale must be > 0)")
+    return variant
+
+
+def parse_viewport_list(specs: str, screen: ScreenInfo | None = None) -> list[ViewportVariant]:
+    """カンマ区切りの指定を重複を除いて解析する"""
+    variants: list[ViewportVariant] = []
+    for spec in specs.split(","):
+        if spec.strip():
+            variant = parse_viewport_spec(spec, screen)
+            if variant not in variants:
+                variants.append(variant)
+    return variants
+
+
+class SharedResponseCache:
+    """同じ実行内のコンテキスト間で静的リソースのレスポンスを共有する
+
+    コンテキストごとに HTTP キャッシュが分かれるため、最初のコンテキストで取得した
+    CSS / JS / フォント / 画像をメモリに保持し、他のコンテキストではそこから返す。
+    保持するのは `MAX_ENTRY_BYTES` 以下のレスポンスで、合計が `max_bytes` に達したら追加しない。
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_SHARED_BYTES) -> None:
+        self._responses: dict[str, tuple[int, dict[str, str], bytes]] = {}
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    async def install(self, context: BrowserContext) -> None:
+        await context.route("**/*", self._handle)
+
+    async def _handle(self, route: Route) -> None:
+        request = route.request
+        if request.method != "GET" or request.resource_type not in _SHARED_RESOURCE_TYPES:
+            await route.fallback()
+            return
+        if cached := self._responses.get(request.url):
+            self.hits += 1
+            status, headers, body = cached
+            await route.fulfill(status=status, headers=headers, body=body)
+            return
+        self.misses += 1
+        try:
+            response = await route.fetch()
+            body = await response.body()
+        except PlaywrightError:
+            await route.fallback()
+            return
+        if response.status == 200 and len(body) <= MAX_ENTRY_BYTES and self.bytes + len(body) <= self.max_bytes:
+            # 本文はデコード済みのため、転送に関するヘッダは保持しない
+            self._responses[request.url] = (response.status, replayable_headers(response.headers), body)
+            self.bytes += len(body)
+        await route.fulfill(response=response, body=body)
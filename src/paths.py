@@ -0,0 +1,25 @@
+import os
+from pathlib import Path
+
+APP_NAME = "virtual-resolution"
+
+
+def cache_dir() -> Path:
+    """キャッシュ用ディレクトリ ($XDG_CACHE_HOME/virtual-resolution)"""
+    base = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(base) / APP_NAME
+
+
+def unique_path(path: str | Path, taken: set[Path]) -> Path:
+    """`taken` にも既存のファイルにもないパスを返し、`taken` に加える
+
+    同じ秒に撮影したファイル名 (`screenshot_YYYYMMDD_HHMMSS.png`) が重なる場合は `_2`, `_3` ... を付ける。
+    書き込み前のパスも重ならないよう、発行済みのパスは `taken` で覚えておく。
+    """
+    path = Path(path)
+    candidate, n = path, 1
+    while candidate in taken or candidate.exists():
+        n += 1
+        candidate = path.with_name(f"{path.stem}_{n}{path.suffix}")
+    taken.add(candidate)
+    return candidate
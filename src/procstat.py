@@ -0,0 +1,58 @@
+"""プロセスツリーのメモリ使用量 (Linux の /proc から取得)
+
+Playwright はドライバ (node) をこのプロセスの子として起動し、ブラウザはさらにその子として
+起動されるため、自プロセス配下のツリーを辿ればブラウザ全体の RSS を求められる。
+/proc が無い環境では 0 を返す (測定できるかは `rss_available` で確認する)。
+"""
+import os
+from pathlib import Path
+
+_PROC = Path("/proc")
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def rss_available() -> bool:
+    """この環境で RSS を測定できるか (/proc があるか)"""
+    return (_PROC / str(os.getpid()) / "statm").exists()
+
+
+def _children(pid: int) -> list[int]:
+    children: list[int] = []
+    try:
+        for task in (_PROC / str(pid) / "task").iterdir():
+            text = (task / "children").read_text()
+            children.extend(int(child) for child in text.split())
+    except OSError:
+        pass
+    return children
+
+
+def process_rss(pid: int) -> int:
+    """1プロセスの RSS (バイト)。終了済みなら 0"""
+    try:
+        fields = (_PROC / str(pid) / "statm").read_text().split()
+    except OSError:
+        return 0
+    return int(fields[1]) * _PAGE_SIZE
+
+
+def process_tree(pid: int) -> list[int]:
+    """pid とその子孫のプロセスID"""
+    pids = [pid]
+    index = 0
+    while index < len(pids):
+        pids.extend(_children(pids[index]))
+        index += 1
+    return pids
+
+
+def process_tree_rss(pid: int | None = None, include_root: bool = False) -> int:
+    """pid (省略時は自プロセス) 配下のプロセスツリーの RSS 合計 (バイト)
+
+    `include_root=False` の場合は pid 自身を除く (ブラウザとドライバのみを数える)。
+    """
+    pid = os.getpid() if pid is None else pid
+    pids = process_tree(pid)
+    if not include_root:
+        pids = pids[1:]
+    return sum(process_rss(p) for p in pids)
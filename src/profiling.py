@@ -0,0 +1,131 @@
+"""フェーズ単位の所要時間の計測と出力
+
+`Profiler.phase()` で囲んだ区間の開始・終了を単調時計で記録し、JSONL または
+Chrome のトレースイベント形式 (chrome://tracing / Perfetto で表示可能) で出力する。
+無効化した Profiler は何も記録しないため、常に計測コードを通しても負荷はほぼない。
+"""
+import asyncio
+import json
+import math
+import os
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Awaitable, Iterator, TypeVar
+
+T = TypeVar("T")
+
+
+@dataclass
+class PhaseEvent:
+    name: str
+    start: float
+    duration: float
+    item: str | None = None
+    lane: int = 0
+    ok: bool = True
+
+
+def percentile(values: list[float], q: float) -> float:
+    """線形補間によるパーセンタイル (q は 0-100)"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * q / 100
+    low, high = math.floor(rank), math.ceil(rank)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+class Profiler:
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self.events: list[PhaseEvent] = []
+        self._origin = time.perf_counter()
+        self._lanes: dict[int, int] = {}
+
+    def _lane(self) -> int:
+        """並行に実行中のフェーズをトレース上で別の行に表示するため、タスクごとに番号を振る"""
+        try:
+            task = asyncio.current_task()
+        except RuntimeError:
+            task = None
+        key = id(task) if task else 0
+        return self._lanes.setdefault(key, len(self._lanes))
+
+    def record(self, name: str, start: float, end: float, item: str | None = None, ok: bool = True) -> None:
+        """perf_counter() の値で区間を記録する"""
+        if self.enabled:
+            self.events.append(PhaseEvent(name, start - self._origin, end - start, item, self._lane(), ok))
+
+    @contextmanager
+    def phase(self, name: str, item: str | None = None) -> Iterator[None]:
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        ok = False
+        try:
+            yield
+            ok = True
+        finally:
+            self.record(name, start, time.perf_counter(), item, ok)
+
+    async def measure(self, name: str, awaitable: Awaitable[T], item: str | None = None) -> T:
+        with self.phase(name, item):
+            return await awaitable
+
+    def summary(self) -> dict[str, dict[str, float]]:
+        """フェーズごとの件数・合計・p50/p95/max (秒)"""
+        durations: dict[str, list[float]] = {}
+        for event in self.events:
+            durations.setdefault(event.name, []).append(event.duration)
+        return {
+            name: {
+                "count": len(values),
+                "total": sum(values),
+                "p50": percentile(values, 50),
+                "p95": percentile(values, 95),
+                "max": max(values),
+            }
+            for name, values in durations.items()
+        }
+
+    def format_summary(self) -> str:
+        lines = [f"{'phase':<20} {'count':>6} {'p50':>9} {'p95':>9} {'max':>9} {'total':>9}"]
+        for name, s in sorted(self.summary().items(), key=lambda kv: -kv[1]["total"]):
+            lines.append(
+                f"{name:<20} {s['count']:>6} {s['p50'] * 1000:>7.0f}ms {s['p95'] * 1000:>7.0f}ms "
+                f"{s['max'] * 1000:>7.0f}ms {s['total']:>8.2f}s"
+            )
+        return "\n".join(lines)
+
+    def write_jsonl(self, path: str | Path) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            for event in self.events:
+                f.write(json.dumps(asdict(event), ensure_ascii=False) + "\n")
+
+    def write_chrome_trace(self, path: str | Path) -> None:
+        pid = os.getpid()
+        trace_events = [
+            {
+                "name": event.name,
+                "cat": "virtual-resolution",
+                "ph": "X",
+                "ts": round(event.start * 1_000_000),
+                "dur": round(event.duration * 1_000_000),
+                "pid": pid,
+                "tid": event.lane,
+                "args": {"item": event.item, "ok": event.ok},
+            }
+            for event in self.events
+        ]
+        Path(path).write_text(json.dumps({"traceEvents": trace_events, "displayTimeUnit": "ms"}))
+
+    def write(self, path: str | Path) -> None:
+        """拡張子が .jsonl なら JSONL、それ以外は Chrome トレース形式で書き出す"""
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        if Path(path).suffix == ".jsonl":
+            self.write_jsonl(path)
+        else:
+            self.write_chrome_trace(path)
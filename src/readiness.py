@@ -0,0 +1,149 @@
+"""ページの描画完了判定
+
+`networkidle` + 固定 sleep の代わりに、以下の条件がすべて満たされるまで待つ。
+
+- dom_quiet: DOM の変更 (要素・テキストの追加削除と画像の src の変更) が `quiet_ms` の間発生しない。
+  アニメーションで変わり続ける style / class などの属性は対象外
+- fonts: `document.fonts.ready`
+- images: 表示領域内の画像のデコード完了
+- selector / predicate: アプリ側で定義した準備完了条件 (任意)
+
+全体に `timeout_ms` の上限があり、条件ごとの所要時間を記録する。
+判定用のスクリプト自体が失敗した場合 (判定中の再ナビゲーションなど) は `error` に記録する。
+"""
+import asyncio
+import time
+from dataclasses import dataclass, field
+
+from playwright.async_api import Error as PlaywrightError, Page
+
+_IN_PAGE_SCRIPT = """
+async ({ quietMs, timeoutMs, fonts, images }) => {
+    const start = performance.now();
+    const timings = {};
+    const pending = new Set();
+    const track = (name, promise) => {
+        pending.add(name);
+        const done = () => {
+            timings[name] = performance.now() - start;
+            pending.delete(name);
+        };
+        return promise.then(done, done);
+    };
+
+    let observer = null;
+    const domQuiet = new Promise((resolve) => {
+        const finish = () => {
+            observer.disconnect();
+            resolve();
+        };
+        let timer = setTimeout(finish, quietMs);
+        observer = new MutationObserver(() => {
+            clearTimeout(timer);
+            timer = setTimeout(finish, quietMs);
+        });
+        observer.observe(document, {
+            subtree: true, childList: true, characterData: true, attributeFilter: ['src', 'srcset'],
+        });
+    });
+    const tasks = [track('dom_quiet', domQuiet)];
+
+    if (fonts && document.fonts) {
+        tasks.push(track('fonts', document.fonts.ready));
+    }
+    if (images) {
+        const visible = Array.from(document.images).filter((img) => {
+            const r = img.getBoundingClientRect();
+            return r.width > 0 && r.height > 0 && r.bottom > 0 && r.right > 0
+                && r.top < window.innerHeight && r.left < window.innerWidth;
+        });
+        tasks.push(track('images', Promise.all(visible.map((img) => img.decode().catch(() => {})))));
+    }
+
+    await Promise.race([Promise.all(tasks), new Promise((r) => setTimeout(r, timeoutMs))]);
+    observer.disconnect();
+    return { timings, timedOut: Array.from(pending) };
+}
+"""
+
+
+@dataclass
+class ReadinessOptions:
+    quiet_ms: int = 500
+    timeout_ms: int = 15000
+    fonts: bool = True
+    images: bool = True
+    selector: str | None = None
+    predicate: str | None = None
+
+
+@dataclass
+class ReadinessReport:
+    url: str
+    total_ms: float
+    timings_ms: dict[str, float] = field(default_factory=dict)
+    timed_out: list[str] = field(default_factory=list)
+    error: str | None = None
+
+    @property
+    def ready(self) -> bool:
+        return not self.timed_out and self.error is None
+
+    def summary(self) -> str:
+        parts = [f"{name} {ms:.0f}ms" for name, ms in sorted(self.timings_ms.items(), key=lambda kv: kv[1])]
+        parts += [f"{name} timed out" for name in self.timed_out]
+        if self.error:
+            parts.append(f"error: {self.error}")
+        return f"{self.total_ms:.0f}ms ({', '.join(parts)})"
+
+
+async def wait_for_ready(page: Page, options: ReadinessOptions) -> ReadinessReport:
+    """描画完了条件をすべて (または timeout_ms まで) 待ち、条件ごとの所要時間を返す"""
+    start = time.monotonic()
+    timings: dict[str, float] = {}
+    timed_out: list[str] = []
+    error: str | None = None
+
+    async def in_page() -> None:
+        nonlocal error
+        try:
+            result = await page.evaluate(
+                _IN_PAGE_SCRIPT,
+                {
+                    "quietMs": options.quiet_ms,
+                    "timeoutMs": options.timeout_ms,
+                    "fonts": options.fonts,
+                    "images": options.images,
+                },
+            )
+        except PlaywrightError as e:
+            # 判定中に再度ナビゲーションが発生した場合など
+            error = str(e).splitlines()[0]
+            return
+        timings.update(result["timings"])
+        timed_out.extend(result["timedOut"])
+
+    async def timed(name: str, waiter) -> None:
+        try:
+            await waiter
+        except PlaywrightError:
+            timed_out.append(name)
+            return
+        timings[name] = (time.monotonic() - start) * 1000
+
+    waiters = [in_page()]
+    if options.selector:
+        waiters.append(
+            timed("selector", page.wait_for_selector(options.selector, state="visible", timeout=options.timeout_ms))
+        )
+    if options.predicate:
+        waiters.append(timed("predicate", page.wait_for_function(options.predicate, timeout=options.timeout_ms)))
+    await asyncio.gather(*waiters)
+
+    return ReadinessReport(
+        url=page.url,
+        total_ms=(time.monotonic() - start) * 1000,
+        timings_ms=timings,
+        timed_out=timed_out,
+        error=error,
+    )
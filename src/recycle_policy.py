@@ -0,0 +1,25 @@
+"""ページ・コンテキスト・ブラウザを作り直す条件
+
+CLI の引数解析からも参照するため、Playwright に依存しないモジュールに分けている。
+"""
+from dataclasses import dataclass
+
+
+@dataclass
+class RecyclePolicy:
+    """作り直す条件 (None は無効)。ウォーターマークはブラウザのプロセスツリーの RSS (MiB)"""
+
+    page_captures: int | None = None
+    context_captures: int | None = None
+    browser_captures: int | None = None
+    context_watermark_mb: float | None = None
+    browser_watermark_mb: float | None = None
+
+    def __post_init__(self) -> None:
+        for name, value in vars(self).items():
+            if value is not None and value <= 0:
+                raise ValueError(f"{name} must be > 0: {value}")
+
+    @property
+    def watches_memory(self) -> bool:
+        return self.context_watermark_mb is not None or self.browser_watermark_mb is not None
@@ -0,0 +1,243 @@
+"""1回のページ読み込みから複数の要素・領域を切り出して撮影する
+
+要素ごとに `page.screenshot` / `locator.screenshot` を呼ぶと、そのたびにブラウザ側で
+ラスタライズと PNG エンコードが行われる。ここでは全領域の位置をまとめて取得し、
+それらを囲む範囲だけを1回撮影してから、メモリ上で領域ごとに切り出す。
+切り出しには Pillow が必要 (`uv sync --extra image`)。
+"""
+import io
+import math
+import re
+from importlib.util import find_spec
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from playwright.async_api import Page
+
+_CLIP_PATTERN = re.compile(r"^\s*(-?\d+(?:\.\d+)?)\s*,\s*(-?\d+(?:\.\d+)?)\s*,\s*(\d+(?:\.\d+)?)\s*x\s*(\d+(?:\.\d+)?)\s*$")
+_NAME_PATTERN = re.compile(r"^([\w.-]+)=(.+)$")
+_UNSAFE_CHARS = re.compile(r"[^\w.-]+")
+_PILLOW_REQUIRED = "Region capture requires Pillow: uv sync --extra image"
+
+# 各セレクタに最初に一致する要素の位置 (ドキュメント座標) と、現在の表示領域・ドキュメントの大きさ
+_LOCATE_SCRIPT = """
+(selectors) => {
+    const rects = selectors.map((selector) => {
+        let el;
+        try {
+            el = document.querySelector(selector);
+        } catch (e) {
+            return { error: 'invalid selector' };
+        }
+        if (!el) return { error: 'not found' };
+        const r = el.getBoundingClientRect();
+        if (r.width === 0 || r.height === 0) return { error: 'not visible' };
+        return { x: r.left + window.scrollX, y: r.top + window.scrollY, width: r.width, height: r.height };
+    });
+    return {
+        rects,
+        scrollX: window.scrollX,
+        scrollY: window.scrollY,
+        width: window.innerWidth,
+        height: window.innerHeight,
+        scale: window.devicePixelRatio,
+        documentWidth: Math.max(document.documentElement.scrollWidth, document.body ? document.body.scrollWidth : 0),
+        documentHeight: Math.max(document.documentElement.scrollHeight, document.body ? document.body.scrollHeight : 0),
+    };
+}
+"""
+
+
+@dataclass(frozen=True)
+class Region:
+    """撮影する領域 (CSS セレクタ、またはドキュメント座標の矩形 x, y, 幅, 高さ)"""
+
+    name: str
+    selector: str | None = None
+    clip: tuple[float, float, float, float] | None = None
+
+    def __post_init__(self) -> None:
+        if (self.selector is None) == (self.clip is None):
+            raise ValueError("Region requires exactly one of selector or clip")
+
+    def output_path(self, template: str | Path) -> Path:
+        """`out/page.png` -> `out/page_<name>.png`"""
+        template = Path(template)
+        return template.with_name(f"{template.stem}_{self.name}{template.suffix or '.png'}")
+
+
+def _slug(text: str) -> str:
+    return _UNSAFE_CHARS.sub("-", text).strip("-.") or "region"
+
+
+def parse_region(spec: str) -> Region:
+    """`[名前=]セレクタ` / `[名前=]X,Y,幅x高さ`
+
+    名前を省略した場合はセレクタ (または座標) から作る。
+    """
+    spec = spec.strip()
+    name = None
+    if match := _NAME_PATTERN.match(spec):
+        name, spec = match.group(1), match.group(2).strip()
+    if not spec:
+        raise ValueError("Empty region spec")
+    if clip := _CLIP_PATTERN.match(spec):
+        x, y, width, height = (float(v) for v in clip.groups())
+        if width <= 0 or height <= 0:
+            raise ValueError(f"Region size must be > 0: {spec!r}")
+        return Region(name or _slug(f"{x:g}_{y:g}_{width:g}x{height:g}"), clip=(x, y, width, height))
+    return Region(name or _slug(spec), selector=spec)
+
+
+def require_pillow() -> None:
+    """切り出しに使う Pillow があるか確認する (撮影を始める前に失敗させるため, 読み込みはしない)"""
+    if find_spec("PIL") is None:
+        raise RuntimeError(_PILLOW_REQUIRED)
+
+
+def parse_region_list(specs: list[str] | str) -> list[Region]:
+    """複数の指定を解析する (文字列は `;` 区切り)。同じ名前には連番を付ける"""
+    if isinstance(specs, str):
+        specs = specs.split(";")
+    regions: list[Region] = []
+    names: set[str] = set()
+    for spec in specs:
+        if not spec.strip():
+            continue
+        region = parse_region(spec)
+        name, n = region.name, 1
+        while name in names:
+            n += 1
+            name = f"{region.name}-{n}"
+        names.add(name)
+        regions.append(Region(name, region.selector, region.clip))
+    return regions
+
+
+@dataclass
+class RegionResult:
+    region: Region
+    path: str | None = None
+    error: str | None = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+@dataclass
+class RegionReport:
+    results: list[RegionResult] = field(default_factory=list)
+    # 撮影した範囲 (CSS ピクセル) と、ページ全体の撮影が必要だったか
+    raster: tuple[int, int] = (0, 0)
+    full_page: bool = False
+    elapsed: float = 0.0
+
+    @property
+    def failed(self) -> list[RegionResult]:
+        return [r for r in self.results if not r.ok]
+
+    def summary(self) -> str:
+        captured = len(self.results) - len(self.failed)
+        text = (
+            f"{captured} regions from one {'full-page ' if self.full_page else ''}raster "
+            f"{self.raster[0]}x{self.raster[1]}px, {self.elapsed:.2f}s"
+        )
+        if self.failed:
+            text += f", {len(self.failed)} failed"
+        return text
+
+
+@dataclass
+class RegionPlan:
+    """撮影範囲 (`clip`) と、その中での各領域の位置 (CSS ピクセル)"""
+
+    clip: dict[str, float]
+    full_page: bool
+    boxes: dict[str, tuple[float, float, float, float]]
+    errors: dict[str, str]
+    # デバイスピクセル比 (撮影画像の1 CSS ピクセルあたりの画素数)
+    scale: float = 1.0
+
+
+def plan_regions(regions: list[Region], located: dict) -> RegionPlan:
+    """`_LOCATE_SCRIPT` の結果から、全領域を囲む撮影範囲を決める
+
+    全領域が現在の表示領域に収まる場合は表示領域だけを、そうでなければページ全体を撮影する。
+    `clip` は `page.screenshot` にそのまま渡せる座標 (表示領域基準 / ドキュメント基準) で、
+    ドキュメントの範囲に切り詰める。ドキュメントの外にある領域は `errors` に記録する。
+    """
+    selected = iter(located["rects"])
+    boxes: dict[str, tuple[float, float, float, float]] = {}
+    errors: dict[str, str] = {}
+    for region in regions:
+        if region.clip is not None:
+            boxes[region.name] = region.clip
+            continue
+        rect = next(selected)
+        if "error" in rect:
+            errors[region.name] = f"{region.selector}: {rect['error']}"
+        else:
+            boxes[region.name] = (rect["x"], rect["y"], rect["width"], rect["height"])
+    # ドキュメントの外の領域は撮影できない (clip が空だと page.screenshot が失敗する)
+    doc_width, doc_height = located["documentWidth"], located["documentHeight"]
+    for name, (x, y, w, h) in list(boxes.items()):
+        if x >= doc_width or y >= doc_height or x + w <= 0 or y + h <= 0:
+            del boxes[name]
+            errors[name] = "outside the page"
+    if not boxes:
+        return RegionPlan({"x": 0, "y": 0, "width": 0, "height": 0}, False, boxes, errors, located["scale"])
+
+    # ピクセル境界に揃える (負の座標はページの外なので切り捨てる)
+    left = max(0, math.floor(min(x for x, _, _, _ in boxes.values())))
+    top = max(0, math.floor(min(y for _, y, _, _ in boxes.values())))
+    right = min(math.ceil(max(x + w for x, _, w, _ in boxes.values())), math.ceil(doc_width))
+    bottom = min(math.ceil(max(y + h for _, y, _, h in boxes.values())), math.ceil(doc_height))
+    view_x, view_y = located["scrollX"], located["scrollY"]
+    full_page = not (
+        left >= view_x
+        and top >= view_y
+        and right <= view_x + located["width"]
+        and bottom <= view_y + located["height"]
+    )
+    if full_page:
+        clip = {"x": left, "y": top, "width": right - left, "height": bottom - top}
+    else:
+        clip = {"x": left - view_x, "y": top - view_y, "width": right - left, "height": bottom - top}
+    boxes = {name: (x - left, y - top, w, h) for name, (x, y, w, h) in boxes.items()}
+    return RegionPlan(clip, full_page, boxes, errors, located["scale"])
+
+
+async def locate_regions(page: "Page", regions: list[Region]) -> RegionPlan:
+    """全領域の位置を1回の評価で取得し、撮影範囲を決める"""
+    selectors = [region.selector for region in regions if region.selector is not None]
+    return plan_regions(regions, await page.evaluate(_LOCATE_SCRIPT, selectors))
+
+
+def crop_regions(data: bytes, plan: RegionPlan) -> dict[str, bytes]:
+    """撮影した範囲の PNG から各領域を切り出し、PNG のバイト列で返す (スレッドで実行)"""
+    try:
+        from PIL import Image
+    except ImportError as e:
+        raise RuntimeError(_PILLOW_REQUIRED) from e
+
+    crops: dict[str, bytes] = {}
+    with Image.open(io.BytesIO(data)) as image:
+        image.load()
+        # ページの端で撮影範囲が切り詰められた領域は画像に収まる分だけ切り出す
+        scale = plan.scale
+        for name, (x, y, width, height) in plan.boxes.items():
+            box = (
+                max(0, round(x * scale)),
+                max(0, round(y * scale)),
+                min(image.width, round((x + width) * scale)),
+                min(image.height, round((y + height) * scale)),
+            )
+            if box[2] <= box[0] or box[3] <= box[1]:
+                continue
+            out = io.BytesIO()
+            image.crop(box).save(out, "PNG")
+            crops[name] = out.getvalue()
+    return crops
@@ -1,5 +1,17 @@
-from dataclasses import dataclass
+from dataclasses import asdict, dataclass
+import asyncio
+import json
+import os
+import re
 import subprocess
+import time
+from pathlib import Path
+
+from .paths import cache_dir
+
+SCREEN_ENV = "VIRTUAL_RESOLUTION_SCREEN"
+CACHE_TTL = 24 * 60 * 60
+_SPEC_PATTERN = re.compile(r"^\s*(\d+)\s*x\s*(\d+)\s*(?:@\s*(\d+(?:\.\d+)?)\s*%?)?\s*$")
 
 
 @dataclass
@@ -17,9 +29,10 @@ class ScreenInfo:
         return int(self.height / self.scale_factor)
 
 
-def detect_screen_info() -> ScreenInfo:
-    """Detect screen resolution and scaling factor from Windows via PowerShell."""
-    ps_script = """
+# 検出を行わない場合 (--no-detect / CI) に使う値
+DEFAULT_SCREEN = ScreenInfo(width=1920, height=1080, scale_factor=1.0)
+
+_PS_SCRIPT = """
 Add-Type -AssemblyName System.Windows.Forms
 $screen = [System.Windows.Forms.Screen]::PrimaryScreen
 $physicalWidth = $screen.Bounds.Width
@@ -39,9 +52,26 @@ Write-Output $physicalWidth
 Write-Output $physicalHeight
 Write-Output $scale
 """
+_PS_COMMAND = ["powershell.exe", "-NoProfile", "-Command", _PS_SCRIPT]
+
 
+def _parse_output(stdout: str) -> ScreenInfo:
+    lines = stdout.strip().split("\n")
+    width = int(lines[0])
+    height = int(lines[1])
+    scale_percent = int(lines[2])
+
+    return ScreenInfo(
+        width=width,
+        height=height,
+        scale_factor=scale_percent / 100.0,
+    )
+
+
+def detect_screen_info() -> ScreenInfo:
+    """Detect screen resolution and scaling factor from Windows via PowerShell."""
     result = subprocess.run(
-        ["powershell.exe", "-NoProfile", "-Command", ps_script],
+        _PS_COMMAND,
         capture_output=True,
         text=True,
         encoding="utf-8",
@@ -51,13 +81,113 @@ Write-Output $scale
     if result.returncode != 0:
         raise RuntimeError(f"Failed to detect screen info: {result.stderr}")
 
-    lines = result.stdout.strip().split("\n")
-    width = int(lines[0])
-    height = int(lines[1])
-    scale_percent = int(lines[2])
+    return _parse_output(result.stdout)
 
-    return ScreenInfo(
-        width=width,
-        height=height,
-        scale_factor=scale_percent / 100.0,
+
+async def detect_screen_info_async() -> ScreenInfo:
+    """`detect_screen_info` の非同期版 (イベントループをブロックしない)"""
+    proc = await asyncio.create_subprocess_exec(
+        *_PS_COMMAND,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
     )
+    try:
+        stdout, stderr = await proc.communicate()
+    except asyncio.CancelledError:
+        if proc.returncode is None:
+            proc.kill()
+        raise
+
+    if proc.returncode != 0:
+        raise RuntimeError(f"Failed to detect screen info: {stderr.decode('utf-8', 'replace')}")
+
+    return _parse_output(stdout.decode("utf-8", "replace"))
+
+
+def parse_screen_spec(spec: str) -> ScreenInfo:
+    """`3840x2160@200` (倍率は % 指定、省略時 100%) 形式の文字列を ScreenInfo に変換"""
+    match = _SPEC_PATTERN.match(spec)
+    if not match:
+        raise ValueError(f"Invalid screen spec: {spec!r} (expected WIDTHxHEIGHT[@SCALE%])")
+    width, height, scale = match.groups()
+    info = ScreenInfo(
+        width=int(width),
+        height=int(height),
+        scale_factor=float(scale) / 100.0 if scale else 1.0,
+    )
+    if info.width <= 0 or info.height <= 0 or info.scale_factor <= 0:
+        raise ValueError(f"Invalid screen spec: {spec!r} (width, height and scale must be > 0)")
+    return info
+
+
+def default_cache_path() -> Path:
+    return cache_dir() / "screen.json"
+
+
+def load_cached_screen_info(path: Path | None = None, ttl: float = CACHE_TTL) -> ScreenInfo | None:
+    """TTL 内のキャッシュがあれば返す"""
+    path = path or default_cache_path()
+    try:
+        data = json.loads(path.read_text())
+        if time.time() - data["detected_at"] > ttl:
+            return None
+        return ScreenInfo(**data["screen"])
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+def save_cached_screen_info(screen: ScreenInfo, path: Path | None = None) -> None:
+    path = path or default_cache_path()
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps({"detected_at": time.time(), "screen": asdict(screen)}))
+    except OSError:
+        pass
+
+
+def _resolve_without_detection(
+    override: str | None, detect: bool, cache_path: Path | None, ttl: float, refresh: bool
+) -> ScreenInfo | None:
+    if override:
+        return parse_screen_spec(override)
+    if env := os.environ.get(SCREEN_ENV):
+        return parse_screen_spec(env)
+    if not detect:
+        return DEFAULT_SCREEN
+    if refresh:
+        return None
+    return load_cached_screen_info(cache_path, ttl)
+
+
+def resolve_screen_info(
+    override: str | None = None,
+    detect: bool = True,
+    cache_path: Path | None = None,
+    ttl: float = CACHE_TTL,
+    refresh: bool = False,
+) -> ScreenInfo:
+    """画面情報を決定する
+
+    優先順位: 引数 `override` > 環境変数 VIRTUAL_RESOLUTION_SCREEN >
+    (detect=False なら DEFAULT_SCREEN) > ディスクキャッシュ > PowerShell による検出。
+    """
+    screen = _resolve_without_detection(override, detect, cache_path, ttl, refresh)
+    if screen is None:
+        screen = detect_screen_info()
+        save_cached_screen_info(screen, cache_path)
+    return screen
+
+
+async def resolve_screen_info_async(
+    override: str | None = None,
+    detect: bool = True,
+    cache_path: Path | None = None,
+    ttl: float = CACHE_TTL,
+    refresh: bool = False,
+) -> ScreenInfo:
+    """`resolve_screen_info` の非同期版 (ブラウザ起動と並行に実行できる)"""
+    screen = _resolve_without_detection(override, detect, cache_path, ttl, refresh)
+    if screen is None:
+        screen = await detect_screen_info_async()
+        save_cached_screen_info(screen, cache_path)
+    return screen
@@ -0,0 +1,195 @@
+"""CDP の Page.startScreencast による連続録画
+
+F9 による撮影は1枚ごとに `page.screenshot` の往復と PNG 書き込みを行うため、
+アニメーションや画面遷移ではフレームを取りこぼす。ここではブラウザが描画のたびに送る
+JPEG / PNG フレームを受け取り、上限付きのキューを通してバックグラウンドで書き込む。
+書き込みが追いつかない場合はフレームを捨てて数えるだけで、ページやイベントループは止めない。
+
+出力先の拡張子が `.mjpeg` / `.mjpg` なら JPEG を連結した1ファイル (MJPEG)、
+それ以外はディレクトリに連番画像と、ffmpeg の concat 形式のタイムスタンプ (`frames.ffconcat`) を保存する。
+"""
+import asyncio
+import base64
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import BinaryIO
+
+from playwright.async_api import CDPSession, Error as PlaywrightError, Page
+
+from .profiling import Profiler
+from .screencast_options import FRAME_EXTENSIONS, ScreencastOptions, is_container
+
+CONCAT_NAME = "frames.ffconcat"
+
+
+@dataclass
+class ScreencastStats:
+    received: int = 0
+    written: int = 0
+    # フレームレートの上限を超えたため捨てたフレーム
+    dropped_rate: int = 0
+    # 書き込みが追いつかずキューが満杯だったため捨てたフレーム
+    dropped_queue: int = 0
+    bytes_written: int = 0
+    duration: float = 0.0
+
+    @property
+    def fps(self) -> float:
+        return self.written / self.duration if self.duration > 0 else 0.0
+
+    def summary(self) -> str:
+        return (
+            f"{self.written} frames in {self.duration:.1f}s ({self.fps:.1f} fps), "
+            f"{self.received} received, dropped {self.dropped_rate} (rate cap) + {self.dropped_queue} (queue full), "
+            f"{self.bytes_written / 1024 / 1024:.1f} MiB"
+        )
+
+
+class ScreencastRecorder:
+    """1ページの画面を録画する (`async with` で開始・停止)"""
+
+    def __init__(
+        self,
+        page: Page,
+        output: str | Path,
+        options: ScreencastOptions | None = None,
+        profiler: Profiler | None = None,
+    ):
+        self.page = page
+        self.output = Path(output)
+        self.options = options or ScreencastOptions()
+        if is_container(self.output) and self.options.format != "jpeg":
+            raise ValueError("MJPEG output requires --record-format jpeg")
+        self.profiler = profiler or Profiler(enabled=False)
+        self.stats = ScreencastStats()
+        self._queue: asyncio.Queue[tuple[float, bytes | str] | None] = asyncio.Queue(self.options.queue_size)
+        self._finished = asyncio.Event()
+        self._session: CDPSession | None = None
+        self._writer: asyncio.Task | None = None
+        self._acks: set[asyncio.Task] = set()
+        self._first: float | None = None
+        self._last: float | None = None
+        self._timestamps: list[float] = []
+
+    async def start(self) -> None:
+        if is_container(self.output):
+            self.output.parent.mkdir(parents=True, exist_ok=True)
+        else:
+            self.output.mkdir(parents=True, exist_ok=True)
+        self._writer = asyncio.create_task(self._write_frames())
+        self._session = await self.page.context.new_cdp_session(self.page)
+        self._session.on("Page.screencastFrame", self._on_frame)
+        self.page.on("close", lambda _: self._finished.set())
+        params = {"format": self.options.format, "everyNthFrame": 1}
+        if self.options.format == "jpeg":
+            params["quality"] = self.options.quality
+        if self.options.max_width:
+            params["maxWidth"] = self.options.max_width
+        if self.options.max_height:
+            params["maxHeight"] = self.options.max_height
+        await self._session.send("Page.startScreencast", params)
+
+    def _on_frame(self, params: dict) -> None:
+        """フレーム受信時に呼ばれる。ここでは待たず、キューに入れるか捨てるだけ"""
+        # ACK を返すまで次のフレームは送られないため、書き込みを待たずにすぐ返す
+        ack = asyncio.create_task(self._ack(params["sessionId"]))
+        self._acks.add(ack)
+        ack.add_done_callback(self._acks.discard)
+        if self._finished.is_set():
+            return
+        self.stats.received += 1
+        timestamp = params.get("metadata", {}).get("timestamp") or time.time()
+        if self._first is None:
+            self._first = timestamp
+        if timestamp - self._first >= self.options.max_duration:
+            self._finished.set()
+            return
+        if self._last is not None and timestamp - self._last < 1.0 / self.options.max_fps:
+            self.stats.dropped_rate += 1
+            return
+        try:
+            self._queue.put_nowait((timestamp, params["data"]))
+        except asyncio.QueueFull:
+            self.stats.dropped_queue += 1
+            return
+        self._last = timestamp
+
+    async def _ack(self, session_id: int) -> None:
+        try:
+            await self._session.send("Page.screencastFrameAck", {"sessionId": session_id})
+        except PlaywrightError:
+            pass
+
+    async def _write_frames(self) -> None:
+        loop = asyncio.get_running_loop()
+        container: BinaryIO | None = None
+        if is_container(self.output):
+            container = await loop.run_in_executor(None, self.output.open, "wb")
+        try:
+            while (frame := await self._queue.get()) is not None:
+                timestamp, data = frame
+                index = len(self._timestamps) + 1
+                start = time.perf_counter()
+                path = self.output / f"frame_{index:06d}{FRAME_EXTENSIONS[self.options.format]}"
+                written = await loop.run_in_executor(None, _write_frame, data, container or path)
+                self.profiler.record("screencast_write", start, time.perf_counter(), str(index))
+                self._timestamps.append(timestamp)
+                self.stats.written += 1
+                self.stats.bytes_written += written
+        finally:
+            if container is not None:
+                await loop.run_in_executor(None, container.close)
+
+    async def wait(self) -> None:
+        """録画時間の上限に達するかページが閉じられるまで待つ"""
+        await self._finished.wait()
+
+    async def stop(self) -> ScreencastStats:
+        self._finished.set()
+        if self._session is not None:
+            try:
+                await self._session.send("Page.stopScreencast")
+                await self._session.detach()
+            except PlaywrightError:
+                pass  # ページが閉じられた後
+        if self._acks:
+            await asyncio.gather(*self._acks, return_exceptions=True)
+        if self._writer is not None:
+            await self._queue.put(None)
+            await self._writer
+            self._writer = None
+        if self._timestamps:
+            self.stats.duration = self._timestamps[-1] - self._timestamps[0]
+            if not is_container(self.output):
+                self._write_concat()
+        return self.stats
+
+    def _write_concat(self) -> None:
+        """可変フレームレートのまま動画に変換できるよう、各フレームの表示時間を書き出す"""
+        suffix = FRAME_EXTENSIONS[self.options.format]
+        lines = ["ffconcat version 1.0"]
+        for index, timestamp in enumerate(self._timestamps, start=1):
+            lines.append(f"file frame_{index:06d}{suffix}")
+            if index < len(self._timestamps):
+                lines.append(f"duration {self._timestamps[index] - timestamp:.6f}")
+        # concat demuxer は最後のフレームの duration を無視するため、もう一度並べる
+        lines.append(f"file frame_{len(self._timestamps):06d}{suffix}")
+        (self.output / CONCAT_NAME).write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+    async def __aenter__(self) -> "ScreencastRecorder":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.stop()
+
+
+def _write_frame(data: bytes | str, target: Path | BinaryIO) -> int:
+    """base64 のデコードと書き込み (スレッドプールで実行)"""
+    raw = base64.b64decode(data) if isinstance(data, str) else data
+    if isinstance(target, Path):
+        target.write_bytes(raw)
+    else:
+        target.write(raw)
+    return len(raw)
@@ -0,0 +1,32 @@
+"""録画の設定と出力形式の判定
+
+CLI の引数解析からも参照するため、Playwright に依存しないモジュールに分けている。
+"""
+from dataclasses import dataclass
+from pathlib import Path
+
+CONTAINER_SUFFIXES = (".mjpeg", ".mjpg")
+FRAME_EXTENSIONS = {"jpeg": ".jpg", "png": ".png"}
+
+
+@dataclass
+class ScreencastOptions:
+    format: str = "jpeg"
+    quality: int = 80
+    max_fps: float = 10.0
+    max_duration: float = 30.0
+    max_width: int | None = None
+    max_height: int | None = None
+    queue_size: int = 64
+
+    def __post_init__(self) -> None:
+        if self.format not in FRAME_EXTENSIONS:
+            raise ValueError(f"Unsupported screencast format: {self.format} (choose from jpeg, png)")
+        if self.max_fps <= 0:
+            raise ValueError(f"max_fps must be > 0: {self.max_fps}")
+        if self.max_duration <= 0:
+            raise ValueError(f"max_duration must be > 0: {self.max_duration}")
+
+
+def is_container(path: str | Path) -> bool:
+    return Path(path).suffix.lower() in CONTAINER_SUFFIXES
@@ -0,0 +1,248 @@
+"""内容のハッシュで重複を除くスクリーンショットの保存先 (インデックス付き)
+
+撮影した PNG は SHA-256 をファイル名にして `objects/` に1度だけ保存し、撮影ごとの記録
+(URL・ビューポート・時刻・ハッシュ) を SQLite のインデックス (`index.sqlite3`) に追加する。
+同じ画像をもう一度撮影してもファイルは増えず、記録だけが増える。見た目がほぼ同じ画像は
+知覚ハッシュ (dHash, 64bit) の距離で判定できる。「URL の最新の撮影」や「ページの異なる状態の一覧」は
+ディレクトリを走査せずにインデックスから引ける。URL は記録・検索の両方で正規化するため、
+`https://Example.com` と `https://example.com/` は同じページとして扱う。知覚ハッシュの計算には Pillow が必要
+(`uv sync --extra image`)。ない場合は完全一致の判定だけを行う。
+"""
+import asyncio
+import hashlib
+import io
+import os
+import shutil
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+from .urls import canonicalize_url
+
+INDEX_NAME = "index.sqlite3"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS blobs (
+    sha256 TEXT PRIMARY KEY,
+    dhash TEXT,
+    width INTEGER,
+    height INTEGER,
+    size INTEGER NOT NULL,
+    path TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS captures (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    url TEXT NOT NULL,
+    viewport TEXT,
+    captured_at REAL NOT NULL,
+    sha256 TEXT NOT NULL REFERENCES blobs (sha256)
+);
+CREATE INDEX IF NOT EXISTS captures_url_time ON captures (url, captured_at);
+"""
+
+_SELECT = """
+SELECT c.id, c.url, c.viewport, c.captured_at, c.sha256, b.dhash, b.path
+FROM captures c JOIN blobs b ON b.sha256 = c.sha256
+"""
+
+
+def dhash(data: bytes) -> tuple[str, int, int] | None:
+    """画像の差分ハッシュ (16進数 16 桁) と幅・高さ。Pillow がない・読めない画像なら None"""
+    try:
+        from PIL import Image
+    except ImportError:
+        return None
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            width, height = image.size
+            pixels = image.convert("L").resize((9, 8), Image.Resampling.LANCZOS).tobytes()
+    except OSError:
+        return None
+    bits = 0
+    for row in range(8):
+        for col in range(8):
+            bits = bits << 1 | (pixels[row * 9 + col] > pixels[row * 9 + col + 1])
+    return f"{bits:016x}", width, height
+
+
+def hamming(a: str, b: str) -> int:
+    return (int(a, 16) ^ int(b, 16)).bit_count()
+
+
+def _url_key(url: str) -> str:
+    """インデックスに記録する URL (http(s) 以外はそのまま)"""
+    return canonicalize_url(url) or url
+
+
+@dataclass
+class StoredCapture:
+    id: int
+    url: str
+    viewport: str | None
+    captured_at: float
+    sha256: str
+    dhash: str | None
+    path: Path
+    # 同じ画像が既に保存されていた (ファイルは書き込んでいない)
+    duplicate: bool = False
+
+    def summary(self) -> str:
+        stamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(self.captured_at))
+        return f"#{self.id} {stamp} {self.viewport or '-'} {self.sha256[:12]} {self.path}"
+
+
+@dataclass
+class PageState:
+    """見た目が同じ撮影をまとめたページの状態"""
+
+    first: StoredCapture
+    last: StoredCapture
+    count: int = 1
+
+
+@dataclass
+class StoreStats:
+    captures: int
+    blobs: int
+    bytes: int
+
+    def summary(self) -> str:
+        return (
+            f"{self.captures} captures, {self.blobs} unique images ({self.bytes / 1_000_000:.1f}MB), "
+            f"{self.captures - self.blobs} deduplicated"
+        )
+
+
+class ScreenshotStore:
+    """`root` 配下の画像 (`objects/`) とインデックス (`index.sqlite3`)
+
+    書き込みはスレッドから行えるよう1つの接続をロックで直列化する (`add` はスレッドで実行する)。
+    """
+
+    def __init__(self, root: str | Path):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.root / INDEX_NAME, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(_SCHEMA)
+
+    def _row(self, row: tuple) -> StoredCapture:
+        id, url, viewport, captured_at, sha256, hash_, path = row
+        return StoredCapture(id, url, viewport, captured_at, sha256, hash_, self.root / path)
+
+    def put(
+        self,
+        data: bytes,
+        url: str,
+        viewport: str | None = None,
+        captured_at: float | None = None,
+        link: str | Path | None = None,
+    ) -> StoredCapture:
+        """画像を保存して撮影を記録する (同じ画像が保存済みなら記録だけ追加する)
+
+        `link` を指定すると、そのパスに保存した画像へのハードリンク (できなければコピー) を作る。
+        """
+        sha256 = hashlib.sha256(data).hexdigest()
+        url = _url_key(url)
+        relative = Path("objects", sha256[:2], f"{sha256}.png")
+        captured_at = time.time() if captured_at is None else captured_at
+        with self._lock:
+            known = self._db.execute("SELECT dhash FROM blobs WHERE sha256 = ?", (sha256,)).fetchone()
+            if known is None:
+                hashed = dhash(data)
+                path = self.root / relative
+                path.parent.mkdir(parents=True, exist_ok=True)
+                # 書きかけのファイルを残さないよう一時ファイルから置き換える
+                partial = path.with_suffix(".tmp")
+                partial.write_bytes(data)
+                os.replace(partial, path)
+                self._db.execute(
+                    "INSERT INTO blobs (sha256, dhash, width, height, size, path) VALUES (?, ?, ?, ?, ?, ?)",
+                    (sha256, *(hashed or (None, None, None)), len(data), str(relative)),
+                )
+                hash_ = hashed[0] if hashed else None
+            else:
+                hash_ = known[0]
+            cursor = self._db.execute(
+                "INSERT INTO captures (url, viewport, captured_at, sha256) VALUES (?, ?, ?, ?)",
+                (url, viewport, captured_at, sha256),
+            )
+            self._db.commit()
+        stored = StoredCapture(
+            cursor.lastrowid, url, viewport, captured_at, sha256, hash_, self.root / relative, known is not None
+        )
+        if link is not None:
+            _link(stored.path, Path(link))
+        return stored
+
+    async def add(
+        self, data: bytes, url: str, viewport: str | None = None, link: str | Path | None = None
+    ) -> StoredCapture:
+        """`put` をスレッドで実行する (ハッシュ計算と書き込みでイベントループを止めない)"""
+        return await asyncio.to_thread(self.put, data, url, viewport, time.time(), link)
+
+    def latest(self, url: str) -> StoredCapture | None:
+        with self._lock:
+            row = self._db.execute(
+                _SELECT + " WHERE c.url = ? ORDER BY c.captured_at DESC, c.id DESC LIMIT 1", (_url_key(url),)
+            ).fetchone()
+        return self._row(row) if row else None
+
+    def history(self, url: str, limit: int | None = None) -> list[StoredCapture]:
+        """URL の撮影を新しい順に返す"""
+        with self._lock:
+            rows = self._db.execute(
+                _SELECT + " WHERE c.url = ? ORDER BY c.captured_at DESC, c.id DESC LIMIT ?", (_url_key(url), limit or -1)
+            ).fetchall()
+        return [self._row(row) for row in rows]
+
+    def states(self, url: str, max_distance: int = 0) -> list[PageState]:
+        """URL の異なる状態を最初に撮影された順に返す
+
+        `max_distance` が 0 なら画像が完全に一致する撮影を、1 以上なら知覚ハッシュの距離が
+        それ以下の撮影を同じ状態とみなす。
+        """
+        states: list[PageState] = []
+        for capture in reversed(self.history(url)):
+            for state in states:
+                same = state.first.sha256 == capture.sha256 or (
+                    max_distance > 0
+                    and state.first.dhash
+                    and capture.dhash
+                    and hamming(state.first.dhash, capture.dhash) <= max_distance
+                )
+                if same:
+                    state.last = capture
+                    state.count += 1
+                    break
+            else:
+                states.append(PageState(capture, capture))
+        return states
+
+    def stats(self) -> StoreStats:
+        with self._lock:
+            captures = self._db.execute("SELECT COUNT(*) FROM captures").fetchone()[0]
+            blobs, size = self._db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM blobs").fetchone()
+        return StoreStats(captures, blobs, size)
+
+    def close(self) -> None:
+        self._db.close()
+
+    def __enter__(self) -> "ScreenshotStore":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def _link(target: Path, link: Path) -> None:
+    link.parent.mkdir(parents=True, exist_ok=True)
+    link.unlink(missing_ok=True)
+    try:
+        os.link(target, link)
+    except OSError:
+        # 別のファイルシステムなどハードリンクできない場合
+        shutil.copyfile(target, link)
@@ -0,0 +1,234 @@
+"""マニフェストを複数のプロセス (それぞれ1つのブラウザ) に分けて撮影する
+
+1つの Python プロセスと1つの Chromium では、Python 側とレンダラーがそれぞれ1コア程度で頭打ちになる。
+ここでは N 個のワーカープロセスがそれぞれ同じ設定 (`ShardConfig`) から `BrowserLauncher` を作り、
+共有のキューから項目を取り出して撮影する (先に終わったワーカーが残りを引き受ける)。
+結果とリクエストの横取りの集計は親プロセスに集めて1つのレポートにまとめ、
+完了した項目はチェックポイント (JSON Lines) に1件ずつ追記する。途中で落ちても、同じチェックポイントで再実行すれば完了済みの項目は撮影しない。
+"""
+import asyncio
+import json
+import multiprocessing
+import queue
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from .asset_cache import InterceptorStats, RequestInterceptor
+from .batch import CaptureItem, CaptureResult
+from .browser_launcher import BrowserLauncher
+from .encoder import EncodeOptions, ImageEncoder
+from .launch_profile import LaunchProfile
+from .lazyload import PreloadOptions
+from .readiness import ReadinessOptions
+from .screen_detector import ScreenInfo
+
+# ワーカーの終了を確認する間隔 (秒)
+_POLL_SECONDS = 0.5
+
+
+@dataclass
+class ShardConfig:
+    """各ワーカーがブラウザを起動・撮影するための設定 (pickle してワーカーに渡す)"""
+
+    screen_info: ScreenInfo | None = None
+    http_credentials: dict[str, str] | None = None
+    browser_channel: str | None = None
+    storage_state: str | None = None
+    readiness: ReadinessOptions | None = None
+    preload: PreloadOptions | None = None
+    interceptor: RequestInterceptor | None = None
+    metrics: bool = False
+    encode: EncodeOptions | None = None
+    concurrency: int = 4
+    isolate: bool = False
+    tiled: bool = False
+    tile_height: int | None = None
+    launch_profile: LaunchProfile | None = None
+
+    def launcher(self) -> BrowserLauncher:
+        return BrowserLauncher(
+            self.screen_info,
+            http_credentials=self.http_credentials,
+            browser_channel=self.browser_channel,
+            storage_state=self.storage_state,
+            readiness=self.readiness,
+            preload=self.preload,
+            interceptor=self.interceptor,
+            metrics=self.metrics,
+            launch_profile=self.launch_profile,
+        )
+
+
+def item_key(item: CaptureItem) -> str:
+    return f"{item.url}\t{item.output}"
+
+
+class Checkpoint:
+    """撮影が完了した項目の記録 (1件1行の JSON を追記する)
+
+    成功した項目だけを完了とみなし、失敗した項目は再実行時にもう一度撮影する。
+    """
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self.completed: set[str] = set()
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue  # 書き込み途中で落ちた最後の行
+                    if record.get("ok"):
+                        self.completed.add(f"{record['url']}\t{record['output']}")
+        except OSError:
+            pass
+
+    def pending(self, items: list[CaptureItem]) -> list[CaptureItem]:
+        return [item for item in items if item_key(item) not in self.completed]
+
+    def record(self, result: CaptureResult) -> None:
+        record = {"url": result.item.url, "output": result.item.output, "ok": result.ok, "error": result.error}
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        if result.ok:
+            self.completed.add(item_key(result.item))
+
+    def remove(self) -> None:
+        self.path.unlink(missing_ok=True)
+
+
+@dataclass
+class ShardReport:
+    results: list[CaptureResult] = field(default_factory=list)
+    # チェックポイントにより撮影しなかった件数
+    resumed: int = 0
+    # 異常終了したワーカーの数
+    crashed: int = 0
+    # 全ワーカーのリクエストの横取りの集計 (横取りしない場合は None)。異常終了したワーカーの分は含まない
+    interceptor: InterceptorStats | None = None
+
+    @property
+    def failed(self) -> int:
+        return sum(1 for r in self.results if not r.ok)
+
+    def summary(self) -> str:
+        ok = len(self.results) - self.failed
+        text = f"{ok} succeeded, {self.failed} failed"
+        if self.resumed:
+            text += f", {self.resumed} already done"
+        if self.crashed:
+            text += f", {self.crashed} worker(s) crashed"
+        return text
+
+
+def _worker_main(worker: int, config: ShardConfig, tasks, results) -> None:
+    """ワーカープロセスの入口"""
+    asyncio.run(_run_worker(worker, config, tasks, results))
+
+
+async def _run_worker(worker: int, config: ShardConfig, tasks, results) -> None:
+    loop = asyncio.get_running_loop()
+    launcher = config.launcher()
+
+    async def next_item() -> tuple[int, CaptureItem] | None:
+        # 共有キューの取り出しはブロッキングのためスレッドで待つ (終端は None)
+        return await loop.run_in_executor(None, tasks.get)
+
+    async with ImageEncoder(config.encode) as encoder:
+        await launcher.capture_stream(
+            next_item,
+            concurrency=config.concurrency,
+            isolate=config.isolate,
+            on_result=lambda result: results.put(("result", result)),
+            encoder=encoder,
+            tiled=config.tiled,
+            tile_height=config.tile_height,
+        )
+    # 横取りの集計はワーカーのプロセス内にしか無いため、終了の通知と一緒に返す
+    results.put(("done", (worker, launcher.interceptor.stats if launcher.interceptor else None)))
+
+
+async def run_sharded(
+    items: list[CaptureItem],
+    config: ShardConfig,
+    processes: int,
+    checkpoint: Checkpoint | None = None,
+    on_result: Callable[[CaptureResult], None] | None = None,
+) -> ShardReport:
+    """`items` を `processes` 個のワーカープロセスで撮影する"""
+    report = ShardReport()
+    pending = checkpoint.pending(items) if checkpoint else list(items)
+    report.resumed = len(items) - len(pending)
+    if not pending:
+        return report
+    processes = max(1, min(processes, len(pending)))
+
+    # ワーカーがイベントループやスレッドの状態を引き継がないよう spawn で起動する
+    context = multiprocessing.get_context("spawn")
+    tasks = context.Queue()
+    results = context.Queue()
+    for index, item in enumerate(pending):
+        tasks.put((index, item))
+    # 各ワーカーの各ページが1つずつ終端を受け取る
+    for _ in range(processes * config.concurrency):
+        tasks.put(None)
+
+    workers = [
+        context.Process(target=_worker_main, args=(worker, config, tasks, results), daemon=True)
+        for worker in range(processes)
+    ]
+    for process in workers:
+        process.start()
+
+    loop = asyncio.get_running_loop()
+    received: dict[str, CaptureResult] = {}
+    finished: set[int] = set()
+
+    def poll() -> tuple[str, object] | None:
+        try:
+            return results.get(timeout=_POLL_SECONDS)
+        except queue.Empty:
+            return None
+
+    try:
+        while True:
+            message = await loop.run_in_executor(None, poll)
+            if message is None:
+                # 結果が届かない間に、終了を知らせずに落ちたワーカーがいないか確認する
+                if all(not process.is_alive() for process in workers):
+                    break
+                continue
+            kind, payload = message
+            if kind == "done":
+                worker, stats = payload
+                finished.add(worker)
+                if stats is not None:
+                    report.interceptor = report.interceptor or InterceptorStats()
+                    report.interceptor.merge(stats)
+                if len(finished) == len(workers):
+                    break
+                continue
+            received[item_key(payload.item)] = payload
+            if checkpoint:
+                checkpoint.record(payload)
+            if on_result:
+                on_result(payload)
+    finally:
+        for process in workers:
+            await loop.run_in_executor(None, process.join, 5)
+            if process.is_alive():
+                process.terminate()
+        tasks.cancel_join_thread()
+
+    report.crashed = sum(1 for worker, process in enumerate(workers) if worker not in finished)
+    for item in pending:
+        if (result := received.get(item_key(item))) is None:
+            # 異常終了したワーカーが処理中だった項目 (チェックポイントに残らないため再実行で撮影される)
+            result = CaptureResult(item, ok=False, error="worker exited before finishing this item")
+            if on_result:
+                on_result(result)
+        report.results.append(result)
+    return report
@@ -0,0 +1,231 @@
+"""タイル分割によるページ全体のスクリーンショット
+
+Chromium に巨大な1枚のビットマップを要求する代わりに、ページをスクロールしながら
+表示領域ごとに撮影し、ストリーミング PNG ライターで1枚に結合する。Python 側で
+保持するのは1タイル分の行だけなので、ページの高さに関係なくメモリ使用量は一定。
+
+固定 (position: fixed) 要素は2枚目以降のタイルで非表示にし、追従 (position: sticky)
+要素は通常の配置に戻すことで、ヘッダーが全タイルに繰り返し写り込むのを防ぐ。
+タイルのデコードには Pillow が必要 (`uv sync --extra image`)。
+"""
+import asyncio
+import io
+import os
+import struct
+import time
+import zlib
+from dataclasses import dataclass
+from pathlib import Path
+
+from playwright.async_api import Error as PlaywrightError, Page
+
+from .procstat import process_rss
+
+_PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+_IDAT_CHUNK_SIZE = 256 * 1024
+
+_METRICS_SCRIPT = """
+() => ({
+    width: document.documentElement.clientWidth,
+    viewportHeight: window.innerHeight,
+    scale: window.devicePixelRatio,
+    height: Math.max(document.documentElement.scrollHeight, document.body ? document.body.scrollHeight : 0),
+})
+"""
+
+_PIN_OVERLAYS_SCRIPT = """
+(hideFixed) => {
+    for (const el of document.querySelectorAll('body *')) {
+        if (el.dataset.vrTiledStyle !== undefined) continue;
+        const position = getComputedStyle(el).position;
+        if (position === 'sticky') {
+            el.dataset.vrTiledStyle = el.style.cssText;
+            el.style.setProperty('position', 'relative', 'important');
+        } else if (position === 'fixed' && hideFixed) {
+            el.dataset.vrTiledStyle = el.style.cssText;
+            el.style.setProperty('visibility', 'hidden', 'important');
+        }
+    }
+}
+"""
+
+_RESTORE_OVERLAYS_SCRIPT = """
+() => {
+    for (const el of document.querySelectorAll('[data-vr-tiled-style]')) {
+        el.style.cssText = el.dataset.vrTiledStyle;
+        delete el.dataset.vrTiledStyle;
+    }
+    window.scrollTo(0, 0);
+}
+"""
+
+
+class StreamingPNGWriter:
+    """行単位で書き込める 8bit RGB の PNG ライター
+
+    圧縮済みデータは一定サイズごとに IDAT チャンクとして書き出すため、
+    画像全体をメモリに保持しない。
+    """
+
+    def __init__(self, path: str | Path, width: int, height: int, compress_level: int = 6):
+        self.width = width
+        self.height = height
+        self.rows_written = 0
+        self._file = open(path, "wb")
+        self._compressor = zlib.compressobj(compress_level)
+        self._buffer = bytearray()
+        self._file.write(_PNG_SIGNATURE)
+        self._write_chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+
+    def _write_chunk(self, kind: bytes, data: bytes) -> None:
+        self._file.write(struct.pack(">I", len(data)))
+        self._file.write(kind)
+        self._file.write(data)
+        self._file.write(struct.pack(">I", zlib.crc32(kind + data) & 0xFFFFFFFF))
+
+    def _flush_idat(self, force: bool = False) -> None:
+        while len(self._buffer) >= _IDAT_CHUNK_SIZE or (force and self._buffer):
+            chunk = bytes(self._buffer[:_IDAT_CHUNK_SIZE])
+            del self._buffer[:_IDAT_CHUNK_SIZE]
+            self._write_chunk(b"IDAT", chunk)
+
+    def write_rows(self, pixels: bytes) -> None:
+        """RGB の生データ (幅 x 行数 x 3 バイト) を追記する"""
+        stride = self.width * 3
+        if len(pixels) % stride:
+            raise ValueError(f"Row data length {len(pixels)} is not a multiple of stride {stride}")
+        rows = len(pixels) // stride
+        if self.rows_written + rows > self.height:
+            raise ValueError("Too many rows for declared image height")
+        for i in range(rows):
+            # フィルタなし (0) + 1行分の画素
+            self._buffer += self._compressor.compress(b"\x00" + pixels[i * stride:(i + 1) * stride])
+        self.rows_written += rows
+        self._flush_idat()
+
+    def close(self) -> None:
+        if self._file.closed:
+            return
+        if self.rows_written != self.height:
+            self.abort()
+            raise ValueError(f"Wrote {self.rows_written} rows, expected {self.height}")
+        try:
+            self._buffer += self._compressor.flush()
+            self._flush_idat(force=True)
+            self._write_chunk(b"IEND", b"")
+        finally:
+            self._file.close()
+
+    def abort(self) -> None:
+        """書きかけのファイルを閉じて削除する"""
+        if not self._file.closed:
+            self._file.close()
+            Path(self._file.name).unlink(missing_ok=True)
+
+    def __enter__(self) -> "StreamingPNGWriter":
+        return self
+
+    def __exit__(self, exc_type, *exc) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+@dataclass
+class TiledReport:
+    path: str
+    width: int
+    height: int
+    tiles: int
+    peak_rss_bytes: int
+    elapsed: float
+
+    def summary(self) -> str:
+        # /proc が無い環境では RSS を測れないので表示しない
+        peak = f"peak RSS {self.peak_rss_bytes / 1_000_000:.1f}MB, " if self.peak_rss_bytes else ""
+        return f"{self.width}x{self.height}px in {self.tiles} tiles, {peak}{self.elapsed:.2f}s"
+
+
+async def capture_tiled(
+    page: Page,
+    path: str | Path,
+    tile_height: int | None = None,
+    max_height: int | None = None,
+) -> TiledReport:
+    """ページ全体をタイル分割で撮影して PNG に書き込む
+
+    `tile_height` は CSS ピクセル単位 (省略時は表示領域の高さ)。`max_height` を
+    超える部分は撮影しない。ピークメモリは Pillow のバッファを含めるため、タイルを
+デコードしている間の自プロセスの RSS (`/proc`) の最大値で計測する。
+    """
+    try:
+        from PIL import Image
+    except ImportError as e:
+        raise RuntimeError("Tiled capture requires Pillow: uv sync --extra image") from e
+
+    start = time.monotonic()
+    pid = os.getpid()
+    peak = process_rss(pid)
+
+    metrics = await page.evaluate(_METRICS_SCRIPT)
+    # 幅はスクロールバーを除いた幅 (撮影画像はスクロールバーを含む表示領域全体なので、倍率には使わない)
+    css_width = metrics["width"]
+    scale = metrics["scale"]
+    viewport_height = metrics["viewportHeight"]
+    total_height = metrics["height"] if max_height is None else min(metrics["height"], max_height)
+    step = min(tile_height or viewport_height, viewport_height)
+
+    tiles = 0
+    writer: StreamingPNGWriter | None = None
+    last_row = b""
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+
+    def write_tile(data: bytes, top_css: float, rows_css: int) -> None:
+        nonlocal writer, last_row, peak
+        with Image.open(io.BytesIO(data)) as image:
+            if writer is None:
+                writer = StreamingPNGWriter(path, round(css_width * scale), round(total_height * scale))
+            top = round(top_css * scale)
+            bottom = min(top + round(rows_css * scale), image.height, top + writer.height - writer.rows_written)
+            pixels = image.crop((0, top, writer.width, bottom)).convert("RGB").tobytes()
+            peak = max(peak, process_rss(pid))
+        writer.write_rows(pixels)
+        last_row = pixels[-writer.width * 3:]
+
+    try:
+        await page.evaluate(_PIN_OVERLAYS_SCRIPT, False)
+        y = 0
+        while y < total_height:
+            scroll_y = await page.evaluate("(y) => { window.scrollTo(0, y); return window.scrollY; }", y)
+            data = await page.screenshot()
+            # 最終タイルはスクロールしきれない分だけ表示領域の下側にずれる
+            # デコードと圧縮はスレッドで行い、イベントループを止めない
+            await asyncio.to_thread(write_tile, data, y - scroll_y, min(step, total_height - y))
+            del data
+            tiles += 1
+            # 2枚目以降は固定ヘッダーなどを写さない (スクロールで固定化される要素も対象)
+            await page.evaluate(_PIN_OVERLAYS_SCRIPT, True)
+            y += step
+        if writer is not None:
+            if writer.rows_written < writer.height:
+                # 端数の丸めで不足した行は最終行を複製して埋める
+                writer.write_rows(last_row * (writer.height - writer.rows_written))
+            writer.close()
+    finally:
+        try:
+            await page.evaluate(_RESTORE_OVERLAYS_SCRIPT)
+        except PlaywrightError:
+            # ページが閉じられた場合など。撮影中の例外があればそちらを優先する
+            pass
+        if writer is not None:
+            writer.abort()
+
+    return TiledReport(
+        path=str(path),
+        width=writer.width if writer else 0,
+        height=writer.height if writer else 0,
+        tiles=tiles,
+        peak_rss_bytes=peak,
+        elapsed=time.monotonic() - start,
+    )
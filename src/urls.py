@@ -0,0 +1,58 @@
+"""ブラウザを使わない URL の正規化 (クロールの重複判定)
+
+CLI の引数解析からも参照するため、Playwright に依存しないモジュールに分けている。
+"""
+import posixpath
+from fnmatch import fnmatch
+from urllib.parse import parse_qsl, urlencode, urljoin, urlparse, urlunparse
+
+# 計測用のパラメータ (ページの内容は変わらない)
+DEFAULT_DROP_PARAMS = ("utm_*", "fbclid", "gclid", "msclkid", "_ga", "mc_cid", "mc_eid")
+# セッションを破棄したりデータを変更したりするリンクは辿らない
+DEFAULT_EXCLUDE = ("*logout*", "*log_out*", "*signout*", "*sign_out*", "*delete*")
+_DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def origin_of(url: str) -> str:
+    parsed = urlparse(url)
+    return f"{parsed.scheme}://{parsed.netloc}"
+
+
+def canonicalize_url(
+    url: str,
+    base: str | None = None,
+    drop_params: tuple[str, ...] = DEFAULT_DROP_PARAMS,
+    ignore_query: bool = False,
+) -> str | None:
+    """URL を正規化する (http(s) 以外と、ポート番号などが不正な URL は None)
+
+    スキーム・ホストの小文字化、既定ポートとフラグメントの除去、`.` / `..` の解決、
+    `drop_params` に一致するクエリパラメータの除去とパラメータの並べ替えを行う。
+    """
+    try:
+        url = urljoin(base, url) if base else url
+        parsed = urlparse(url.strip())
+        port = parsed.port
+    except ValueError:
+        # `http://a:99999/` / `http://a:abc/` / `http://[::1/` など
+        return None
+    scheme = parsed.scheme.lower()
+    if scheme not in _DEFAULT_PORTS or not parsed.hostname:
+        return None
+    netloc = parsed.hostname.lower()
+    if port and port != _DEFAULT_PORTS[scheme]:
+        netloc += f":{port}"
+    path = parsed.path or "/"
+    if path != "/":
+        normalized = posixpath.normpath(path)
+        path = normalized + ("/" if path.endswith("/") and normalized != "/" else "")
+        path = "/" + path.lstrip("/")
+    query = ""
+    if not ignore_query:
+        params = [
+            (k, v)
+            for k, v in parse_qsl(parsed.query, keep_blank_values=True)
+            if not any(fnmatch(k, pattern) for pattern in drop_params)
+        ]
+        query = urlencode(sorted(params))
+    return urlunparse((scheme, netloc, path, "", query, ""))
@@ -0,0 +1,182 @@
+"""撮影と同じページ読み込みで表示性能の指標を記録する
+
+コンテキストの初期化スクリプトで PerformanceObserver を登録しておき、描画完了の判定後に
+Navigation Timing・FCP・LCP・CLS・転送量・リクエスト数・Long Task を回収する。
+別のツールでページを開き直す必要はない。
+
+転送量 (transferSize) は Timing-Allow-Origin のない別オリジンのリソースでは 0 になるため、
+主に自サイトのリソースの量として扱うこと。
+"""
+import json
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from pathlib import Path
+
+from playwright.async_api import Page
+
+from .profiling import percentile
+
+METRICS_NAME = "metrics.jsonl"
+
+# ナビゲーションごとに (初期化スクリプトとして) 実行される。サブフレームでは何もしない
+OBSERVER_SCRIPT = """
+(() => {
+    if (window.top !== window || window.__virtualResolutionMetrics) return;
+    const state = window.__virtualResolutionMetrics = {
+        lcp: null, shifts: [], longTasks: [], resources: 0, transferBytes: 0,
+    };
+    const observe = (type, callback) => {
+        try {
+            new PerformanceObserver((list) => list.getEntries().forEach(callback))
+                .observe({ type, buffered: true });
+        } catch (e) {
+            // この種類に対応していないブラウザ
+        }
+    };
+    observe('largest-contentful-paint', (e) => { state.lcp = e.renderTime || e.loadTime || e.startTime; });
+    observe('layout-shift', (e) => {
+        if (!e.hadRecentInput) state.shifts.push([e.startTime, e.value]);
+    });
+    observe('longtask', (e) => { state.longTasks.push([e.startTime, e.duration]); });
+    // リソースタイミングのバッファ上限 (既定 250 件) に影響されないよう、観測で数える
+    observe('resource', (e) => {
+        state.resources += 1;
+        state.transferBytes += e.transferSize || 0;
+    });
+})();
+"""
+
+_COLLECT_SCRIPT = """
+() => {
+    const state = window.__virtualResolutionMetrics || {
+        lcp: null, shifts: [], longTasks: [],
+        resources: performance.getEntriesByType('resource').length,
+        transferBytes: performance.getEntriesByType('resource').reduce((sum, e) => sum + (e.transferSize || 0), 0),
+    };
+    const nav = performance.getEntriesByType('navigation')[0];
+    const fcpEntry = performance.getEntriesByName('first-contentful-paint')[0];
+    const fcp = fcpEntry ? fcpEntry.startTime : null;
+
+    // CLS: 間隔1秒以内・最長5秒のまとまりごとの合計の最大値 (web-vitals と同じ定義)
+    let cls = 0, windowValue = 0, windowStart = 0, previous = 0;
+    for (const [time, value] of state.shifts) {
+        if (windowValue && (time - previous > 1000 || time - windowStart > 5000)) {
+            windowValue = 0;
+        }
+        if (!windowValue) windowStart = time;
+        windowValue += value;
+        previous = time;
+        cls = Math.max(cls, windowValue);
+    }
+    // TBT: FCP 以降の Long Task のうち 50ms を超えた部分の合計
+    const blocking = state.longTasks
+        .filter(([start]) => fcp === null || start >= fcp)
+        .reduce((sum, [, duration]) => sum + Math.max(0, duration - 50), 0);
+
+    return {
+        ttfb: nav ? nav.responseStart : null,
+        domContentLoaded: nav && nav.domContentLoadedEventEnd ? nav.domContentLoadedEventEnd : null,
+        load: nav && nav.loadEventEnd ? nav.loadEventEnd : null,
+        fcp,
+        lcp: state.lcp,
+        cls,
+        transferBytes: (nav ? nav.transferSize || 0 : 0) + state.transferBytes,
+        requests: (nav ? 1 : 0) + state.resources,
+        longTasks: state.longTasks.length,
+        totalBlockingTime: blocking,
+    };
+}
+"""
+
+# パーセンタイルを集計する指標 (時間はミリ秒)
+METRIC_FIELDS = (
+    "ttfb",
+    "dom_content_loaded",
+    "load",
+    "fcp",
+    "lcp",
+    "cls",
+    "transfer_bytes",
+    "requests",
+    "long_tasks",
+    "total_blocking_time",
+)
+
+
+@dataclass
+class PageMetrics:
+    url: str
+    ttfb: float | None = None
+    dom_content_loaded: float | None = None
+    load: float | None = None
+    fcp: float | None = None
+    lcp: float | None = None
+    cls: float = 0.0
+    transfer_bytes: int = 0
+    requests: int = 0
+    long_tasks: int = 0
+    total_blocking_time: float = 0.0
+
+    def summary(self) -> str:
+        def ms(value: float | None) -> str:
+            return f"{value:.0f}ms" if value is not None else "-"
+
+        return (
+            f"TTFB {ms(self.ttfb)}, FCP {ms(self.fcp)}, LCP {ms(self.lcp)}, CLS {self.cls:.3f}, "
+            f"TBT {ms(self.total_blocking_time)}, {self.requests} requests, {self.transfer_bytes / 1024:.0f} KiB"
+        )
+
+
+async def collect_metrics(page: Page) -> PageMetrics:
+    """描画完了後のページから指標を回収する (`OBSERVER_SCRIPT` を初期化スクリプトとして登録しておくこと)"""
+    result = await page.evaluate(_COLLECT_SCRIPT)
+    return PageMetrics(
+        url=page.url,
+        ttfb=result["ttfb"],
+        dom_content_loaded=result["domContentLoaded"],
+        load=result["load"],
+        fcp=result["fcp"],
+        lcp=result["lcp"],
+        cls=result["cls"],
+        transfer_bytes=int(result["transferBytes"]),
+        requests=result["requests"],
+        long_tasks=result["longTasks"],
+        total_blocking_time=result["totalBlockingTime"],
+    )
+
+
+def metrics_path_for(output: str | Path) -> Path:
+    """スクリーンショットと同じディレクトリの metrics.jsonl"""
+    return Path(output).parent / METRICS_NAME
+
+
+def append_metrics(metrics: PageMetrics, output: str | Path, path: str | Path | None = None) -> Path:
+    """1件を1行の JSON として `path` (省略時: スクリーンショットの隣の metrics.jsonl) に追記する"""
+    path = Path(path) if path else metrics_path_for(output)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    record = {"captured_at": datetime.now().isoformat(timespec="seconds"), "output": str(output), **asdict(metrics)}
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(record, ensure_ascii=False) + "\n")
+    return path
+
+
+def summarize_metrics(metrics: list[PageMetrics]) -> dict[str, dict[str, float]]:
+    """指標ごとの件数・p50/p95/max (値のない指標は除く)"""
+    summary = {}
+    for name in METRIC_FIELDS:
+        values = [value for m in metrics if (value := getattr(m, name)) is not None]
+        if values:
+            summary[name] = {
+                "count": len(values),
+                "p50": percentile(values, 50),
+                "p95": percentile(values, 95),
+                "max": max(values),
+            }
+    return summary
+
+
+def format_metrics_summary(summary: dict[str, dict[str, float]]) -> str:
+    lines = [f"{'metric':<20} {'count':>6} {'p50':>10} {'p95':>10} {'max':>10}"]
+    for name, s in summary.items():
+        lines.append(f"{name:<20} {s['count']:>6} {s['p50']:>10.4g} {s['p95']:>10.4g} {s['max']:>10.4g}")
+    return "\n".join(lines)
@@ -5,48 +5,161 @@ Usage:
 
 Example:
     uv run python take_screenshot.py "/raw-stocks?mode=search" screenshots/raw_stocks.png -f
+    uv run python take_screenshot.py / screenshots/site --crawl
+
+常駐デーモン (`virtual-resolution daemon`) が起動していればジョブを委譲し、
+起動していなければこのプロセス内でブラウザを起動する。
 """
 import argparse
 import asyncio
 from pathlib import Path
-from src import detect_screen_info, BrowserLauncher
+from src import resolve_screen_info_async, BrowserLauncher
+from src.browser_launcher import LoginForm, default_session_path
+from src.crawler import CrawlOptions, Crawler
+from src.daemon import CaptureJob, DaemonUnavailable, request_capture
+from src.launch_profile import HEADLESS
+from src.lazyload import PreloadOptions
+from src.profiling import Profiler
+from src.readiness import ReadinessOptions
 
 BASE_URL = "http://localhost"
+LOGIN = LoginForm(
+    url=f"{BASE_URL}/users/login",
+    fields={
+        'input[name="employee_number"]': "1",
+        'input[name="password"]': "admin",
+    },
+    submit='button[name="login"]',
+)
+READINESS = ReadinessOptions()
+# ページ全体の撮影前に遅延読み込みの画像などを読み込ませる
+PRELOAD = PreloadOptions()
+
+
+async def run_via_daemon(url: str, output: str, full_page: bool, session: Path | None) -> bool:
+    """デーモン経由で撮影する。デーモン未起動なら False を返す"""
+    job = CaptureJob(
+        url=url,
+        output=output,
+        full_page=full_page,
+        login=LOGIN,
+        storage_state=str(session) if session else None,
+        readiness=READINESS,
+        preload=PRELOAD,
+    )
+    try:
+        result = await request_capture(job)
+    except DaemonUnavailable:
+        return False
+    if not result.ok:
+        raise SystemExit(f"Screenshot failed: {result.error}")
+    print(f"Screenshot saved: {result.path}")
+    return True
 
 
-async def run(path: str, output: str, full_page: bool) -> None:
-    screen = detect_screen_info()
-    launcher = BrowserLauncher(screen)
+async def run(
+    path: str,
+    output: str,
+    full_page: bool,
+    use_daemon: bool = True,
+    use_session: bool = True,
+    profile: str | None = None,
+    headless: bool = False,
+) -> None:
+    url = f"{BASE_URL}{path}"
+    # ログイン済みセッションを保存・再利用し、期限切れの場合のみ再ログインする
+    session = default_session_path(BASE_URL) if use_session else None
+    if use_daemon and not (profile or headless) and await run_via_daemon(url, output, full_page, session):
+        return
+
+    # 画面検出 (キャッシュ優先) はブラウザ起動と並行に実行する
+    profiler = Profiler(enabled=bool(profile))
+    # ヘッドレスでは表示しないため画面検出を省略する
+    screen_task = asyncio.create_task(
+        profiler.measure("detect_screen", resolve_screen_info_async(detect=not headless))
+    )
+    launcher = BrowserLauncher(
+        None,
+        storage_state=session,
+        readiness=READINESS,
+        profiler=profiler,
+        preload=PRELOAD,
+        launch_profile=HEADLESS if headless else None,
+    )
 
     async with launcher.launch() as page:
-        # ログイン
-        await page.goto(f"{BASE_URL}/users/login")
-        await page.wait_for_load_state("networkidle")
-        await page.fill('input[name="employee_number"]', "1")
-        await page.fill('input[name="password"]', "admin")
-        await page.click('button[name="login"]')
-        await page.wait_for_load_state("networkidle")
-
-        # 対象ページへ遷移
-        url = f"{BASE_URL}{path}"
-        await page.goto(url)
-        await page.wait_for_load_state("networkidle")
-        await page.wait_for_timeout(1000)
+        launcher.screen_info = await screen_task
+
+        # 対象ページへ遷移 (セッション切れの場合はログインしてから) し、描画完了まで待つ
+        if await launcher.open_authenticated(page, url, LOGIN):
+            print("Logged in")
+        print(f"Ready: {launcher.readiness_reports[-1].summary()}")
+
+        if full_page:
+            print(f"Preloaded: {(await launcher.preload_lazy_content(page)).summary()}")
 
         # スクリーンショット
         out = Path(output)
         out.parent.mkdir(parents=True, exist_ok=True)
-        await page.screenshot(path=str(out), full_page=full_page)
+        await launcher.take_screenshot(page, str(out), full_page=full_page)
         print(f"Screenshot saved: {out}")
 
+    if profile:
+        profiler.write(profile)
+        print(profiler.format_summary())
+
+
+async def run_crawl(
+    path: str, output_dir: str, full_page: bool, use_session: bool = True, headless: bool = False
+) -> int:
+    """path から同一オリジンのリンクを辿って全ページを撮影し、失敗件数を返す"""
+    session = default_session_path(BASE_URL) if use_session else None
+    launcher = BrowserLauncher(
+        None,
+        storage_state=session,
+        readiness=READINESS,
+        preload=PRELOAD,
+        launch_profile=HEADLESS if headless else None,
+    )
+    crawler = Crawler(
+        launcher,
+        f"{BASE_URL}{path}",
+        output_dir,
+        CrawlOptions(full_page=full_page),
+        login=LOGIN,
+        on_result=lambda r: print(f"{'Saved' if r.ok else 'Failed'}: {r.item.url} -> {r.path or r.error}"),
+    )
+    report = await crawler.run()
+    print(f"Crawl finished: {report.summary()}")
+    return report.failed
+
 
 def main():
     parser = argparse.ArgumentParser(description="認証付きスクリーンショット")
     parser.add_argument("path", help="URLパス (例: /raw-stocks?mode=search)")
-    parser.add_argument("output", help="出力ファイルパス")
+    parser.add_argument("output", help="出力ファイルパス (--crawl の場合は出力ディレクトリ)")
     parser.add_argument("-f", "--full-page", action="store_true")
+    parser.add_argument("--no-daemon", action="store_true", help="常駐デーモンを使わずに起動する")
+    parser.add_argument("--no-session", action="store_true", help="保存済みセッションを使わず毎回ログインする")
+    parser.add_argument("--profile", metavar="PATH", help="処理段階ごとの所要時間を保存 (デーモンは使わない)")
+    parser.add_argument("--crawl", action="store_true", help="path から同一オリジンのリンクを辿って全ページを撮影")
+    parser.add_argument("--headless", action="store_true", help="撮影専用の軽量な設定 (ヘッドレス) で起動する")
     args = parser.parse_args()
-    asyncio.run(run(args.path, args.output, args.full_page))
+    if args.crawl:
+        if asyncio.run(run_crawl(args.path, args.output, args.full_page, not args.no_session, args.headless)):
+            raise SystemExit(1)
+        return
+    asyncio.run(
+        run(
+            args.path,
+            args.output,
+            args.full_page,
+            not args.no_daemon,
+            not args.no_session,
+            args.profile,
+            args.headless,
+        )
+    )
 
 
 if __name__ == "__main__":
@@ -0,0 +1,164 @@
+import time
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from src.asset_cache import AssetCache, RequestInterceptor, freshness_lifetime
+from src.block_rules import AD_HOSTS, BlockRules, parse_block_rules
+
+
+def _route(url="https://cdn.example.com/app.js", resource_type="script", method="GET"):
+    route = MagicMock()
+    route.request.url = url
+    route.request.method = method
+    route.request.resource_type = resource_type
+    route.request.headers = {"accept": "*/*"}
+    route.fulfill = AsyncMock()
+    route.fallback = AsyncMock()
+    route.abort = AsyncMock()
+    route.fetch = AsyncMock()
+    return route
+
+
+def _response(status=200, headers=None, body=b"console.log(1)"):
+    response = MagicMock()
+    response.status = status
+    response.headers = headers if headers is not None else {"cache-control": "max-age=3600"}
+    response.body = AsyncMock(return_value=body)
+    return response
+
+
+class TestFreshnessLifetime:
+    def test_max_age_minus_age(self):
+        assert freshness_lifetime({"cache-control": "public, max-age=600", "age": "100"}, 0) == 500
+
+    def test_malformed_age_and_max_age_count_as_zero(self):
+        assert freshness_lifetime({"cache-control": "max-age=600", "age": "abc"}, 0) == 600
+        assert freshness_lifetime({"cache-control": "max-age=-5", "age": "1.5"}, 0) == 0
+
+    def test_no_store_and_no_cache(self):
+        assert freshness_lifetime({"cache-control": "no-store"}, 0) is None
+        assert freshness_lifetime({"cache-control": "no-cache"}, 0) == 0.0
+
+    def test_expires_relative_to_date(self):
+        headers = {"date": "Mon, 01 Jan 2024 00:00:00 GMT", "expires": "Mon, 01 Jan 2024 01:00:00 GMT"}
+        assert freshness_lifetime(headers, 0) == 3600
+
+    def test_heuristic_from_last_modified(self):
+        headers = {"date": "Thu, 11 Jan 2024 00:00:00 GMT", "last-modified": "Mon, 01 Jan 2024 00:00:00 GMT"}
+        assert freshness_lifetime(headers, 0) == pytest.approx(86400)
+
+    def test_no_headers_is_not_cacheable(self):
+        assert freshness_lifetime({}, 0) is None
+
+
+class TestAssetCache:
+    def test_store_and_lookup(self, tmp_path):
+        cache = AssetCache(tmp_path)
+        headers = {"cache-control": "max-age=60", "content-encoding": "gzip", "content-type": "text/css"}
+        entry = cache.store("https://example.com/a.css", 200, headers, b"body{}")
+        loaded = cache.lookup("https://example.com/a.css")
+        assert loaded == entry
+        assert "content-encoding" not in loaded.headers
+        assert cache.read_body(loaded) == b"body{}"
+        assert cache.is_fresh(loaded)
+
+    def test_same_content_is_stored_once(self, tmp_path):
+        cache = AssetCache(tmp_path)
+        headers = {"cache-control": "max-age=60"}
+        a = cache.store("https://a.example.com/x.js", 200, headers, b"same")
+        b = cache.store("https://b.example.com/y.js", 200, headers, b"same")
+        assert a.digest == b.digest
+        assert len(list((tmp_path / "blobs").rglob("*"))) == 2  # 1ディレクトリ + 1ファイル
+
+    def test_uncacheable_responses_are_not_stored(self, tmp_path):
+        cache = AssetCache(tmp_path)
+        assert cache.store("https://example.com/a", 200, {"cache-control": "no-store"}, b"x") is None
+        assert cache.store("https://example.com/b", 404, {"cache-control": "max-age=60"}, b"x") is None
+        assert cache.store("https://example.com/c", 200, {}, b"x") is None
+        assert cache.lookup("https://example.com/a") is None
+
+    def test_force_ignores_headers(self, tmp_path):
+        cache = AssetCache(tmp_path, force=True)
+        entry = cache.store("https://example.com/a", 200, {"cache-control": "no-store"}, b"x")
+        assert entry is not None
+        entry.expires = time.time() - 1
+        assert cache.is_fresh(entry)
+
+    def test_refresh_extends_expiry(self, tmp_path):
+        cache = AssetCache(tmp_path)
+        entry = cache.store("https://example.com/a", 200, {"cache-control": "no-cache", "etag": '"v1"'}, b"x")
+        assert not cache.is_fresh(entry, now=time.time() + 1)
+        refreshed = cache.refresh(entry, {"cache-control": "max-age=600"})
+        assert cache.is_fresh(refreshed)
+        assert cache.lookup("https://example.com/a").headers["etag"] == '"v1"'
+
+
+class TestBlockRules:
+    def test_host_matches_subdomains(self):
+        rules = BlockRules(hosts=("doubleclick.net", "*.tracker.io"))
+        assert rules.matches_host("doubleclick.net")
+        assert rules.matches_host("stats.g.doubleclick.net")
+        assert not rules.matches_host("notdoubleclick.net")
+        assert rules.matches_host("a.tracker.io")
+
+    def test_parse_block_rules(self):
+        rules = parse_block_rules("media, font", ["example.org"], ads=True)
+        assert rules.resource_types == {"media", "font"}
+        assert rules.hosts[0] == "example.org"
+        assert set(AD_HOSTS) <= set(rules.hosts)
+        assert not parse_block_rules()
+
+    def test_unknown_resource_type(self):
+        with pytest.raises(ValueError, match="Unknown resource type"):
+            parse_block_rules("document")
+
+
+class TestRequestInterceptor:
+    @pytest.mark.asyncio
+    async def test_blocked_request_is_aborted(self):
+        interceptor = RequestInterceptor(block=BlockRules(hosts=AD_HOSTS))
+        route = _route("https://www.googletagmanager.com/gtm.js")
+        await interceptor._handle(route)
+        route.abort.assert_awaited_once_with("blockedbyclient")
+        assert interceptor.stats.blocked == 1
+
+    @pytest.mark.asyncio
+    async def test_non_cacheable_request_falls_back(self, tmp_path):
+        interceptor = RequestInterceptor(AssetCache(tmp_path))
+        route = _route("https://example.com/api", resource_type="fetch")
+        await interceptor._handle(route)
+        route.fallback.assert_awaited_once()
+        route.fetch.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_miss_then_hit_across_interceptors(self, tmp_path):
+        first = RequestInterceptor(AssetCache(tmp_path))
+        route = _route()
+        route.fetch.return_value = _response()
+        await first._handle(route)
+        assert first.stats.misses == 1
+        assert first.stats.stored == 1
+
+        # 別の実行 (新しいインターセプター) でもディスクから返す
+        second = RequestInterceptor(AssetCache(tmp_path))
+        route = _route()
+        await second._handle(route)
+        route.fetch.assert_not_awaited()
+        assert route.fulfill.await_args.kwargs["body"] == b"console.log(1)"
+        assert second.stats.hits == 1
+        assert second.stats.bytes_saved == len(b"console.log(1)")
+
+    @pytest.mark.asyncio
+    async def test_stale_entry_is_revalidated(self, tmp_path):
+        cache = AssetCache(tmp_path)
+        cache.store(
+            "https://cdn.example.com/app.js", 200, {"cache-control": "no-cache", "etag": '"v1"'}, b"cached"
+        )
+        interceptor = RequestInterceptor(cache)
+        route = _route()
+        route.fetch.return_value = _response(status=304, headers={"cache-control": "max-age=60"})
+        await interceptor._handle(route)
+
+        assert route.fetch.await_args.kwargs["headers"]["if-none-match"] == '"v1"'
+        assert route.fulfill.await_args.kwargs["body"] == b"cached"
+        assert interceptor.stats.revalidated == 1
@@ -0,0 +1,40 @@
+import pytest
+from src import CaptureItem, load_manifest
+
+
+class TestLoadManifest:
+    def test_rows_with_and_without_full_page(self, tmp_path):
+        manifest = tmp_path / "pages.csv"
+        manifest.write_text(
+            "https://example.com/,out/top.png\n"
+            "https://example.com/list,out/list.png,true\n"
+        )
+        items = load_manifest(manifest)
+        assert items == [
+            CaptureItem("https://example.com/", "out/top.png", False),
+            CaptureItem("https://example.com/list", "out/list.png", True),
+        ]
+
+    def test_header_comments_and_blank_lines_are_skipped(self, tmp_path):
+        manifest = tmp_path / "pages.csv"
+        manifest.write_text(
+            "url,output,full_page\n"
+            "# comment\n"
+            "\n"
+            "https://example.com/,a.png,0\n"
+        )
+        items = load_manifest(manifest)
+        assert items == [CaptureItem("https://example.com/", "a.png", False)]
+
+    def test_missing_output_raises(self, tmp_path):
+        manifest = tmp_path / "pages.csv"
+        manifest.write_text("https://example.com/\n")
+        with pytest.raises(ValueError, match="output path is required"):
+            load_manifest(manifest)
+
+    def test_regions_column(self, tmp_path):
+        manifest = tmp_path / "pages.csv"
+        manifest.write_text('https://example.com/,out/top.png,false,"header=#header; 0,0,200x100"\n')
+        item = load_manifest(manifest)[0]
+        assert [r.name for r in item.regions] == ["header", "0_0_200x100"]
+        assert item.regions[1].clip == (0, 0, 200, 100)
@@ -0,0 +1,143 @@
+import base64
+import urllib.request
+from urllib.error import HTTPError
+
+import pytest
+from benchmarks.fixtures import AUTH_PASSWORD, AUTH_USER, FixtureServer, synthetic_png
+from benchmarks.regression import HIGHER, find_regressions, metric
+from benchmarks.run import profile_gains
+from benchmarks.startup import (
+    DEFAULT_BUDGET_MS,
+    heavy_imports,
+    measure_imports,
+    measure_startup,
+    parse_importtime,
+)
+
+
+@pytest.fixture(scope="module")
+def server():
+    with FixtureServer() as server:
+        yield server
+
+
+def _get(url: str, headers: dict | None = None) -> tuple[int, bytes]:
+    request = urllib.request.Request(url, headers=headers or {})
+    try:
+        with urllib.request.urlopen(request, timeout=5) as response:
+            return response.status, response.read()
+    except HTTPError as e:
+        return e.code, b""
+
+
+class TestFixtureServer:
+    def test_pages_are_served(self, server):
+        for path in ["/static", "/images?n=2", "/tall?height=1000", "/lazy?n=2", "/slow?delay=10"]:
+            status, body = _get(server.url(path))
+            assert status == 200
+            assert body.startswith(b"<!doctype html>")
+
+    def test_images_page_references_n_images(self, server):
+        _, body = _get(server.url("/images?n=3"))
+        assert body.count(b"<img") == 3
+
+    def test_image_is_valid_png(self, server):
+        status, body = _get(server.url("/img/0.png"))
+        assert status == 200
+        assert body == synthetic_png(512, 512, 0)
+        assert body.startswith(b"\x89PNG\r\n\x1a\n")
+
+    def test_image_does_not_compress(self):
+        assert len(synthetic_png(64, 64, 1)) >= 64 * 64 * 3
+
+    def test_same_seed_gives_same_image(self):
+        assert synthetic_png.__wrapped__(32, 32, 3) == synthetic_png.__wrapped__(32, 32, 3)
+        assert synthetic_png.__wrapped__(32, 32, 3) != synthetic_png.__wrapped__(32, 32, 4)
+
+    def test_auth_requires_credentials(self, server):
+        assert _get(server.url("/auth"))[0] == 401
+        token = base64.b64encode(f"{AUTH_USER}:{AUTH_PASSWORD}".encode()).decode()
+        assert _get(server.url("/auth"), {"Authorization": f"Basic {token}"})[0] == 200
+
+    def test_unknown_path(self, server):
+        assert _get(server.url("/missing"))[0] == 404
+
+
+class TestFindRegressions:
+    def test_slower_than_threshold_is_regression(self):
+        baseline = {"metrics": {"cold_launch_s": metric(1.0, "s")}}
+        current = {"metrics": {"cold_launch_s": metric(1.3, "s")}}
+        [regression] = find_regressions(current, baseline, threshold=0.2)
+        assert regression.name == "cold_launch_s"
+        assert regression.change == pytest.approx(0.3)
+        assert not find_regressions(current, baseline, threshold=0.5)
+
+    def test_higher_is_better_metrics(self):
+        baseline = {"metrics": {"steady_static_per_s": metric(10.0, "captures/s", HIGHER)}}
+        assert find_regressions({"metrics": {"steady_static_per_s": metric(7.0, "captures/s", HIGHER)}}, baseline)
+        assert not find_regressions({"metrics": {"steady_static_per_s": metric(20.0, "captures/s", HIGHER)}}, baseline)
+
+    def test_per_metric_threshold_and_missing_metrics(self):
+        baseline = {
+            "metrics": {
+                "peak_rss_bytes": {**metric(100.0, "bytes"), "threshold": 0.5},
+                "removed_s": metric(1.0, "s"),
+            }
+        }
+        current = {"metrics": {"peak_rss_bytes": metric(140.0, "bytes"), "added_s": metric(9.0, "s")}}
+        assert find_regressions(current, baseline, threshold=0.1) == []
+
+
+class TestProfileGains:
+    def test_ratio_of_interactive_to_headless(self):
+        metrics = {
+            "profile_interactive_cold_launch_s": metric(1.2, "s"),
+            "profile_headless_cold_launch_s": metric(0.4, "s"),
+            "profile_interactive_capture_s": metric(0.3, "s"),
+        }
+        assert profile_gains(metrics) == {"cold_launch_s": pytest.approx(3.0)}
+
+
+class TestStartup:
+    def test_parse_importtime(self):
+        stderr = (
+            "import time: self [us] | cumulative | imported package\n"
+            "import time:       120 |        120 |     greenlet._greenlet\n"
+            "import time:      1500 |       1620 |   playwright.async_api\n"
+            "import time:       900 |       2520 | main\n"
+        )
+        entries = parse_importtime(stderr)
+        assert [(e.module, e.self_us, e.cumulative_us) for e in entries] == [
+            ("greenlet._greenlet", 120, 120),
+            ("playwright.async_api", 1500, 1620),
+            ("main", 900, 2520),
+        ]
+        assert heavy_imports(entries) == ["greenlet", "playwright"]
+
+    def test_main_import_is_within_budget(self):
+        report = measure_startup("main", runs=3)
+        assert report.heavy == []
+        assert report.median_ms <= DEFAULT_BUDGET_MS, report.summary()
+
+    def test_detect_does_not_load_playwright(self):
+        entries = measure_imports(["main.py", "detect", "--screen", "3840x2160@200", "--json"])
+        assert heavy_imports(entries) == []
+        assert "src.screen_detector" in {e.module for e in entries}
+
+    @pytest.mark.parametrize(
+        "argv",
+        [
+            [],
+            ["--burst", "0", "https://example.com"],
+            ["--headless", "https://example.com"],
+            ["--batch", "manifest.json", "--shards", "2", "--profile", "profile.jsonl"],
+            ["--crawl", "2", "--concurrency", "0", "https://example.com"],
+            ["--block", "document", "https://example.com"],
+            ["--record", "out.mjpeg", "--record-format", "png", "https://example.com"],
+            ["--recycle-after", "0", "https://example.com"],
+        ],
+    )
+    def test_argument_errors_do_not_load_playwright(self, argv):
+        entries = measure_imports(["main.py", *argv], check=False)
+        assert heavy_imports(entries) == []
+        assert "src.encoder" in {e.module for e in entries}
@@ -1,7 +1,11 @@
 import pytest
 from unittest.mock import patch, MagicMock, AsyncMock
-from src import ScreenInfo, BrowserLauncher
-from src.browser_launcher import parse_basic_auth_url
+from playwright.async_api import Error as PlaywrightError
+from src import ScreenInfo, BrowserLauncher, CaptureItem
+from src.browser_launcher import LoginForm, parse_basic_auth_url
+from src.encoder import ImageEncoder
+from src.launch_profile import HEADLESS
+from src.profiling import Profiler
 
 
 class TestBrowserLauncher:
@@ -35,6 +39,30 @@ class TestBrowserLauncher:
         assert viewport["height"] == 980
 
 
+class TestLaunchProfile:
+    def test_interactive_default_keeps_window_and_permissions(self):
+        launcher = BrowserLauncher(ScreenInfo(1920, 1080, 1.0))
+        options = launcher._launch_options()
+        assert options["headless"] is False
+        assert "--window-size=1920,1080" in options["args"]
+        assert launcher._context_options()["permissions"] == ["geolocation"]
+        assert "Resize prevention" in launcher._init_script()
+
+    def test_headless_profile_skips_unneeded_work(self):
+        launcher = BrowserLauncher(ScreenInfo(1920, 1080, 1.0), launch_profile=HEADLESS)
+        options = launcher._launch_options()
+        assert options["headless"] is True
+        assert not any(arg.startswith("--window-size") for arg in options["args"])
+        assert "--disable-domain-reliability" in options["args"]
+        # Playwright の --disable-features の指定を上書きしない
+        assert not any(arg.startswith("--disable-features") for arg in options["args"])
+        context_options = launcher._context_options()
+        assert "permissions" not in context_options and "geolocation" not in context_options
+        script = launcher._init_script()
+        assert "Resize prevention" not in script
+        assert "'ja-JP'" in script
+
+
 class TestBrowserLauncherAsync:
     @pytest.mark.asyncio
     async def test_launch_creates_browser_and_page(self):
@@ -169,3 +197,238 @@ class TestParseBasicAuthUrl:
         url, creds = parse_basic_auth_url("http://u:p@host.com/path?q=1&r=2")
         assert url == "http://host.com/path?q=1&r=2"
         assert creds == {"username": "u", "password": "p"}
+
+
+def _mock_page() -> AsyncMock:
+    page = AsyncMock()
+    page.is_closed = MagicMock(return_value=False)
+    return page
+
+
+class TestCaptureBatch:
+    def _patch_playwright(self, mock_browser):
+        mock_playwright = AsyncMock()
+        mock_playwright.chromium.launch = AsyncMock(return_value=mock_browser)
+        patcher = patch("src.browser_launcher.async_playwright")
+        mock_async_pw = patcher.start()
+        mock_async_pw.return_value.__aenter__ = AsyncMock(return_value=mock_playwright)
+        mock_async_pw.return_value.__aexit__ = AsyncMock(return_value=None)
+        return patcher
+
+    @pytest.mark.asyncio
+    async def test_batch_launches_browser_once_and_captures_all(self, tmp_path):
+        launcher = BrowserLauncher(ScreenInfo(width=1920, height=1080, scale_factor=1.0))
+        mock_context = AsyncMock()
+        mock_context.new_page = AsyncMock(side_effect=lambda: _mock_page())
+        mock_browser = AsyncMock()
+        mock_browser.new_context = AsyncMock(return_value=mock_context)
+
+        items = [CaptureItem(f"https://example.com/{i}", str(tmp_path / f"{i}.png")) for i in range(5)]
+        patcher = self._patch_playwright(mock_browser)
+        try:
+            results = await launcher.capture_batch(items, concurrency=2)
+        finally:
+            patcher.stop()
+
+        assert [r.item for r in results] == items
+        assert all(r.ok for r in results)
+        assert mock_browser.new_context.call_count == 1
+        assert mock_context.new_page.call_count == 2
+
+    @pytest.mark.asyncio
+    async def test_batch_records_phases_and_saves_trace(self, tmp_path):
+        profiler = Profiler()
+        launcher = BrowserLauncher(
+            ScreenInfo(width=1920, height=1080, scale_factor=1.0),
+            profiler=profiler,
+            trace_path=tmp_path / "trace.zip",
+        )
+        mock_context = AsyncMock()
+        mock_context.new_page = AsyncMock(side_effect=lambda: _mock_page())
+        mock_browser = AsyncMock()
+        mock_browser.new_context = AsyncMock(return_value=mock_context)
+
+        items = [CaptureItem(f"https://example.com/{i}", str(tmp_path / f"{i}.png")) for i in range(3)]
+        patcher = self._patch_playwright(mock_browser)
+        try:
+            await launcher.capture_batch(items, concurrency=2)
+        finally:
+            patcher.stop()
+
+        summary = profiler.summary()
+        assert summary["goto"]["count"] == 3
+        assert summary["screenshot_write"]["count"] == 3
+        assert {"playwright_start", "browser_launch", "new_context", "browser_close"} <= summary.keys()
+        mock_context.tracing.start.assert_awaited_once()
+        mock_context.tracing.stop.assert_awaited_once_with(path=str(tmp_path / "trace.zip"))
+
+    @pytest.mark.asyncio
+    async def test_batch_failure_does_not_abort_other_items(self, tmp_path):
+        launcher = BrowserLauncher(ScreenInfo(width=1920, height=1080, scale_factor=1.0))
+        page = _mock_page()
+
+        async def goto(url):
+            if url.endswith("/bad"):
+                raise PlaywrightError("net::ERR_NAME_NOT_RESOLVED")
+
+        page.goto = AsyncMock(side_effect=goto)
+        mock_context = AsyncMock()
+        mock_context.new_page = AsyncMock(return_value=page)
+        mock_browser = AsyncMock()
+        mock_browser.new_context = AsyncMock(return_value=mock_context)
+
+        items = [
+            CaptureItem("https://example.com/bad", str(tmp_path / "bad.png")),
+            CaptureItem("https://example.com/good", str(tmp_path / "good.png")),
+        ]
+        patcher = self._patch_playwright(mock_browser)
+        try:
+            results = await launcher.capture_batch(items, concurrency=1)
+        finally:
+            patcher.stop()
+
+        assert [r.ok for r in results] == [False, True]
+        assert "ERR_NAME_NOT_RESOLVED" in results[0].error
+
+    @pytest.mark.asyncio
+    async def test_batch_hands_bytes_to_encoder(self, tmp_path):
+        launcher = BrowserLauncher(ScreenInfo(width=1920, height=1080, scale_factor=1.0))
+        page = _mock_page()
+        page.screenshot = AsyncMock(return_value=b"PNGDATA")
+        mock_context = AsyncMock()
+        mock_context.new_page = AsyncMock(return_value=page)
+        mock_browser = AsyncMock()
+        mock_browser.new_context = AsyncMock(return_value=mock_context)
+
+        items = [CaptureItem(f"https://example.com/{i}", str(tmp_path / f"{i}.png")) for i in range(3)]
+        patcher = self._patch_playwright(mock_browser)
+        try:
+            async with ImageEncoder() as encoder:
+                results = await launcher.capture_batch(items, concurrency=2, encoder=encoder)
+        finally:
+            patcher.stop()
+
+        assert all(r.ok for r in results)
+        assert [r.path for r in results] == [item.output for item in items]
+        assert (tmp_path / "0.png").read_bytes() == b"PNGDATA"
+        page.screenshot.assert_called_with(full_page=False)
+        assert encoder.stats.images == 3
+
+    @pytest.mark.asyncio
+    async def test_batch_isolate_creates_context_per_worker(self, tmp_path):
+        launcher = BrowserLauncher(ScreenInfo(width=1920, height=1080, scale_factor=1.0))
+        mock_browser = AsyncMock()
+
+        def make_context(**kwargs):
+            context = AsyncMock()
+            context.new_page = AsyncMock(side_effect=lambda: _mock_page())
+            return context
+
+        mock_browser.new_context = AsyncMock(side_effect=make_context)
+        items = [CaptureItem(f"https://example.com/{i}", str(tmp_path / f"{i}.png")) for i in range(4)]
+        patcher = self._patch_playwright(mock_browser)
+        try:
+            results = await launcher.capture_batch(items, concurrency=3, isolate=True)
+        finally:
+            patcher.stop()
+
+        assert all(r.ok for r in results)
+        assert mock_browser.new_context.call_count == 3
+
+
+class TestKeyCapture:
+    @pytest.mark.asyncio
+    async def test_key_events_are_pushed_in_order(self):
+        launcher = BrowserLauncher(ScreenInfo(width=1920, height=1080, scale_factor=1.0))
+        mock_page = AsyncMock()
+        mock_page.on = MagicMock()
+
+        events = await launcher.setup_key_capture(mock_page)
+
+        name, callback = mock_page.context.expose_binding.call_args[0]
+        for action in ["screenshot", "screenshot", "screenshot", "quit"]:
+            callback(None, action)
+        received = [events.get_nowait() for _ in range(events.qsize())]
+        assert received == ["screenshot", "screenshot", "screenshot", "quit"]
+
+    @pytest.mark.asyncio
+    async def test_key_capture_survives_navigation_via_init_script(self):
+        launcher = BrowserLauncher(ScreenInfo(width=1920, height=1080, scale_factor=1.0))
+        mock_page = AsyncMock()
+        mock_page.on = MagicMock()
+
+        await launcher.setup_key_capture(mock_page)
+
+        script = mock_page.context.add_init_script.call_args[0][0]
+        assert "F9" in script and "Escape" in script
+        mock_page.evaluate.assert_called_once_with(script)
+
+    @pytest.mark.asyncio
+    async def test_page_close_sends_quit(self):
+        launcher = BrowserLauncher(ScreenInfo(width=1920, height=1080, scale_factor=1.0))
+        mock_page = AsyncMock()
+        mock_page.on = MagicMock()
+
+        events = await launcher.setup_key_capture(mock_page)
+
+        event_name, handler = mock_page.on.call_args[0]
+        assert event_name == "close"
+        handler(mock_page)
+        assert events.get_nowait() == "quit"
+
+
+class TestStorageState:
+    def test_existing_session_is_loaded_into_context(self, tmp_path):
+        session = tmp_path / "session.json"
+        session.write_text('{"cookies": [], "origins": []}')
+        launcher = BrowserLauncher(ScreenInfo(1920, 1080, 1.0), storage_state=session)
+        assert launcher._context_options()["storage_state"] == str(session)
+
+    def test_missing_session_file_is_not_loaded(self, tmp_path):
+        launcher = BrowserLauncher(ScreenInfo(1920, 1080, 1.0), storage_state=tmp_path / "none.json")
+        assert "storage_state" not in launcher._context_options()
+
+    @pytest.mark.asyncio
+    async def test_valid_session_skips_login(self):
+        launcher = BrowserLauncher(ScreenInfo(1920, 1080, 1.0))
+        form = LoginForm(url="http://localhost/users/login", fields={"#id": "1"}, submit="#go")
+        mock_page = AsyncMock()
+        mock_page.url = "http://localhost/items"
+
+        logged_in = await launcher.open_authenticated(mock_page, "http://localhost/items", form)
+
+        assert logged_in is False
+        mock_page.goto.assert_called_once_with("http://localhost/items")
+        mock_page.fill.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_expired_session_logs_in_and_saves(self, tmp_path):
+        session = tmp_path / "session.json"
+        launcher = BrowserLauncher(ScreenInfo(1920, 1080, 1.0), storage_state=session)
+        form = LoginForm(url="http://localhost/users/login", fields={"#id": "1"}, submit="#go")
+        mock_page = AsyncMock()
+        mock_page.url = "http://localhost/users/login?next=/items"
+
+        async def storage_state(path):
+            session.write_text("{}")
+
+        mock_page.context.storage_state = AsyncMock(side_effect=storage_state)
+
+        logged_in = await launcher.open_authenticated(mock_page, "http://localhost/items", form)
+
+        assert logged_in is True
+        mock_page.fill.assert_called_once_with("#id", "1")
+        mock_page.context.storage_state.assert_called_once_with(path=str(session))
+        assert mock_page.goto.call_args_list[-1][0] == ("http://localhost/items",)
+
+    @pytest.mark.asyncio
+    async def test_rejected_session_cookies_are_cleared(self):
+        launcher = BrowserLauncher(ScreenInfo(1920, 1080, 1.0))
+        mock_page = AsyncMock()
+        mock_page.goto = AsyncMock(side_effect=[MagicMock(status=401), MagicMock(status=200)])
+        mock_page.context.cookies = AsyncMock(return_value=[{"name": "sid"}])
+
+        response = await launcher.navigate_with_session(mock_page, "http://localhost/")
+
+        assert response.status == 200
+        mock_page.context.clear_cookies.assert_called_once()
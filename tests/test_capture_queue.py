@@ -0,0 +1,115 @@
+import asyncio
+from unittest.mock import AsyncMock
+
+import pytest
+from playwright.async_api import Error as PlaywrightError
+from src import BrowserLauncher, ScreenInfo
+from src.capture_queue import CaptureQueue
+from src.encoder import ImageEncoder
+
+
+def _launcher(capture_delay: float = 0.0) -> BrowserLauncher:
+    launcher = BrowserLauncher(ScreenInfo(1920, 1080, 1.0))
+
+    async def capture(page, full_page=False, item=None):
+        await asyncio.sleep(capture_delay)
+        return b"png-bytes"
+
+    launcher.capture = AsyncMock(side_effect=capture)
+    return launcher
+
+
+class TestCaptureQueue:
+    @pytest.mark.asyncio
+    async def test_request_returns_immediately_and_writes_in_background(self, tmp_path):
+        results = []
+        async with ImageEncoder() as encoder:
+            async with CaptureQueue(_launcher(0.05), AsyncMock(), encoder, on_done=results.append) as queue:
+                assert queue.request(tmp_path / "a.png")
+                assert queue.request(tmp_path / "b.png")
+                # 撮影はまだ終わっていない (キー入力の処理を止めない)
+                assert queue.depth >= 1
+                assert results == []
+
+        assert [r.path.name for r in results] == ["a.png", "b.png"]
+        assert all(r.ok and r.latency >= r.capture_seconds > 0 for r in results)
+        assert (tmp_path / "b.png").read_bytes() == b"png-bytes"
+        assert queue.stats.saved == 2
+
+    @pytest.mark.asyncio
+    async def test_full_queue_drops_requests(self, tmp_path):
+        async with ImageEncoder() as encoder:
+            async with CaptureQueue(_launcher(0.05), AsyncMock(), encoder, maxsize=1) as queue:
+                accepted = [queue.request(tmp_path / f"{i}.png") for i in range(3)]
+
+        assert accepted == [True, False, False]
+        assert queue.stats.dropped == 2
+        assert queue.stats.saved == 1
+
+    @pytest.mark.asyncio
+    async def test_burst_takes_shots_at_fixed_interval(self, tmp_path):
+        launcher = _launcher()
+        async with ImageEncoder() as encoder:
+            async with CaptureQueue(launcher, AsyncMock(), encoder) as queue:
+                queue.burst(lambda i: tmp_path / f"burst_{i}.png", 3, 0.02)
+                await asyncio.sleep(0.1)
+
+        assert sorted(p.name for p in tmp_path.iterdir()) == ["burst_0.png", "burst_1.png", "burst_2.png"]
+        assert launcher.capture.await_count == 3
+
+    @pytest.mark.asyncio
+    async def test_capture_failure_is_reported(self, tmp_path):
+        launcher = _launcher()
+        launcher.capture = AsyncMock(side_effect=PlaywrightError("Target page has been closed"))
+        results = []
+        async with ImageEncoder() as encoder:
+            async with CaptureQueue(launcher, AsyncMock(), encoder, on_done=results.append) as queue:
+                queue.request(tmp_path / "a.png")
+
+        assert not results[0].ok
+        assert "closed" in results[0].error
+        assert queue.stats.failed == 1
+
+    @pytest.mark.asyncio
+    async def test_after_capture_failure_is_reported_and_worker_keeps_running(self, tmp_path):
+        after_capture = AsyncMock(side_effect=[PlaywrightError("recycle failed"), None, None])
+        results = []
+        async with ImageEncoder() as encoder:
+            queue = CaptureQueue(_launcher(), AsyncMock(), encoder, on_done=results.append, after_capture=after_capture)
+            async with queue:
+                for i in range(3):
+                    queue.request(tmp_path / f"{i}.png")
+
+        assert after_capture.await_count == 3
+        assert sorted(p.name for p in tmp_path.iterdir()) == ["0.png", "1.png", "2.png"]
+        assert [r.error for r in results if not r.ok] == ["after capture: recycle failed"]
+        assert queue.stats.saved == 3 and queue.stats.failed == 1
+
+    @pytest.mark.asyncio
+    async def test_close_does_not_wait_for_a_finished_worker(self, tmp_path):
+        async with ImageEncoder() as encoder:
+            queue = CaptureQueue(_launcher(), AsyncMock(), encoder, maxsize=1)
+            await queue.start()
+            queue._worker.cancel()
+            await asyncio.sleep(0)
+            queue.request(tmp_path / "a.png")
+
+            # キューが満杯でも終端の put で止まらない
+            await asyncio.wait_for(queue.close(), 1)
+
+    @pytest.mark.asyncio
+    async def test_store_deduplicates_instead_of_writing_files(self, tmp_path):
+        from src.screenshot_store import ScreenshotStore
+
+        results = []
+        page = AsyncMock(url="https://example.com/", viewport_size={"width": 1920, "height": 1080})
+        with ScreenshotStore(tmp_path / "store") as store:
+            async with ImageEncoder() as encoder:
+                async with CaptureQueue(_launcher(), page, encoder, on_done=results.append, store=store) as queue:
+                    queue.request(tmp_path / "a.png")
+                    queue.request(tmp_path / "b.png")
+
+            assert [r.stored.duplicate for r in results] == [False, True]
+            assert results[0].path == results[1].path
+            assert store.latest("https://example.com/").viewport == "1920x1080"
+        assert not (tmp_path / "a.png").exists()
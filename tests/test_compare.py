@@ -0,0 +1,120 @@
+import json
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("PIL")
+from PIL import Image  # noqa: E402
+from src.compare import CompareOptions, compare_directories, compare_images, write_summary  # noqa: E402
+
+
+def _save(path, pixels) -> None:
+    Image.fromarray(np.asarray(pixels, dtype=np.uint8)).save(path)
+
+
+def _canvas(width=128, height=128, color=(255, 255, 255)):
+    return np.full((height, width, 3), color, dtype=np.uint8)
+
+
+class TestCompareImages:
+    def test_identical_images_skip_all_tiles(self, tmp_path):
+        _save(tmp_path / "a.png", _canvas())
+        _save(tmp_path / "b.png", _canvas())
+
+        result = compare_images(tmp_path / "a.png", tmp_path / "b.png", tmp_path / "diff.png")
+
+        assert result.passed
+        assert result.diff_pixels == 0
+        assert result.tiles_identical == result.tiles_total == 4
+        assert result.diff_image is None
+
+    def test_changed_block_is_counted_and_highlighted(self, tmp_path):
+        base = _canvas()
+        changed = _canvas()
+        changed[10:20, 70:80] = (0, 0, 0)
+        _save(tmp_path / "a.png", base)
+        _save(tmp_path / "b.png", changed)
+
+        result = compare_images(tmp_path / "a.png", tmp_path / "b.png", tmp_path / "diff.png")
+
+        assert not result.passed
+        assert result.diff_pixels == 100
+        assert result.tiles_identical == 3
+        assert result.changed_tiles == [(64, 0, 64, 64)]
+        with Image.open(tmp_path / "diff.png") as diff:
+            assert diff.getpixel((75, 15)) == (255, 0, 0)
+
+    def test_tolerance_ignores_small_channel_differences(self, tmp_path):
+        _save(tmp_path / "a.png", _canvas(color=(100, 100, 100)))
+        _save(tmp_path / "b.png", _canvas(color=(103, 98, 100)))
+
+        assert not compare_images(tmp_path / "a.png", tmp_path / "b.png").passed
+        assert compare_images(tmp_path / "a.png", tmp_path / "b.png", options=CompareOptions(tolerance=3)).passed
+
+    def test_one_pixel_shift_of_hard_line_is_detected(self, tmp_path):
+        base = _canvas()
+        shifted = _canvas()
+        base[40, 30:60] = (0, 0, 0)
+        shifted[41, 30:60] = (0, 0, 0)
+        _save(tmp_path / "a.png", base)
+        _save(tmp_path / "b.png", shifted)
+
+        result = compare_images(tmp_path / "a.png", tmp_path / "b.png")
+
+        assert not result.passed
+        assert result.diff_pixels == 60 and result.antialiased_pixels == 0
+
+    def test_antialiased_edge_is_ignored(self, tmp_path):
+        base = _canvas()
+        base[20:60, 31:60] = (0, 0, 0)
+        changed = base.copy()
+        base[20:60, 30] = (128, 128, 128)
+        changed[20:60, 30] = (90, 90, 90)
+        _save(tmp_path / "a.png", base)
+        _save(tmp_path / "b.png", changed)
+
+        with_aa = compare_images(tmp_path / "a.png", tmp_path / "b.png")
+        without_aa = compare_images(tmp_path / "a.png", tmp_path / "b.png", options=CompareOptions(antialias=False))
+
+        assert with_aa.passed and with_aa.antialiased_pixels == 40
+        assert without_aa.diff_pixels == 40
+
+    def test_noise_is_not_treated_as_antialiasing(self, tmp_path):
+        rng = np.random.default_rng(0)
+        base = rng.integers(0, 256, (64, 64, 3), dtype=np.uint8)
+        _save(tmp_path / "a.png", base)
+        _save(tmp_path / "b.png", 255 - base)
+
+        result = compare_images(tmp_path / "a.png", tmp_path / "b.png")
+
+        assert result.antialiased_pixels == 0
+
+    def test_size_mismatch_fails(self, tmp_path):
+        _save(tmp_path / "a.png", _canvas(height=100))
+        _save(tmp_path / "b.png", _canvas(height=120))
+
+        result = compare_images(tmp_path / "a.png", tmp_path / "b.png")
+
+        assert result.size_mismatch and not result.passed
+        assert result.height == 120
+
+
+class TestCompareDirectories:
+    def test_directory_compare_reports_missing_and_added(self, tmp_path):
+        (tmp_path / "base" / "sub").mkdir(parents=True)
+        (tmp_path / "new" / "sub").mkdir(parents=True)
+        _save(tmp_path / "base" / "same.png", _canvas())
+        _save(tmp_path / "new" / "same.png", _canvas())
+        _save(tmp_path / "base" / "sub" / "gone.png", _canvas())
+        _save(tmp_path / "new" / "sub" / "extra.png", _canvas())
+
+        result = compare_directories(tmp_path / "base", tmp_path / "new", workers=2)
+
+        assert [r.passed for r in result.results] == [True]
+        assert result.missing == ["sub/gone.png"]
+        assert result.added == ["sub/extra.png"]
+        assert not result.passed
+
+        write_summary(result.to_dict(), tmp_path / "summary.json")
+        summary = json.loads((tmp_path / "summary.json").read_text())
+        assert summary["compared"] == 1 and summary["missing"] == ["sub/gone.png"]
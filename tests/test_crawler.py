@@ -0,0 +1,188 @@
+from contextlib import asynccontextmanager
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from src import BrowserLauncher, ScreenInfo
+from src.crawler import (
+    CrawlOptions,
+    Crawler,
+    Frontier,
+    canonicalize_url,
+    output_path_for,
+    parse_sitemap,
+)
+
+ORIGIN = "https://example.com"
+SITE = {
+    "/": ["/a", "/b?utm_source=mail", "https://other.example.org/", "#top"],
+    "/a": ["/", "/b", "/logout", "/report.pdf", "mailto:info@example.com"],
+    "/b": ["/c"],
+    "/c": ["/d"],
+    "/d": [],
+}
+
+
+class FakePage:
+    """SITE の各パスのリンクを返すページ"""
+
+    def __init__(self, visited: list[str]):
+        self.url = "about:blank"
+        self.visited = visited
+        self.closed = False
+
+    async def goto(self, url):
+        self.url = url
+        self.visited.append(url)
+        response = MagicMock()
+        response.status = 200
+        response.headers = {"content-type": "text/html; charset=utf-8"}
+        return response
+
+    async def evaluate(self, script, arg=None):
+        path = self.url[len(ORIGIN):] or "/"
+        return [link if "://" in link or ":" in link else f"{ORIGIN}{link}" for link in SITE[path.split("?")[0]]]
+
+    async def screenshot(self, path, full_page=False):
+        open(path, "wb").close()
+
+    def is_closed(self):
+        return self.closed
+
+    async def close(self):
+        self.closed = True
+
+
+def _launcher(visited: list[str]) -> BrowserLauncher:
+    launcher = BrowserLauncher(ScreenInfo(1920, 1080, 1.0))
+    context = AsyncMock()
+    context.new_page = AsyncMock(side_effect=lambda: FakePage(visited))
+    browser = AsyncMock()
+    browser.new_context = AsyncMock(return_value=context)
+
+    @asynccontextmanager
+    async def launch_browser():
+        yield browser
+
+    launcher.launch_browser = launch_browser
+    return launcher
+
+
+class TestCanonicalizeUrl:
+    def test_normalizes_scheme_host_port_and_fragment(self):
+        assert canonicalize_url("HTTPS://Example.COM:443/a/../b/./c#frag") == "https://example.com/b/c"
+        assert canonicalize_url("http://example.com:8080") == "http://example.com:8080/"
+
+    def test_relative_links_and_trailing_slash(self):
+        assert canonicalize_url("../x/", "https://example.com/a/b/") == "https://example.com/a/x/"
+
+    def test_query_params_are_filtered_and_sorted(self):
+        url = "https://example.com/list?b=2&utm_source=x&a=1&fbclid=y"
+        assert canonicalize_url(url) == "https://example.com/list?a=1&b=2"
+        assert canonicalize_url(url, ignore_query=True) == "https://example.com/list"
+        assert canonicalize_url("https://example.com/?page=2", drop_params=("page",)) == "https://example.com/"
+
+    def test_malformed_links_are_skipped(self):
+        assert canonicalize_url("http://a:99999/") is None
+        assert canonicalize_url("http://a:abc/") is None
+        assert canonicalize_url("http://[::1/") is None
+
+    def test_non_http_links(self):
+        assert canonicalize_url("mailto:info@example.com") is None
+        assert canonicalize_url("javascript:void(0)") is None
+
+
+class TestOutputPath:
+    def test_paths(self, tmp_path):
+        assert output_path_for("https://example.com/", tmp_path) == tmp_path / "index.png"
+        assert output_path_for("https://example.com/a/b", tmp_path) == tmp_path / "a" / "b.png"
+        assert output_path_for("https://example.com/a/", tmp_path) == tmp_path / "a" / "index.png"
+        with_query = output_path_for("https://example.com/a?x=1", tmp_path)
+        assert with_query.parent == tmp_path and with_query.name.startswith("a_")
+        assert with_query != output_path_for("https://example.com/a?x=2", tmp_path)
+
+
+class TestFrontier:
+    def test_round_trip_and_dedupe(self, tmp_path):
+        frontier = Frontier(ORIGIN)
+        assert frontier.add(f"{ORIGIN}/", 0)
+        assert not frontier.add(f"{ORIGIN}/", 1)
+        frontier.add(f"{ORIGIN}/a", 1)
+        frontier.mark(f"{ORIGIN}/", ok=True)
+        frontier.save(tmp_path / "frontier.json")
+
+        loaded = Frontier.load(tmp_path / "frontier.json")
+        assert loaded.queued == [(f"{ORIGIN}/a", 1)]
+        assert loaded.done == [f"{ORIGIN}/"]
+        assert loaded.seen(f"{ORIGIN}/")
+
+
+class TestSitemap:
+    def test_urlset_and_index(self):
+        urlset = (
+            '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+            "<url><loc>https://example.com/a</loc></url><url><loc> https://example.com/b </loc></url></urlset>"
+        )
+        assert parse_sitemap(urlset) == (["https://example.com/a", "https://example.com/b"], [])
+        index = (
+            '<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+            "<sitemap><loc>https://example.com/sitemap-1.xml</loc></sitemap></sitemapindex>"
+        )
+        assert parse_sitemap(index) == ([], ["https://example.com/sitemap-1.xml"])
+        assert parse_sitemap("not xml") == ([], [])
+
+
+class TestCrawler:
+    @pytest.mark.asyncio
+    async def test_crawls_same_origin_once_within_depth(self, tmp_path):
+        visited: list[str] = []
+        crawler = Crawler(_launcher(visited), f"{ORIGIN}/", tmp_path, CrawlOptions(max_depth=2, concurrency=2))
+        report = await crawler.run()
+
+        captured = sorted(r.item.url for r in report.results)
+        assert captured == [f"{ORIGIN}/", f"{ORIGIN}/a", f"{ORIGIN}/b", f"{ORIGIN}/c"]
+        assert sorted(visited) == captured
+        assert all(r.ok for r in report.results)
+        assert (tmp_path / "a.png").exists()
+        assert report.remaining == 0
+
+    @pytest.mark.asyncio
+    async def test_interrupted_crawl_resumes_from_frontier(self, tmp_path):
+        visited: list[str] = []
+        first = Crawler(_launcher(visited), f"{ORIGIN}/", tmp_path, CrawlOptions(max_pages=2, concurrency=1))
+        report = await first.run()
+        assert len(report.results) == 2
+        assert report.remaining > 0
+
+        second = Crawler(_launcher(visited), f"{ORIGIN}/", tmp_path, CrawlOptions(concurrency=1))
+        assert second.resumed
+        report = await second.run()
+        assert report.remaining == 0
+        # 再開後は撮影済みのページを開かない
+        assert len(visited) == len(set(visited)) == 5
+
+    @pytest.mark.asyncio
+    async def test_resumed_crawl_checks_session_on_first_page(self, tmp_path):
+        visited: list[str] = []
+        await Crawler(_launcher(visited), f"{ORIGIN}/", tmp_path, CrawlOptions(max_pages=2, concurrency=1)).run()
+
+        launcher = _launcher(visited)
+        launcher.open_authenticated = AsyncMock()
+        second = Crawler(launcher, f"{ORIGIN}/", tmp_path, CrawlOptions(concurrency=1), login=MagicMock())
+        assert second.resumed
+        await second.run()
+
+        launcher.open_authenticated.assert_called_once()
+        assert launcher.open_authenticated.call_args[0][1] not in (f"{ORIGIN}/", f"{ORIGIN}/a")
+
+    def test_bad_port_link_does_not_stop_enqueue(self, tmp_path):
+        crawler = Crawler(_launcher([]), f"{ORIGIN}/", tmp_path)
+        crawler.enqueue(["http://example.com:99999/", "/a"], f"{ORIGIN}/", 1)
+        assert [url for url, _ in crawler.frontier.queued] == [f"{ORIGIN}/", f"{ORIGIN}/a"]
+
+    def test_excluded_and_foreign_links_are_not_accepted(self, tmp_path):
+        crawler = Crawler(_launcher([]), f"{ORIGIN}/", tmp_path, CrawlOptions(exclude=("*logout*", "/admin/*")))
+        assert crawler.accepts(f"{ORIGIN}/a")
+        assert not crawler.accepts(f"{ORIGIN}/logout")
+        assert not crawler.accepts(f"{ORIGIN}/admin/users")
+        assert not crawler.accepts(f"{ORIGIN}/file.pdf")
+        assert not crawler.accepts("https://other.example.org/")
@@ -0,0 +1,129 @@
+import asyncio
+from contextlib import asynccontextmanager
+from unittest.mock import AsyncMock
+
+import pytest
+from src import ScreenInfo, BrowserLauncher
+from src.browser_launcher import LoginForm
+from src.daemon import (
+    CaptureDaemon,
+    CaptureJob,
+    DaemonUnavailable,
+    is_daemon_running,
+    request_capture,
+    shutdown_daemon,
+)
+from src.lazyload import PreloadOptions
+
+
+def _launcher_with_mock_browser(mock_browser) -> BrowserLauncher:
+    launcher = BrowserLauncher(ScreenInfo(width=1920, height=1080, scale_factor=1.0))
+
+    @asynccontextmanager
+    async def launch_browser():
+        yield mock_browser
+
+    launcher.launch_browser = launch_browser
+    return launcher
+
+
+async def _wait_for_socket(socket_path) -> None:
+    for _ in range(100):
+        if socket_path.exists():
+            return
+        await asyncio.sleep(0.01)
+    raise TimeoutError(socket_path)
+
+
+class TestCaptureJob:
+    def test_round_trip_with_login(self):
+        job = CaptureJob(
+            url="http://localhost/",
+            output="/tmp/a.png",
+            login=LoginForm(url="http://localhost/login", fields={"#id": "1"}, submit="#go"),
+        )
+        assert CaptureJob.from_dict(job.to_dict()) == job
+
+    def test_round_trip_with_preload(self):
+        job = CaptureJob(url="http://localhost/", full_page=True, preload=PreloadOptions(max_height=1000))
+        assert CaptureJob.from_dict(job.to_dict()) == job
+
+
+class TestDaemon:
+    @pytest.mark.asyncio
+    async def test_request_without_daemon_raises(self, tmp_path):
+        with pytest.raises(DaemonUnavailable):
+            await request_capture(CaptureJob(url="http://localhost/"), tmp_path / "none.sock")
+        assert not await is_daemon_running(tmp_path / "none.sock")
+
+    @pytest.mark.asyncio
+    async def test_each_job_runs_in_fresh_context(self, tmp_path):
+        socket_path = tmp_path / "d.sock"
+        contexts = []
+        # StreamReader の既定の上限 (64 KiB) を超える撮影結果
+        png = bytes(range(256)) * 800
+
+        async def new_context(**kwargs):
+            context = AsyncMock()
+            page = AsyncMock()
+            page.screenshot = AsyncMock(return_value=png)
+            context.new_page = AsyncMock(return_value=page)
+            contexts.append((context, kwargs))
+            return context
+
+        mock_browser = AsyncMock()
+        mock_browser.new_context = AsyncMock(side_effect=new_context)
+        daemon = CaptureDaemon(_launcher_with_mock_browser(mock_browser), socket_path)
+        server = asyncio.create_task(daemon.serve())
+        await _wait_for_socket(socket_path)
+
+        creds = {"username": "u", "password": "p"}
+        first = await request_capture(CaptureJob(url="http://localhost/a", return_bytes=True), socket_path)
+        second = await request_capture(
+            CaptureJob(url="http://localhost/b", output=str(tmp_path / "b.png"), http_credentials=creds),
+            socket_path,
+        )
+        await shutdown_daemon(socket_path)
+        await asyncio.wait_for(server, 1)
+
+        assert first.ok and first.data == png
+        assert second.ok and second.path == str(tmp_path / "b.png")
+        assert len(contexts) == 2
+        assert all(context.close.await_count == 1 for context, _ in contexts)
+        assert "http_credentials" not in contexts[0][1]
+        assert contexts[1][1]["http_credentials"] == creds
+        assert not socket_path.exists()
+
+    @pytest.mark.asyncio
+    async def test_output_and_bytes_share_one_capture_and_errors_are_reported(self, tmp_path):
+        socket_path = tmp_path / "d.sock"
+        pages = []
+
+        async def new_context(**kwargs):
+            context = AsyncMock()
+            page = AsyncMock()
+            page.url = "http://localhost/"
+            page.screenshot = AsyncMock(return_value=b"PNG")
+            page.goto = AsyncMock(side_effect=ValueError("boom") if pages else None)
+            context.new_page = AsyncMock(return_value=page)
+            pages.append(page)
+            return context
+
+        mock_browser = AsyncMock()
+        mock_browser.new_context = AsyncMock(side_effect=new_context)
+        daemon = CaptureDaemon(_launcher_with_mock_browser(mock_browser), socket_path)
+        server = asyncio.create_task(daemon.serve())
+        await _wait_for_socket(socket_path)
+
+        output = tmp_path / "a.png"
+        both = await request_capture(
+            CaptureJob(url="http://localhost/", output=str(output), return_bytes=True), socket_path
+        )
+        # ジョブの失敗は接続を切らずに結果として返す (DaemonUnavailable にしない)
+        failed = await request_capture(CaptureJob(url="http://localhost/", return_bytes=True), socket_path)
+        await shutdown_daemon(socket_path)
+        await asyncio.wait_for(server, 1)
+
+        assert both.ok and both.data == b"PNG" and output.read_bytes() == b"PNG"
+        assert pages[0].screenshot.await_count == 1
+        assert not failed.ok and "boom" in failed.error
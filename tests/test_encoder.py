@@ -0,0 +1,69 @@
+import io
+
+import pytest
+from src.encoder import EncodeOptions, ImageEncoder, encode_image
+
+PIL = pytest.importorskip("PIL")
+from PIL import Image  # noqa: E402
+
+
+def _png(width: int = 64, height: int = 32) -> bytes:
+    out = io.BytesIO()
+    Image.new("RGB", (width, height), (200, 30, 30)).save(out, "PNG")
+    return out.getvalue()
+
+
+class TestEncodeOptions:
+    def test_default_is_passthrough(self):
+        assert EncodeOptions().passthrough
+
+    def test_output_suffix_follows_format(self):
+        assert EncodeOptions(format="jpeg").output_path("a/b.png").name == "b.jpg"
+        assert EncodeOptions(format="jpeg").output_path("a/b.jpeg").name == "b.jpeg"
+        assert EncodeOptions(format="webp").output_path("b.png").name == "b.webp"
+        assert EncodeOptions().output_path("b.png").name == "b.png"
+
+    def test_invalid_values(self):
+        with pytest.raises(ValueError):
+            EncodeOptions(format="gif")
+        with pytest.raises(ValueError):
+            EncodeOptions(scale=2.0)
+
+
+class TestEncodeImage:
+    def test_passthrough_returns_same_bytes(self):
+        data = _png()
+        assert encode_image(data, EncodeOptions()) is data
+
+    def test_jpeg_with_downscale(self):
+        encoded = encode_image(_png(64, 32), EncodeOptions(format="jpeg", quality=70, scale=0.5))
+        with Image.open(io.BytesIO(encoded)) as image:
+            assert image.format == "JPEG"
+            assert image.size == (32, 16)
+
+    def test_png_compress_level(self):
+        encoded = encode_image(_png(), EncodeOptions(compress_level=9))
+        with Image.open(io.BytesIO(encoded)) as image:
+            assert image.format == "PNG"
+
+
+class TestImageEncoder:
+    @pytest.mark.asyncio
+    async def test_submit_writes_in_background_and_counts(self, tmp_path):
+        async with ImageEncoder(EncodeOptions(format="webp"), workers=2) as encoder:
+            futures = [await encoder.submit(_png(), tmp_path / f"{i}.png") for i in range(3)]
+            paths = [await f for f in futures]
+
+        assert [p.name for p in paths] == ["0.webp", "1.webp", "2.webp"]
+        assert all(p.exists() for p in paths)
+        assert encoder.stats.images == 3
+        assert encoder.stats.bytes_in == 3 * len(_png())
+        assert encoder.stats.images_per_second > 0
+
+    @pytest.mark.asyncio
+    async def test_failure_is_reported_on_future(self, tmp_path):
+        async with ImageEncoder(EncodeOptions(format="jpeg")) as encoder:
+            future = await encoder.submit(b"not an image", tmp_path / "bad.png")
+            with pytest.raises(Exception):
+                await future
+        assert encoder.stats.failures == 1
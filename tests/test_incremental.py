@@ -0,0 +1,152 @@
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from playwright.async_api import Error as PlaywrightError
+from src import BrowserLauncher, CaptureItem, ScreenInfo
+from src.incremental import DOM_UNCHANGED, MANIFEST_NAME, NOT_MODIFIED, IncrementalManifest
+
+URL = "https://example.com/"
+
+
+def _head(status=200, headers=None):
+    response = MagicMock()
+    response.status = status
+    response.headers = headers or {}
+    context = MagicMock()
+    context.request.head = AsyncMock(return_value=response)
+    return context
+
+
+def _page(dom_hash="hash-1", headers=None):
+    page = AsyncMock()
+    response = MagicMock()
+    response.headers = headers or {}
+    page.goto = AsyncMock(return_value=response)
+    page.evaluate = AsyncMock(return_value=dom_hash)
+    page.context = _head(headers=headers)
+    return page
+
+
+def _manifest_with_record(tmp_path, **headers) -> tuple[IncrementalManifest, CaptureItem]:
+    item = CaptureItem(URL, str(tmp_path / "top.png"))
+    (tmp_path / "top.png").write_bytes(b"png")
+    manifest = IncrementalManifest(tmp_path / MANIFEST_NAME)
+    manifest.record(item, item.output, headers, "hash-1", elapsed=2.0, capture_seconds=0.5)
+    return manifest, item
+
+
+class TestIncrementalManifest:
+    def test_save_and_load(self, tmp_path):
+        manifest, item = _manifest_with_record(tmp_path, etag='"v1"')
+        manifest.save()
+
+        loaded = IncrementalManifest(tmp_path / MANIFEST_NAME)
+        record = loaded.previous(item, item.output)
+        assert record.etag == '"v1"'
+        assert record.dom_hash == "hash-1"
+
+    def test_previous_requires_same_output_and_existing_file(self, tmp_path):
+        manifest, item = _manifest_with_record(tmp_path)
+        assert manifest.previous(item, item.output) is not None
+        assert manifest.previous(CaptureItem(URL, item.output, full_page=True), item.output) is None
+        assert manifest.previous(item, tmp_path / "other.png") is None
+        (tmp_path / "top.png").unlink()
+        assert manifest.previous(item, item.output) is None
+
+    def test_default_path_is_common_output_directory(self, tmp_path):
+        items = [
+            CaptureItem(URL, str(tmp_path / "a" / "1.png")),
+            CaptureItem(URL, str(tmp_path / "b" / "2.png")),
+        ]
+        assert IncrementalManifest.default_path(items) == tmp_path / MANIFEST_NAME
+
+    def test_unknown_hash_mode(self, tmp_path):
+        with pytest.raises(ValueError, match="Unknown hash mode"):
+            IncrementalManifest(tmp_path / MANIFEST_NAME, hash_mode="pixels")
+
+    @pytest.mark.asyncio
+    async def test_not_modified_compares_validators(self, tmp_path):
+        manifest, item = _manifest_with_record(tmp_path, etag='"v1"')
+        record = manifest.previous(item, item.output)
+        assert await manifest.not_modified(_head(headers={"etag": '"v1"'}), record)
+        assert not await manifest.not_modified(_head(headers={"etag": '"v2"'}), record)
+        assert not await manifest.not_modified(_head(status=405), record)
+
+        context = MagicMock()
+        context.request.head = AsyncMock(side_effect=PlaywrightError("net::ERR_FAILED"))
+        assert not await manifest.not_modified(context, record)
+
+    @pytest.mark.asyncio
+    async def test_without_validators_head_is_not_sent(self, tmp_path):
+        manifest, item = _manifest_with_record(tmp_path)
+        context = _head(headers={"etag": '"v1"'})
+        assert not await manifest.not_modified(context, manifest.previous(item, item.output))
+        context.request.head.assert_not_awaited()
+
+
+class TestIncrementalCapture:
+    @pytest.mark.asyncio
+    async def test_first_run_captures_and_records(self, tmp_path):
+        manifest = IncrementalManifest(tmp_path / MANIFEST_NAME)
+        launcher = BrowserLauncher(ScreenInfo(1920, 1080, 1.0), incremental=manifest)
+        item = CaptureItem(URL, str(tmp_path / "top.png"))
+        page = _page(headers={"etag": '"v1"'})
+
+        result, _ = await launcher._capture_item(page, item)
+
+        assert result.ok and result.skipped is None
+        page.screenshot.assert_awaited_once()
+        assert manifest.records[URL].etag == '"v1"'
+        assert manifest.stats.captured == 1
+
+    @pytest.mark.asyncio
+    async def test_not_modified_skips_navigation(self, tmp_path):
+        manifest, item = _manifest_with_record(tmp_path, etag='"v1"')
+        launcher = BrowserLauncher(ScreenInfo(1920, 1080, 1.0), incremental=manifest)
+        page = _page(headers={"etag": '"v1"'})
+
+        result, _ = await launcher._capture_item(page, item)
+
+        assert result.ok and result.skipped == NOT_MODIFIED
+        page.goto.assert_not_awaited()
+        assert manifest.stats.not_modified == 1
+        assert manifest.stats.saved_seconds > 0
+
+    @pytest.mark.asyncio
+    async def test_unchanged_dom_skips_screenshot(self, tmp_path):
+        manifest, item = _manifest_with_record(tmp_path)
+        launcher = BrowserLauncher(ScreenInfo(1920, 1080, 1.0), incremental=manifest)
+        page = _page(dom_hash="hash-1")
+
+        result, _ = await launcher._capture_item(page, item)
+
+        assert result.skipped == DOM_UNCHANGED
+        page.goto.assert_awaited_once()
+        page.screenshot.assert_not_awaited()
+        assert manifest.stats.saved_seconds == 0.5
+
+    @pytest.mark.asyncio
+    async def test_unchanged_dom_refreshes_validators(self, tmp_path):
+        manifest, item = _manifest_with_record(tmp_path, etag='"v1"')
+        launcher = BrowserLauncher(ScreenInfo(1920, 1080, 1.0), incremental=manifest)
+        page = _page(dom_hash="hash-1", headers={"etag": '"v2"', "last-modified": "Mon, 01 Jan 2024 00:00:00 GMT"})
+
+        result, _ = await launcher._capture_item(page, item)
+
+        assert result.skipped == DOM_UNCHANGED
+        assert manifest.records[URL].etag == '"v2"'
+        assert manifest.records[URL].last_modified == "Mon, 01 Jan 2024 00:00:00 GMT"
+        # 次回は更新した検証子で HEAD リクエストだけで省略できる
+        assert await manifest.not_modified(page.context, manifest.records[URL])
+
+    @pytest.mark.asyncio
+    async def test_changed_dom_is_captured_again(self, tmp_path):
+        manifest, item = _manifest_with_record(tmp_path)
+        launcher = BrowserLauncher(ScreenInfo(1920, 1080, 1.0), incremental=manifest)
+        page = _page(dom_hash="hash-2")
+
+        result, _ = await launcher._capture_item(page, item)
+
+        assert result.skipped is None
+        page.screenshot.assert_awaited_once()
+        assert manifest.records[URL].dom_hash == "hash-2"
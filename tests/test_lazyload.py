@@ -0,0 +1,65 @@
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from src import BrowserLauncher, CaptureItem, ScreenInfo
+from src.lazyload import PreloadOptions, PreloadReport, preload_lazy_content
+
+_RESULT = {"steps": 4, "height": 5000, "truncated": False, "timedOut": False, "resources": 7}
+
+
+def _page(result=None) -> AsyncMock:
+    page = AsyncMock()
+    page.is_closed = MagicMock(return_value=False)
+    page.evaluate = AsyncMock(return_value=result or _RESULT)
+    return page
+
+
+class TestPreloadLazyContent:
+    @pytest.mark.asyncio
+    async def test_options_are_passed_and_result_reported(self):
+        page = _page()
+        report = await preload_lazy_content(page, PreloadOptions(max_height=8000, timeout_ms=1000))
+
+        _, arg = page.evaluate.await_args.args
+        assert arg["maxHeight"] == 8000
+        assert arg["timeoutMs"] == 1000
+        assert (report.steps, report.height, report.resources) == (4, 5000, 7)
+        assert "7 resources" in report.summary()
+
+    @pytest.mark.asyncio
+    async def test_style_and_class_changes_do_not_reset_settle(self):
+        page = _page()
+        await preload_lazy_content(page, PreloadOptions())
+
+        script, _ = page.evaluate.await_args.args
+        assert "attributes: true" not in script
+        assert "attributeFilter: ['src', 'srcset']" in script
+
+    def test_summary_notes_limits(self):
+        report = PreloadReport(steps=10, height=90000, resources=0, elapsed=1.0, truncated=True, timed_out=True)
+        assert "height limit reached" in report.summary()
+        assert "timed out" in report.summary()
+
+
+class TestLauncherPreload:
+    @pytest.mark.asyncio
+    async def test_disabled_by_default(self):
+        launcher = BrowserLauncher(ScreenInfo(1920, 1080, 1.0))
+        page = _page()
+        assert await launcher.preload_lazy_content(page) is None
+        page.evaluate.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_only_full_page_items_are_preloaded(self, tmp_path):
+        launcher = BrowserLauncher(ScreenInfo(1920, 1080, 1.0), preload=PreloadOptions())
+        page = _page()
+
+        result, _ = await launcher._capture_item(page, CaptureItem("https://example.com/", str(tmp_path / "a.png")))
+        assert result.preload is None
+        page.evaluate.assert_not_awaited()
+
+        item = CaptureItem("https://example.com/", str(tmp_path / "b.png"), full_page=True)
+        result, _ = await launcher._capture_item(page, item)
+        assert result.ok
+        assert result.preload.resources == 7
+        page.screenshot.assert_awaited_with(path=item.output, full_page=True)
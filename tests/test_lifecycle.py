@@ -0,0 +1,164 @@
+from contextlib import asynccontextmanager
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from src import BrowserLauncher, ScreenInfo
+from src import lifecycle
+from src.lifecycle import BROWSER, CONTEXT, PAGE, ManagedSession, RecyclePolicy
+
+MIB = 1024 * 1024
+
+
+class FakePage:
+    def __init__(self, context):
+        self.context = context
+        self.url = "about:blank"
+        self.closed = False
+        self.handlers = {}
+
+    def is_closed(self):
+        return self.closed
+
+    async def close(self):
+        self.closed = True
+        if handler := self.handlers.get("close"):
+            handler(self)
+
+    def on(self, event, handler):
+        self.handlers[event] = handler
+
+    async def evaluate(self, script, arg=None):
+        return None
+
+
+def _launcher() -> tuple[BrowserLauncher, list]:
+    """起動したブラウザとコンテキストを記録するランチャー"""
+    launcher = BrowserLauncher(ScreenInfo(1920, 1080, 1.0))
+    launched = []
+
+    def new_context(**options):
+        context = MagicMock()
+        context.options = options
+        context.pages = []
+
+        async def new_page():
+            page = FakePage(context)
+            context.pages.append(page)
+            return page
+
+        context.new_page = AsyncMock(side_effect=new_page)
+        context.storage_state = AsyncMock(return_value={"cookies": [{"name": "sid"}], "origins": []})
+        context.close = AsyncMock()
+        context.expose_binding = AsyncMock()
+        context.add_init_script = AsyncMock()
+        return context
+
+    @asynccontextmanager
+    async def launch_browser():
+        browser = MagicMock()
+        browser.new_context = AsyncMock(side_effect=new_context)
+        launched.append(browser)
+        yield browser
+
+    async def navigate(page, url, readiness=None):
+        page.url = url
+
+    launcher.launch_browser = launch_browser
+    launcher.navigate = AsyncMock(side_effect=navigate)
+    return launcher, launched
+
+
+class TestRecyclePolicy:
+    def test_invalid_values(self):
+        with pytest.raises(ValueError, match="context_captures"):
+            RecyclePolicy(context_captures=0)
+
+    def test_watermarks_are_rejected_without_rss(self, monkeypatch):
+        monkeypatch.setattr(lifecycle, "rss_available", lambda: False)
+        launcher = BrowserLauncher(ScreenInfo(1920, 1080, 1.0))
+
+        with pytest.raises(ValueError, match="/proc"):
+            ManagedSession(launcher, RecyclePolicy(context_watermark_mb=1024))
+        # 回数による作り直しと、RSS を渡した場合はそのまま使える
+        ManagedSession(launcher, RecyclePolicy(context_captures=10))
+        ManagedSession(launcher, RecyclePolicy(context_watermark_mb=1024), rss=lambda: 0)
+
+
+class TestManagedSession:
+    @pytest.mark.asyncio
+    async def test_no_policy_never_recycles(self):
+        launcher, _ = _launcher()
+        async with ManagedSession(launcher) as session:
+            page = session.page
+            for _ in range(10):
+                assert await session.after_capture() is None
+            assert session.page is page
+
+    @pytest.mark.asyncio
+    async def test_context_recycle_keeps_storage_state_and_url(self):
+        launcher, launched = _launcher()
+        async with ManagedSession(launcher, RecyclePolicy(context_captures=2), rss=lambda: 0) as session:
+            old = session.page
+            old.url = "https://example.com/app"
+            assert await session.after_capture() is None
+            event = await session.after_capture()
+
+            assert event.level == CONTEXT
+            assert "2 captures" in event.reason
+            assert session.page is not old
+            old.context.close.assert_awaited_once()
+            assert session.page.context.options["storage_state"]["cookies"][0]["name"] == "sid"
+            assert session.page.url == "https://example.com/app"
+            assert len(launched) == 1
+
+    @pytest.mark.asyncio
+    async def test_page_recycle_reuses_context(self):
+        launcher, _ = _launcher()
+        new_pages = []
+
+        async def on_page(page):
+            new_pages.append(page)
+
+        async with ManagedSession(launcher, RecyclePolicy(page_captures=1), on_page=on_page) as session:
+            context = session.page.context
+            event = await session.after_capture()
+            assert event.level == PAGE
+            assert session.page.context is context
+            assert new_pages == [context.pages[0], session.page]
+
+    @pytest.mark.asyncio
+    async def test_browser_watermark_restarts_browser(self):
+        launcher, launched = _launcher()
+        rss = iter([3000 * MIB, 3000 * MIB, 500 * MIB])
+        policy = RecyclePolicy(browser_watermark_mb=2048)
+        async with ManagedSession(launcher, policy, rss=lambda: next(rss)) as session:
+            event = await session.after_capture()
+
+        assert event.level == BROWSER
+        assert event.rss_before == 3000 * MIB and event.rss_after == 500 * MIB
+        assert len(launched) == 2
+
+    @pytest.mark.asyncio
+    async def test_context_recycle_escalates_when_memory_stays_high(self):
+        launcher, launched = _launcher()
+        events = []
+        policy = RecyclePolicy(context_watermark_mb=1024)
+        session = ManagedSession(launcher, policy, on_recycle=events.append, rss=lambda: 1500 * MIB)
+        async with session:
+            await session.after_capture()
+
+        assert [e.level for e in events] == [CONTEXT, BROWSER]
+        assert len(launched) == 2
+
+    @pytest.mark.asyncio
+    async def test_recycled_page_does_not_quit_key_capture(self):
+        launcher, _ = _launcher()
+        async with ManagedSession(launcher, RecyclePolicy(page_captures=1)) as session:
+            events = await launcher.setup_key_capture(session.page)
+            session.on_page = lambda page: launcher.setup_key_capture(page, events)
+            await session.after_capture()
+            assert events.empty()
+            session.page.context.expose_binding.assert_awaited_once()
+
+            await session.page.close()
+            assert events.get_nowait() == "quit"
@@ -0,0 +1,205 @@
+from pathlib import Path
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from playwright.async_api import Error as PlaywrightError
+from src import ScreenInfo, BrowserLauncher
+from src.asset_cache import RequestInterceptor
+from src.block_rules import BlockRules
+from src.matrix import SharedResponseCache, ViewportVariant, parse_viewport_list, parse_viewport_spec
+
+
+class TestViewportSpec:
+    def test_plain_and_scaled_specs(self):
+        assert parse_viewport_spec("1280x720") == ViewportVariant(1280, 720, 1.0)
+        assert parse_viewport_spec("390x844@3") == ViewportVariant(390, 844, 3.0)
+        assert parse_viewport_spec("1366x768@1.5x") == ViewportVariant(1366, 768, 1.5)
+
+    def test_effective_uses_detected_screen(self):
+        screen = ScreenInfo(width=3840, height=2160, scale_factor=1.5)
+        assert parse_viewport_spec("effective", screen) == ViewportVariant(2560, 1440, 1.5)
+
+    def test_effective_without_screen_raises(self):
+        with pytest.raises(ValueError):
+            parse_viewport_spec("effective")
+
+    def test_list_is_deduplicated(self):
+        screen = ScreenInfo(width=1920, height=1080, scale_factor=1.0)
+        variants = parse_viewport_list("1920x1080, effective,390x844@3", screen)
+        assert variants == [ViewportVariant(1920, 1080), ViewportVariant(390, 844, 3.0)]
+
+    def test_non_positive_scale_is_rejected(self):
+        with pytest.raises(ValueError, match="> 0"):
+            parse_viewport_spec("1280x720@0")
+        with pytest.raises(ValueError, match="> 0"):
+            parse_viewport_spec("0x720")
+
+    def test_output_path_includes_label(self):
+        assert ViewportVariant(390, 844, 3.0).output_path("out/top.png") == Path("out/top_390x844@3x.png")
+
+
+def _route(url: str, resource_type: str = "script") -> MagicMock:
+    route = MagicMock()
+    route.request.url = url
+    route.request.method = "GET"
+    route.request.resource_type = resource_type
+    route.fallback = AsyncMock()
+    route.fulfill = AsyncMock()
+    response = MagicMock(status=200, headers={"content-type": "text/javascript"})
+    response.body = AsyncMock(return_value=b"js")
+    route.fetch = AsyncMock(return_value=response)
+    return route
+
+
+class TestSharedResponseCache:
+    @pytest.mark.asyncio
+    async def test_second_request_is_served_from_memory(self):
+        cache = SharedResponseCache()
+        first, second = _route("https://example.com/app.js"), _route("https://example.com/app.js")
+
+        await cache._handle(first)
+        await cache._handle(second)
+
+        first.fetch.assert_called_once()
+        second.fetch.assert_not_called()
+        second.fulfill.assert_called_once_with(status=200, headers={"content-type": "text/javascript"}, body=b"js")
+        assert (cache.hits, cache.misses) == (1, 1)
+
+    @pytest.mark.asyncio
+    async def test_documents_are_not_shared(self):
+        cache = SharedResponseCache()
+        route = _route("https://example.com/", resource_type="document")
+
+        await cache._handle(route)
+
+        route.fallback.assert_called_once()
+        route.fetch.assert_not_called()
+
+
+    @pytest.mark.asyncio
+    async def test_transfer_headers_are_not_replayed(self):
+        cache = SharedResponseCache()
+        first, second = _route("https://example.com/app.js"), _route("https://example.com/app.js")
+        first.fetch.return_value.headers = {
+            "content-type": "text/javascript",
+            "content-encoding": "br",
+            "content-length": "17",
+        }
+
+        await cache._handle(first)
+        await cache._handle(second)
+
+        second.fulfill.assert_called_once_with(status=200, headers={"content-type": "text/javascript"}, body=b"js")
+
+    @pytest.mark.asyncio
+    async def test_memory_is_capped(self):
+        cache = SharedResponseCache(max_bytes=3)
+        for url in ("https://example.com/a.js", "https://example.com/b.js", "https://example.com/b.js"):
+            await cache._handle(_route(url))
+
+        # 2つ目は上限を超えるため保持せず、毎回取得する
+        assert (cache.hits, cache.misses, cache.bytes) == (0, 3, 2)
+
+
+class TestCaptureMatrix:
+    @pytest.mark.asyncio
+    async def test_one_context_per_variant_sharing_session(self, tmp_path):
+        launcher = BrowserLauncher(ScreenInfo(width=1920, height=1080, scale_factor=1.0))
+        contexts = []
+
+        async def new_context(**kwargs):
+            context = AsyncMock()
+            context.new_page = AsyncMock(return_value=AsyncMock())
+            context.storage_state = AsyncMock(return_value={"cookies": [{"name": "sid"}], "origins": []})
+            contexts.append((context, kwargs))
+            return context
+
+        mock_browser = AsyncMock()
+        mock_browser.new_context = AsyncMock(side_effect=new_context)
+        mock_playwright = AsyncMock()
+        mock_playwright.chromium.launch = AsyncMock(return_value=mock_browser)
+        variants = [ViewportVariant(1920, 1080), ViewportVariant(1280, 720, 2.0), ViewportVariant(390, 844, 3.0)]
+
+        with patch("src.browser_launcher.async_playwright") as mock_async_pw:
+            mock_async_pw.return_value.__aenter__ = AsyncMock(return_value=mock_playwright)
+            mock_async_pw.return_value.__aexit__ = AsyncMock(return_value=None)
+            results = await launcher.capture_matrix("https://example.com/", variants, tmp_path / "top.png")
+
+        assert mock_playwright.chromium.launch.call_count == 1
+        assert [r.ok for r in results] == [True, True, True]
+        assert [Path(r.path).name for r in results] == [
+            "top_1920x1080@1x.png",
+            "top_1280x720@2x.png",
+            "top_390x844@3x.png",
+        ]
+        assert contexts[1][1]["viewport"] == {"width": 1280, "height": 720}
+        assert contexts[1][1]["device_scale_factor"] == 2.0
+        assert "device_scale_factor" not in contexts[0][1]
+        assert "storage_state" not in contexts[0][1]
+        assert contexts[2][1]["storage_state"] == {"cookies": [{"name": "sid"}], "origins": []}
+        assert all(context.route.call_count == 1 for context, _ in contexts)
+
+    @pytest.mark.asyncio
+    async def test_context_failure_fails_only_that_variant(self, tmp_path):
+        launcher = BrowserLauncher(ScreenInfo(width=1920, height=1080, scale_factor=1.0))
+        contexts = []
+
+        async def new_context(**kwargs):
+            if kwargs.get("device_scale_factor") == 2.0:
+                raise PlaywrightError("deviceScaleFactor: expected number")
+            context = AsyncMock()
+            context.new_page = AsyncMock(return_value=AsyncMock())
+            context.storage_state = AsyncMock(return_value={"cookies": [], "origins": []})
+            contexts.append(context)
+            return context
+
+        mock_browser = AsyncMock()
+        mock_browser.new_context = AsyncMock(side_effect=new_context)
+        mock_playwright = AsyncMock()
+        mock_playwright.chromium.launch = AsyncMock(return_value=mock_browser)
+        variants = [ViewportVariant(1920, 1080), ViewportVariant(1280, 720, 2.0), ViewportVariant(390, 844, 3.0)]
+
+        with patch("src.browser_launcher.async_playwright") as mock_async_pw:
+            mock_async_pw.return_value.__aenter__ = AsyncMock(return_value=mock_playwright)
+            mock_async_pw.return_value.__aexit__ = AsyncMock(return_value=None)
+            results = await launcher.capture_matrix("https://example.com/", variants, tmp_path / "top.png")
+
+        assert [r.ok for r in results] == [True, False, True]
+        assert "deviceScaleFactor" in results[1].error
+        assert all(context.close.await_count == 1 for context in contexts)
+
+    @pytest.mark.asyncio
+    async def test_blocked_requests_never_reach_shared_cache(self, tmp_path):
+        interceptor = RequestInterceptor(block=BlockRules(hosts=("ads.example.net",)))
+        launcher = BrowserLauncher(ScreenInfo(width=1920, height=1080, scale_factor=1.0), interceptor=interceptor)
+        shared = SharedResponseCache()
+        handlers = []
+
+        async def new_context(**kwargs):
+            context = AsyncMock()
+            context.new_page = AsyncMock(return_value=AsyncMock())
+            context.storage_state = AsyncMock(return_value={"cookies": [], "origins": []})
+            context.route = AsyncMock(side_effect=lambda pattern, handler: handlers.append(handler))
+            return context
+
+        mock_browser = AsyncMock()
+        mock_browser.new_context = AsyncMock(side_effect=new_context)
+        mock_playwright = AsyncMock()
+        mock_playwright.chromium.launch = AsyncMock(return_value=mock_browser)
+
+        with patch("src.browser_launcher.async_playwright") as mock_async_pw:
+            mock_async_pw.return_value.__aenter__ = AsyncMock(return_value=mock_playwright)
+            mock_async_pw.return_value.__aexit__ = AsyncMock(return_value=None)
+            await launcher.capture_matrix(
+                "https://example.com/", [ViewportVariant(1920, 1080)], tmp_path / "top.png", shared=shared
+            )
+
+        # Playwright と同じく後に登録したルートから呼ぶ
+        route = _route("https://ads.example.net/tag.js")
+        route.abort = AsyncMock()
+        await handlers[-1](route)
+
+        route.abort.assert_called_once_with("blockedbyclient")
+        route.fetch.assert_not_called()
+        assert handlers == [shared._handle, interceptor._handle]
+        assert (shared.hits, shared.misses, interceptor.stats.blocked) == (0, 0, 1)
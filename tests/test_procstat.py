@@ -0,0 +1,31 @@
+import os
+import subprocess
+import sys
+
+import pytest
+from src import procstat
+from src.procstat import process_rss, process_tree, process_tree_rss, rss_available
+
+pytestmark = pytest.mark.skipif(not os.path.isdir("/proc/self/task"), reason="/proc が必要")
+
+
+class TestProcessTree:
+    def test_own_rss_is_positive(self):
+        assert process_rss(os.getpid()) > 0
+
+    def test_child_process_is_included(self):
+        child = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(5)"])
+        try:
+            assert child.pid in process_tree(os.getpid())
+            assert process_tree_rss() >= process_rss(child.pid) > 0
+        finally:
+            child.kill()
+            child.wait()
+
+    def test_missing_process(self):
+        assert process_rss(2**22 + 1) == 0
+
+    def test_rss_available(self, monkeypatch, tmp_path):
+        assert rss_available()
+        monkeypatch.setattr(procstat, "_PROC", tmp_path)
+        assert not rss_available()
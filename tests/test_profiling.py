@@ -0,0 +1,84 @@
+import asyncio
+import json
+
+import pytest
+from src.profiling import Profiler, percentile
+
+
+class TestPercentile:
+    def test_interpolates_between_values(self):
+        values = [1.0, 2.0, 3.0, 4.0, 5.0]
+        assert percentile(values, 50) == 3.0
+        assert percentile(values, 95) == pytest.approx(4.8)
+        assert percentile(values, 100) == 5.0
+
+    def test_empty(self):
+        assert percentile([], 50) == 0.0
+
+
+class TestProfiler:
+    def test_phase_records_duration_and_item(self):
+        profiler = Profiler()
+        with profiler.phase("goto", "https://example.com/"):
+            pass
+        [event] = profiler.events
+        assert event.name == "goto"
+        assert event.item == "https://example.com/"
+        assert event.duration >= 0
+        assert event.ok
+
+    def test_failed_phase_is_recorded(self):
+        profiler = Profiler()
+        with pytest.raises(ValueError):
+            with profiler.phase("screenshot"):
+                raise ValueError("boom")
+        assert profiler.events[0].ok is False
+
+    def test_disabled_profiler_records_nothing(self):
+        profiler = Profiler(enabled=False)
+        with profiler.phase("goto"):
+            pass
+        profiler.record("encode_write", 0.0, 1.0)
+        assert profiler.events == []
+
+    def test_summary_per_phase(self):
+        profiler = Profiler()
+        for seconds in [0.1, 0.2, 0.3]:
+            profiler.record("goto", 0.0, seconds)
+        profiler.record("screenshot", 0.0, 0.05)
+        summary = profiler.summary()
+        assert summary["goto"]["count"] == 3
+        assert summary["goto"]["p50"] == pytest.approx(0.2)
+        assert summary["goto"]["max"] == pytest.approx(0.3)
+        assert summary["screenshot"]["total"] == pytest.approx(0.05)
+        assert "goto" in profiler.format_summary()
+
+    @pytest.mark.asyncio
+    async def test_concurrent_tasks_use_separate_lanes(self):
+        profiler = Profiler()
+
+        async def work(name):
+            with profiler.phase(name):
+                await asyncio.sleep(0)
+
+        await asyncio.gather(work("a"), work("b"))
+        assert len({event.lane for event in profiler.events}) == 2
+
+    def test_write_jsonl(self, tmp_path):
+        profiler = Profiler()
+        profiler.record("goto", 0.0, 0.5, "https://example.com/")
+        path = tmp_path / "profile.jsonl"
+        profiler.write(path)
+        [line] = path.read_text().splitlines()
+        assert json.loads(line)["name"] == "goto"
+
+    def test_write_chrome_trace(self, tmp_path):
+        profiler = Profiler()
+        with profiler.phase("screenshot", "out.png"):
+            pass
+        path = tmp_path / "trace" / "profile.json"
+        profiler.write(path)
+        [event] = json.loads(path.read_text())["traceEvents"]
+        assert event["ph"] == "X"
+        assert event["name"] == "screenshot"
+        assert event["args"]["item"] == "out.png"
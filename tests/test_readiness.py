@@ -0,0 +1,94 @@
+import pytest
+from unittest.mock import AsyncMock
+from playwright.async_api import Error as PlaywrightError, TimeoutError as PlaywrightTimeoutError
+from src import ScreenInfo, BrowserLauncher
+from src.readiness import ReadinessOptions, ReadinessReport, wait_for_ready
+
+
+def _mock_page(in_page_result: dict) -> AsyncMock:
+    page = AsyncMock()
+    page.url = "https://example.com/"
+    page.evaluate = AsyncMock(return_value=in_page_result)
+    return page
+
+
+class TestWaitForReady:
+    @pytest.mark.asyncio
+    async def test_records_in_page_condition_timings(self):
+        page = _mock_page({"timings": {"dom_quiet": 520.0, "fonts": 12.5, "images": 80.0}, "timedOut": []})
+
+        report = await wait_for_ready(page, ReadinessOptions(quiet_ms=500))
+
+        assert report.ready
+        assert report.timings_ms == {"dom_quiet": 520.0, "fonts": 12.5, "images": 80.0}
+        args = page.evaluate.call_args[0][1]
+        assert args["quietMs"] == 500
+        page.wait_for_selector.assert_not_called()
+        page.wait_for_function.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_selector_and_predicate_are_awaited(self):
+        page = _mock_page({"timings": {"dom_quiet": 500.0}, "timedOut": []})
+        options = ReadinessOptions(selector="#app[data-ready]", predicate="window.appReady === true", timeout_ms=3000)
+
+        report = await wait_for_ready(page, options)
+
+        page.wait_for_selector.assert_called_once_with("#app[data-ready]", state="visible", timeout=3000)
+        page.wait_for_function.assert_called_once_with("window.appReady === true", timeout=3000)
+        assert set(report.timings_ms) == {"dom_quiet", "selector", "predicate"}
+
+    @pytest.mark.asyncio
+    async def test_timeouts_are_reported_not_raised(self):
+        page = _mock_page({"timings": {"fonts": 3.0}, "timedOut": ["dom_quiet"]})
+        page.wait_for_selector = AsyncMock(side_effect=PlaywrightTimeoutError("Timeout 10ms exceeded"))
+
+        report = await wait_for_ready(page, ReadinessOptions(selector="#never"))
+
+        assert not report.ready
+        assert sorted(report.timed_out) == ["dom_quiet", "selector"]
+        assert "selector timed out" in report.summary()
+
+    @pytest.mark.asyncio
+    async def test_navigation_during_wait_is_reported(self):
+        page = _mock_page({})
+        page.evaluate = AsyncMock(side_effect=PlaywrightError("Execution context was destroyed"))
+
+        report = await wait_for_ready(page, ReadinessOptions())
+
+        assert not report.ready
+        assert report.timed_out == []
+        assert report.error == "Execution context was destroyed"
+        assert "error: Execution context was destroyed" in report.summary()
+
+    @pytest.mark.asyncio
+    async def test_style_and_class_changes_do_not_reset_dom_quiet(self):
+        page = _mock_page({"timings": {"dom_quiet": 500.0}, "timedOut": []})
+
+        await wait_for_ready(page, ReadinessOptions())
+
+        script = page.evaluate.call_args[0][0]
+        assert "attributes: true" not in script
+        assert "attributeFilter: ['src', 'srcset']" in script
+
+
+class TestLauncherReadiness:
+    @pytest.mark.asyncio
+    async def test_navigate_waits_and_records_report(self):
+        launcher = BrowserLauncher(ScreenInfo(1920, 1080, 1.0), readiness=ReadinessOptions())
+        page = _mock_page({"timings": {"dom_quiet": 500.0}, "timedOut": []})
+
+        await launcher.navigate(page, "https://example.com/")
+
+        page.goto.assert_called_once_with("https://example.com/")
+        assert len(launcher.readiness_reports) == 1
+        assert isinstance(launcher.readiness_reports[0], ReadinessReport)
+
+    @pytest.mark.asyncio
+    async def test_navigate_without_readiness_does_not_wait(self):
+        launcher = BrowserLauncher(ScreenInfo(1920, 1080, 1.0))
+        page = _mock_page({})
+
+        await launcher.navigate(page, "https://example.com/")
+
+        page.evaluate.assert_not_called()
+        assert launcher.readiness_reports == []
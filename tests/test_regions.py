@@ -0,0 +1,161 @@
+import io
+
+import pytest
+from src import BrowserLauncher, CaptureItem, ScreenInfo
+from src.encoder import EncodeOptions, ImageEncoder
+from src import regions as regions_module
+from src.batch import load_manifest
+from src.regions import Region, parse_region, parse_region_list, plan_regions, require_pillow
+
+pytest.importorskip("PIL")
+from PIL import Image  # noqa: E402
+
+# セレクタごとの要素の位置 (ドキュメント座標)
+ELEMENTS = {
+    "#header": {"x": 0, "y": 0, "width": 400, "height": 50},
+    "#cart": {"x": 300, "y": 100, "width": 80, "height": 40},
+    "#footer": {"x": 0, "y": 1500, "width": 400, "height": 60},
+}
+
+
+class FakePage:
+    """幅 400 x 高さ 2000 のページ (点 (x, y) の色は (x % 256, y % 256, 0)) を模倣する"""
+
+    def __init__(self, scale: int = 2, viewport_height: int = 600):
+        self.scale = scale
+        self.viewport_height = viewport_height
+        self.url = "https://example.com/"
+        self.screenshots: list[dict] = []
+
+    async def evaluate(self, script: str, selectors=None):
+        rects = [ELEMENTS.get(selector, {"error": "not found"}) for selector in selectors]
+        return {
+            "rects": rects,
+            "scrollX": 0,
+            "scrollY": 0,
+            "width": 400,
+            "height": self.viewport_height,
+            "scale": self.scale,
+            "documentWidth": 400,
+            "documentHeight": 2000,
+        }
+
+    async def goto(self, url: str) -> None:
+        return None
+
+    async def screenshot(self, full_page: bool = False, clip: dict | None = None) -> bytes:
+        self.screenshots.append({"full_page": full_page, "clip": clip})
+        if clip["x"] + clip["width"] > 400 or clip["y"] + clip["height"] > 2000:
+            raise AssertionError("Clipped area is either empty or outside the resulting image")
+        width, height = int(clip["width"]), int(clip["height"])
+        size = (width * self.scale, height * self.scale)
+        red = bytes((clip["x"] + x) % 256 for x in range(width))
+        green = bytes((clip["y"] + y) % 256 for y in range(height))
+        image = Image.merge("RGB", (
+            Image.frombytes("L", (width, 1), red).resize(size, Image.Resampling.NEAREST),
+            Image.frombytes("L", (1, height), green).resize(size, Image.Resampling.NEAREST),
+            Image.new("L", size),
+        ))
+        out = io.BytesIO()
+        image.save(out, "PNG")
+        return out.getvalue()
+
+
+class TestParseRegion:
+    def test_named_selector_and_clip(self):
+        assert parse_region("cart=.cart .total") == Region("cart", selector=".cart .total")
+        assert parse_region("10,20,300x200") == Region("10_20_300x200", clip=(10, 20, 300, 200))
+        assert parse_region("#main > table").name == "main-table"
+
+    def test_attribute_selector_is_not_a_name(self):
+        assert parse_region("[data-id=chart]").selector == "[data-id=chart]"
+
+    def test_duplicate_names_are_numbered(self):
+        regions = parse_region_list("row=.row; row=.row:last-child")
+        assert [r.name for r in regions] == ["row", "row-2"]
+
+    def test_invalid_size_raises(self):
+        with pytest.raises(ValueError):
+            parse_region("0,0,0x10")
+
+    def test_missing_pillow_fails_before_capture(self, monkeypatch, tmp_path):
+        monkeypatch.setattr(regions_module, "find_spec", lambda name: None)
+        manifest = tmp_path / "urls.csv"
+        manifest.write_text("https://example.com/,out/top.png,,#header\n")
+
+        with pytest.raises(RuntimeError, match="Pillow"):
+            require_pillow()
+        with pytest.raises(RuntimeError, match="Pillow"):
+            load_manifest(manifest)
+
+
+class TestPlanRegions:
+    def test_viewport_only_when_regions_are_visible(self):
+        regions = [Region("header", "#header"), Region("cart", "#cart")]
+        located = {"rects": [ELEMENTS["#header"], ELEMENTS["#cart"]], "scrollX": 0, "scrollY": 0,
+                   "width": 400, "height": 600, "scale": 1, "documentWidth": 400, "documentHeight": 2000}
+        plan = plan_regions(regions, located)
+        assert not plan.full_page
+        assert plan.clip == {"x": 0, "y": 0, "width": 400, "height": 140}
+        assert plan.boxes["cart"] == (300, 100, 80, 40)
+
+    def test_clip_is_limited_to_the_document(self):
+        regions = parse_region_list(["edge=350,1900,100x200", "beyond=0,2500,100x100"])
+        located = {"rects": [], "scrollX": 0, "scrollY": 0, "width": 400, "height": 600, "scale": 1,
+                   "documentWidth": 400, "documentHeight": 2000}
+        plan = plan_regions(regions, located)
+        assert plan.full_page
+        assert plan.clip == {"x": 350, "y": 1900, "width": 50, "height": 100}
+        assert plan.errors == {"beyond": "outside the page"}
+
+
+class TestCaptureRegions:
+    @pytest.mark.asyncio
+    async def test_regions_are_cropped_from_one_screenshot(self, tmp_path):
+        launcher = BrowserLauncher(ScreenInfo(1920, 1080, 1.0))
+        page = FakePage()
+        regions = parse_region_list(["header=#header", "cart=#cart", "footer=#footer", "missing=#nope"])
+
+        report = await launcher.capture_regions(page, regions, tmp_path / "top.png")
+
+        assert len(page.screenshots) == 1
+        assert page.screenshots[0] == {"full_page": True, "clip": {"x": 0, "y": 0, "width": 400, "height": 1560}}
+        assert [r.ok for r in report.results] == [True, True, True, False]
+        assert "not found" in report.results[3].error
+        with Image.open(tmp_path / "top_cart.png") as image:
+            assert image.size == (160, 80)
+            assert image.getpixel((0, 0)) == (300 % 256, 100, 0)
+        with Image.open(tmp_path / "top_footer.png") as image:
+            assert image.getpixel((0, 0)) == (0, 1500 % 256, 0)
+        assert "3 regions" in report.summary() and "1 failed" in report.summary()
+
+    @pytest.mark.asyncio
+    async def test_clip_outside_the_page_is_reported_not_raised(self, tmp_path):
+        launcher = BrowserLauncher(ScreenInfo(1920, 1080, 1.0))
+        page = FakePage(scale=1)
+        regions = parse_region_list(["edge=350,1950,100x100", "beyond=0,3000,100x100"])
+
+        report = await launcher.capture_regions(page, regions, tmp_path / "top.png")
+
+        assert page.screenshots[0]["clip"] == {"x": 350, "y": 1950, "width": 50, "height": 50}
+        assert [r.ok for r in report.results] == [True, False]
+        assert report.results[1].error == "outside the page"
+        with Image.open(tmp_path / "top_edge.png") as image:
+            assert image.size == (50, 50)
+
+    @pytest.mark.asyncio
+    async def test_batch_item_with_regions_uses_encoder(self, tmp_path):
+        launcher = BrowserLauncher(ScreenInfo(1920, 1080, 1.0))
+        page = FakePage(scale=1)
+        item = CaptureItem("https://example.com/", str(tmp_path / "top.png"), regions=parse_region_list("#header;#cart"))
+
+        async with ImageEncoder(EncodeOptions(format="jpeg")) as encoder:
+            result, written = await launcher._capture_item(page, item, encoder)
+
+        assert result.ok and written is None
+        assert page.screenshots[0]["full_page"] is False
+        assert [r.path for r in result.regions.results] == [
+            str(tmp_path / "top_header.jpg"),
+            str(tmp_path / "top_cart.jpg"),
+        ]
+        assert (tmp_path / "top_cart.jpg").exists()
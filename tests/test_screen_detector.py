@@ -1,6 +1,13 @@
 import pytest
-from unittest.mock import patch, MagicMock
-from src import ScreenInfo, detect_screen_info
+from unittest.mock import patch, MagicMock, AsyncMock
+from src import ScreenInfo, detect_screen_info, resolve_screen_info, resolve_screen_info_async
+from src.screen_detector import (
+    DEFAULT_SCREEN,
+    SCREEN_ENV,
+    load_cached_screen_info,
+    parse_screen_spec,
+    save_cached_screen_info,
+)
 
 
 class TestScreenInfo:
@@ -64,3 +71,80 @@ class TestDetectScreenInfo:
             assert result.width == 1920
             assert result.height == 1080
             assert result.scale_factor == 1.0
+
+
+class TestParseScreenSpec:
+    def test_spec_with_scale(self):
+        assert parse_screen_spec("3840x2160@200") == ScreenInfo(3840, 2160, 2.0)
+
+    def test_spec_with_percent_sign_and_fraction(self):
+        assert parse_screen_spec("1920x1080@125%") == ScreenInfo(1920, 1080, 1.25)
+
+    def test_spec_without_scale(self):
+        assert parse_screen_spec("2560x1440") == ScreenInfo(2560, 1440, 1.0)
+
+    def test_invalid_spec(self):
+        with pytest.raises(ValueError):
+            parse_screen_spec("fullhd")
+
+    def test_zero_scale_is_rejected(self):
+        with pytest.raises(ValueError, match="> 0"):
+            parse_screen_spec("1920x1080@0")
+
+    def test_zero_size_is_rejected(self):
+        with pytest.raises(ValueError, match="> 0"):
+            parse_screen_spec("0x0")
+
+
+class TestResolveScreenInfo:
+    @pytest.fixture(autouse=True)
+    def _no_env_override(self, monkeypatch):
+        monkeypatch.delenv(SCREEN_ENV, raising=False)
+
+    def test_override_skips_detection(self, tmp_path):
+        with patch("subprocess.run") as mock_run:
+            result = resolve_screen_info("3840x2160@200", cache_path=tmp_path / "screen.json")
+        assert result == ScreenInfo(3840, 2160, 2.0)
+        mock_run.assert_not_called()
+
+    def test_env_override(self, tmp_path, monkeypatch):
+        monkeypatch.setenv(SCREEN_ENV, "2560x1440@150")
+        with patch("subprocess.run") as mock_run:
+            result = resolve_screen_info(cache_path=tmp_path / "screen.json")
+        assert result == ScreenInfo(2560, 1440, 1.5)
+        mock_run.assert_not_called()
+
+    def test_no_detect_returns_default(self, tmp_path):
+        with patch("subprocess.run") as mock_run:
+            result = resolve_screen_info(detect=False, cache_path=tmp_path / "screen.json")
+        assert result == DEFAULT_SCREEN
+        mock_run.assert_not_called()
+
+    def test_detection_result_is_cached(self, tmp_path):
+        cache_path = tmp_path / "screen.json"
+        mock_result = MagicMock()
+        mock_result.returncode = 0
+        mock_result.stdout = "3840\n2160\n200"
+
+        with patch("subprocess.run", return_value=mock_result) as mock_run:
+            first = resolve_screen_info(cache_path=cache_path)
+            second = resolve_screen_info(cache_path=cache_path)
+        assert first == second == ScreenInfo(3840, 2160, 2.0)
+        assert mock_run.call_count == 1
+
+    def test_expired_cache_is_ignored(self, tmp_path):
+        cache_path = tmp_path / "screen.json"
+        save_cached_screen_info(ScreenInfo(3840, 2160, 2.0), cache_path)
+        assert load_cached_screen_info(cache_path, ttl=3600) == ScreenInfo(3840, 2160, 2.0)
+        assert load_cached_screen_info(cache_path, ttl=-1) is None
+
+    @pytest.mark.asyncio
+    async def test_async_detection_uses_subprocess(self, tmp_path):
+        proc = MagicMock()
+        proc.returncode = 0
+        proc.communicate = AsyncMock(return_value=(b"1920\n1080\n100", b""))
+
+        with patch("asyncio.create_subprocess_exec", AsyncMock(return_value=proc)) as mock_exec:
+            result = await resolve_screen_info_async(cache_path=tmp_path / "screen.json")
+        assert result == ScreenInfo(1920, 1080, 1.0)
+        assert mock_exec.call_args[0][0] == "powershell.exe"
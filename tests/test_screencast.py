@@ -0,0 +1,94 @@
+import asyncio
+import base64
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from src.screencast import CONCAT_NAME, ScreencastOptions, ScreencastRecorder
+
+JPEG = b"\xff\xd8frame\xff\xd9"
+
+
+def _page():
+    session = MagicMock()
+    session.send = AsyncMock()
+    session.detach = AsyncMock()
+    handlers = {}
+    session.on = MagicMock(side_effect=lambda event, handler: handlers.setdefault(event, handler))
+    page = MagicMock()
+    page.context.new_cdp_session = AsyncMock(return_value=session)
+    return page, session, handlers
+
+
+def _frame(timestamp: float, session_id: int = 1) -> dict:
+    return {
+        "data": base64.b64encode(JPEG).decode(),
+        "metadata": {"timestamp": timestamp},
+        "sessionId": session_id,
+    }
+
+
+class TestScreencastOptions:
+    def test_invalid_options(self):
+        with pytest.raises(ValueError, match="Unsupported screencast format"):
+            ScreencastOptions(format="webp")
+        with pytest.raises(ValueError, match="max_fps"):
+            ScreencastOptions(max_fps=0)
+
+    def test_mjpeg_requires_jpeg(self, tmp_path):
+        page, _, _ = _page()
+        with pytest.raises(ValueError, match="MJPEG"):
+            ScreencastRecorder(page, tmp_path / "out.mjpeg", ScreencastOptions(format="png"))
+
+
+class TestScreencastRecorder:
+    @pytest.mark.asyncio
+    async def test_writes_image_sequence_and_concat_file(self, tmp_path):
+        page, session, handlers = _page()
+        recorder = ScreencastRecorder(page, tmp_path / "rec", ScreencastOptions(max_fps=10))
+        await recorder.start()
+        session.send.assert_any_await("Page.startScreencast", {"format": "jpeg", "everyNthFrame": 1, "quality": 80})
+
+        for i, timestamp in enumerate([100.0, 100.05, 100.12, 100.25]):
+            handlers["Page.screencastFrame"](_frame(timestamp, session_id=i))
+        stats = await recorder.stop()
+
+        # 100.05 はフレームレートの上限 (0.1秒間隔) を超えるため捨てる
+        assert stats.received == 4
+        assert stats.dropped_rate == 1
+        assert stats.written == 3
+        assert stats.duration == pytest.approx(0.25)
+        assert (tmp_path / "rec" / "frame_000003.jpg").read_bytes() == JPEG
+        concat = (tmp_path / "rec" / CONCAT_NAME).read_text()
+        assert "duration 0.130000" in concat
+        # すべてのフレームに ACK を返す
+        acks = [c for c in session.send.await_args_list if c.args[0] == "Page.screencastFrameAck"]
+        assert len(acks) == 4
+        session.send.assert_any_await("Page.stopScreencast")
+
+    @pytest.mark.asyncio
+    async def test_full_queue_drops_frames_instead_of_blocking(self, tmp_path):
+        page, _, handlers = _page()
+        options = ScreencastOptions(max_fps=1000, queue_size=2)
+        recorder = ScreencastRecorder(page, tmp_path / "rec.mjpeg", options)
+        await recorder.start()
+
+        # 書き込みタスクが動く前に続けて届いたフレームはキューに入りきらない
+        for i in range(5):
+            handlers["Page.screencastFrame"](_frame(100.0 + i * 0.01))
+        stats = await recorder.stop()
+
+        assert stats.dropped_queue == 3
+        assert stats.written == 2
+        assert (tmp_path / "rec.mjpeg").read_bytes() == JPEG * 2
+
+    @pytest.mark.asyncio
+    async def test_max_duration_finishes_recording(self, tmp_path):
+        page, _, handlers = _page()
+        recorder = ScreencastRecorder(page, tmp_path / "rec", ScreencastOptions(max_duration=1.0))
+        await recorder.start()
+        handlers["Page.screencastFrame"](_frame(100.0))
+        handlers["Page.screencastFrame"](_frame(101.5))
+
+        await asyncio.wait_for(recorder.wait(), timeout=1)
+        stats = await recorder.stop()
+        assert stats.written == 1
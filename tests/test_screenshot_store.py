@@ -0,0 +1,96 @@
+import io
+import os
+
+import pytest
+from src.paths import unique_path
+from src.screenshot_store import ScreenshotStore, dhash, hamming
+
+pytest.importorskip("PIL")
+from PIL import Image  # noqa: E402
+
+
+def _png(shade: int = 0, dot: tuple[int, int] | None = None) -> bytes:
+    """左から右へ明るくなるグラデーション (`dot` の位置の1画素だけ変える)"""
+    image = Image.new("RGB", (64, 32))
+    for x in range(64):
+        image.paste((x * 4, shade, 0), (x, 0, x + 1, 32))
+    if dot:
+        image.putpixel(dot, (255, 255, 255))
+    out = io.BytesIO()
+    image.save(out, "PNG")
+    return out.getvalue()
+
+
+class TestScreenshotStore:
+    def test_identical_images_are_saved_once(self, tmp_path):
+        with ScreenshotStore(tmp_path / "store") as store:
+            first = store.put(_png(), "https://example.com/", "1920x1080", captured_at=100.0)
+            second = store.put(_png(), "https://example.com/", "1920x1080", captured_at=101.0)
+
+            assert not first.duplicate and second.duplicate
+            assert first.path == second.path and first.path.read_bytes() == _png()
+            assert len(list((tmp_path / "store" / "objects").rglob("*.png"))) == 1
+            stats = store.stats()
+            assert (stats.captures, stats.blobs) == (2, 1)
+            assert "1 deduplicated" in stats.summary()
+
+    def test_latest_and_history_by_url(self, tmp_path):
+        with ScreenshotStore(tmp_path) as store:
+            store.put(_png(0), "https://example.com/a", captured_at=100.0)
+            latest = store.put(_png(1), "https://example.com/a", captured_at=200.0)
+            store.put(_png(2), "https://example.com/b", captured_at=300.0)
+
+            assert store.latest("https://example.com/a").id == latest.id
+            assert [c.captured_at for c in store.history("https://example.com/a")] == [200.0, 100.0]
+            assert store.latest("https://example.com/missing") is None
+
+        # インデックスはディスクに残る
+        with ScreenshotStore(tmp_path) as store:
+            assert store.latest("https://example.com/a").sha256 == latest.sha256
+
+    def test_urls_are_normalized_on_insert_and_query(self, tmp_path):
+        with ScreenshotStore(tmp_path) as store:
+            stored = store.put(_png(), "https://Example.com", captured_at=1.0)
+
+            assert stored.url == "https://example.com/"
+            assert store.latest("https://example.com/").id == stored.id
+            assert store.latest("https://EXAMPLE.com:443#top").id == stored.id
+            assert len(store.history("https://example.com")) == 1
+
+    def test_states_group_exact_and_perceptual_matches(self, tmp_path):
+        url = "https://example.com/"
+        with ScreenshotStore(tmp_path) as store:
+            store.put(_png(), url, captured_at=1.0)
+            store.put(_png(dot=(10, 10)), url, captured_at=2.0)
+            store.put(_png(), url, captured_at=3.0)
+
+            exact = store.states(url)
+            assert [s.count for s in exact] == [2, 1]
+            assert exact[0].last.captured_at == 3.0
+            assert [s.count for s in store.states(url, max_distance=4)] == [3]
+
+    def test_link_points_to_stored_image(self, tmp_path):
+        with ScreenshotStore(tmp_path / "store") as store:
+            stored = store.put(_png(), "https://example.com/", link=tmp_path / "out" / "top.png")
+
+        link = tmp_path / "out" / "top.png"
+        assert link.read_bytes() == _png()
+        assert os.path.samefile(link, stored.path)
+
+
+class TestHashes:
+    def test_dhash_is_stable_for_small_changes(self):
+        a, width, height = dhash(_png())
+        b, _, _ = dhash(_png(dot=(10, 10)))
+        assert (width, height) == (64, 32)
+        assert len(a) == 16
+        assert hamming(a, b) <= 4
+
+
+class TestUniquePath:
+    def test_same_second_names_do_not_collide(self, tmp_path):
+        taken: set = set()
+        (tmp_path / "shot.png").write_bytes(b"")
+        assert unique_path(tmp_path / "shot.png", taken).name == "shot_2.png"
+        assert unique_path(tmp_path / "shot.png", taken).name == "shot_3.png"
+        assert unique_path(tmp_path / "other.png", taken).name == "other.png"
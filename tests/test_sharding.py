@@ -0,0 +1,148 @@
+import queue
+import threading
+from contextlib import asynccontextmanager
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from src import BrowserLauncher, CaptureItem, CaptureResult, ScreenInfo
+from src.asset_cache import InterceptorStats, RequestInterceptor
+from src.sharding import Checkpoint, ShardConfig, run_sharded
+
+
+def _page() -> AsyncMock:
+    page = AsyncMock(is_closed=lambda: False)
+    page.screenshot = AsyncMock(return_value=b"png-bytes")
+    return page
+
+
+class FakeConfig(ShardConfig):
+    """ブラウザを起動せずにページを返すランチャーを作る"""
+
+    def launcher(self) -> BrowserLauncher:
+        launcher = BrowserLauncher(ScreenInfo(1920, 1080, 1.0))
+        context = AsyncMock()
+        context.new_page = AsyncMock(side_effect=_page)
+        browser = AsyncMock()
+        browser.new_context = AsyncMock(return_value=context)
+
+        @asynccontextmanager
+        async def launch_browser():
+            yield browser
+
+        launcher.launch_browser = launch_browser
+        return launcher
+
+
+class InterceptingConfig(FakeConfig):
+    """ワーカーごとに、2件ヒットした横取りを持つランチャーを作る"""
+
+    def launcher(self) -> BrowserLauncher:
+        launcher = super().launcher()
+        launcher.interceptor = RequestInterceptor(stats=InterceptorStats(hits=2, bytes_saved=100))
+        return launcher
+
+
+class ThreadQueue(queue.Queue):
+    def cancel_join_thread(self) -> None:
+        pass
+
+
+class ThreadProcess:
+    """multiprocessing.Process の代わりにスレッドで実行する"""
+
+    def __init__(self, target, args, daemon=True, crash=False):
+        if crash:
+            # 項目を1件取り出したまま終了を知らせずに落ちるワーカー
+            target = lambda worker, config, tasks, results: tasks.get()  # noqa: E731
+        self._thread = threading.Thread(target=target, args=args, daemon=daemon)
+
+    def start(self):
+        self._thread.start()
+
+    def is_alive(self):
+        return self._thread.is_alive()
+
+    def join(self, timeout=None):
+        self._thread.join(timeout)
+
+    def terminate(self):
+        pass
+
+
+class ThreadContext:
+    def __init__(self, crash_worker: int | None = None):
+        self.crash_worker = crash_worker
+
+    def Queue(self):
+        return ThreadQueue()
+
+    def Process(self, target, args, daemon=True):
+        return ThreadProcess(target, args, daemon, crash=args[0] == self.crash_worker)
+
+
+def _items(tmp_path, n=6) -> list[CaptureItem]:
+    return [CaptureItem(f"https://example.com/{i}", str(tmp_path / f"{i}.png")) for i in range(n)]
+
+
+class TestCheckpoint:
+    def test_only_successful_items_are_completed(self, tmp_path):
+        items = _items(tmp_path, 3)
+        checkpoint = Checkpoint(tmp_path / "checkpoint.jsonl")
+        checkpoint.record(CaptureResult(items[0], ok=True))
+        checkpoint.record(CaptureResult(items[1], ok=False, error="timeout"))
+        with open(tmp_path / "checkpoint.jsonl", "a") as f:
+            f.write('{"url": "trunc')  # 書き込み途中で落ちた行
+
+        loaded = Checkpoint(tmp_path / "checkpoint.jsonl")
+        assert loaded.pending(items) == items[1:]
+
+
+class TestRunSharded:
+    @pytest.mark.asyncio
+    async def test_workers_share_queue_and_merge_results(self, tmp_path):
+        items = _items(tmp_path)
+        checkpoint = Checkpoint(tmp_path / "checkpoint.jsonl")
+        seen = []
+        with patch("src.sharding.multiprocessing.get_context", return_value=ThreadContext()):
+            report = await run_sharded(items, FakeConfig(concurrency=2), 2, checkpoint, on_result=seen.append)
+
+        assert [r.item for r in report.results] == items
+        assert report.failed == 0
+        assert len(seen) == len(items)
+        assert Checkpoint(checkpoint.path).pending(items) == []
+
+    @pytest.mark.asyncio
+    async def test_interceptor_stats_are_merged_from_workers(self, tmp_path):
+        with patch("src.sharding.multiprocessing.get_context", return_value=ThreadContext()):
+            plain = await run_sharded(_items(tmp_path), FakeConfig(concurrency=1), 2)
+            report = await run_sharded(_items(tmp_path), InterceptingConfig(concurrency=1), 2)
+
+        assert plain.interceptor is None
+        assert report.interceptor == InterceptorStats(hits=4, bytes_saved=200)
+
+    @pytest.mark.asyncio
+    async def test_resume_skips_completed_items(self, tmp_path):
+        items = _items(tmp_path, 4)
+        checkpoint = Checkpoint(tmp_path / "checkpoint.jsonl")
+        for item in items[:3]:
+            checkpoint.record(CaptureResult(item, ok=True))
+        with patch("src.sharding.multiprocessing.get_context", return_value=ThreadContext()):
+            report = await run_sharded(items, FakeConfig(concurrency=1), 2, Checkpoint(checkpoint.path))
+
+        assert report.resumed == 3
+        assert [r.item for r in report.results] == items[3:]
+
+    @pytest.mark.asyncio
+    async def test_crashed_worker_items_are_reported_as_failed(self, tmp_path, monkeypatch):
+        monkeypatch.setattr("src.sharding._POLL_SECONDS", 0.05)
+        items = _items(tmp_path)
+        checkpoint = Checkpoint(tmp_path / "checkpoint.jsonl")
+        with patch("src.sharding.multiprocessing.get_context", return_value=ThreadContext(crash_worker=1)):
+            report = await run_sharded(items, FakeConfig(concurrency=1), 2, checkpoint)
+
+        assert report.crashed == 1
+        assert report.failed == 1
+        lost = next(r for r in report.results if not r.ok)
+        assert "worker exited" in lost.error
+        # 失われた項目は次回の実行で撮影される
+        assert Checkpoint(checkpoint.path).pending(items) == [lost.item]
@@ -0,0 +1,128 @@
+import io
+
+import pytest
+from playwright.async_api import Error as PlaywrightError
+from src.tiled import _RESTORE_OVERLAYS_SCRIPT, StreamingPNGWriter, capture_tiled
+
+pytest.importorskip("PIL")
+from PIL import Image  # noqa: E402
+
+
+class FakePage:
+    """縦方向に色が変化するページ (行 y の色は (y % 256, 0, 0)) を模倣する"""
+
+    def __init__(self, width: int, height: int, viewport_height: int, scale: int = 1, scrollbar: int = 0):
+        self.width = width
+        self.scrollbar = scrollbar
+        self.height = height
+        self.viewport_height = viewport_height
+        self.scale = scale
+        self.scroll_y = 0
+        self.scripts: list[str] = []
+        self.screenshots = 0
+
+    async def evaluate(self, script: str, arg=None):
+        self.scripts.append(script)
+        if "clientWidth" in script:
+            return {
+                "width": self.width,
+                "viewportHeight": self.viewport_height,
+                "height": self.height,
+                "scale": self.scale,
+            }
+        if "scrollTo(0, y)" in script:
+            self.scroll_y = max(0, min(arg, self.height - self.viewport_height))
+            return self.scroll_y
+        return None
+
+    async def screenshot(self) -> bytes:
+        self.screenshots += 1
+        # 表示領域全体 (縦スクロールバーを含む) を撮影する
+        image = Image.new("RGB", ((self.width + self.scrollbar) * self.scale, self.viewport_height * self.scale))
+        for row in range(image.height):
+            y = self.scroll_y + row // self.scale
+            image.paste((y % 256, 0, 0), (0, row, image.width, row + 1))
+        out = io.BytesIO()
+        image.save(out, "PNG")
+        return out.getvalue()
+
+
+def _row_colors(path) -> list[int]:
+    with Image.open(path) as image:
+        return [image.getpixel((0, y))[0] for y in range(image.height)]
+
+
+class TestStreamingPNGWriter:
+    def test_rows_written_across_calls_form_valid_png(self, tmp_path):
+        path = tmp_path / "out.png"
+        with StreamingPNGWriter(path, 4, 3) as writer:
+            writer.write_rows(bytes([255, 0, 0] * 4))
+            writer.write_rows(bytes([0, 255, 0] * 4 + [0, 0, 255] * 4))
+
+        with Image.open(path) as image:
+            assert image.size == (4, 3)
+            assert [image.getpixel((0, y)) for y in range(3)] == [(255, 0, 0), (0, 255, 0), (0, 0, 255)]
+
+    def test_missing_rows_raise_and_remove_file(self, tmp_path):
+        path = tmp_path / "out.png"
+        with pytest.raises(ValueError):
+            with StreamingPNGWriter(path, 4, 3) as writer:
+                writer.write_rows(bytes([0] * 12))
+                writer.close()
+        assert not path.exists()
+
+
+class TestCaptureTiled:
+    @pytest.mark.asyncio
+    async def test_tiles_are_stitched_in_order(self, tmp_path):
+        page = FakePage(width=40, height=250, viewport_height=100)
+        report = await capture_tiled(page, tmp_path / "full.png")
+
+        assert report.tiles == 3
+        assert (report.width, report.height) == (40, 250)
+        assert _row_colors(tmp_path / "full.png") == [y % 256 for y in range(250)]
+        assert report.peak_rss_bytes > 0
+        assert "peak RSS" in report.summary()
+
+    @pytest.mark.asyncio
+    async def test_device_scale_factor_and_custom_tile_height(self, tmp_path):
+        page = FakePage(width=20, height=130, viewport_height=100, scale=2)
+        report = await capture_tiled(page, tmp_path / "full.png", tile_height=50)
+
+        assert report.tiles == 3
+        assert (report.width, report.height) == (40, 260)
+        assert _row_colors(tmp_path / "full.png") == [y // 2 for y in range(260)]
+
+    @pytest.mark.asyncio
+    async def test_scrollbar_does_not_change_scale(self, tmp_path):
+        page = FakePage(width=20, height=250, viewport_height=100, scale=2, scrollbar=15)
+        report = await capture_tiled(page, tmp_path / "full.png")
+
+        assert (report.width, report.height) == (40, 500)
+        assert _row_colors(tmp_path / "full.png") == [(y // 2) % 256 for y in range(500)]
+
+    @pytest.mark.asyncio
+    async def test_capture_error_is_not_replaced_by_restore_error(self, tmp_path):
+        page = FakePage(width=10, height=100, viewport_height=100)
+        evaluate = page.evaluate
+
+        async def broken_evaluate(script, arg=None):
+            if script == _RESTORE_OVERLAYS_SCRIPT:
+                raise PlaywrightError("Target page, context or browser has been closed")
+            return await evaluate(script, arg)
+
+        async def screenshot():
+            raise RuntimeError("capture failed")
+
+        page.evaluate = broken_evaluate
+        page.screenshot = screenshot
+        with pytest.raises(RuntimeError, match="capture failed"):
+            await capture_tiled(page, tmp_path / "full.png")
+
+    @pytest.mark.asyncio
+    async def test_overlays_are_pinned_and_restored(self, tmp_path):
+        page = FakePage(width=10, height=100, viewport_height=100)
+        await capture_tiled(page, tmp_path / "full.png")
+
+        assert any("sticky" in script for script in page.scripts)
+        assert "data-vr-tiled-style" in page.scripts[-1]
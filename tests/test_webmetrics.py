@@ -0,0 +1,91 @@
+import json
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from src import BrowserLauncher, CaptureItem, ScreenInfo
+from src.webmetrics import (
+    OBSERVER_SCRIPT,
+    PageMetrics,
+    append_metrics,
+    collect_metrics,
+    format_metrics_summary,
+    summarize_metrics,
+)
+
+COLLECTED = {
+    "ttfb": 42.5,
+    "domContentLoaded": 310.0,
+    "load": None,
+    "fcp": 120.0,
+    "lcp": 900.0,
+    "cls": 0.12,
+    "transferBytes": 204800.0,
+    "requests": 18,
+    "longTasks": 2,
+    "totalBlockingTime": 95.0,
+}
+
+
+def _page() -> AsyncMock:
+    page = AsyncMock()
+    page.url = "https://example.com/"
+    page.evaluate = AsyncMock(return_value=COLLECTED)
+    return page
+
+
+class TestCollectMetrics:
+    @pytest.mark.asyncio
+    async def test_maps_collected_values(self):
+        metrics = await collect_metrics(_page())
+        assert metrics.url == "https://example.com/"
+        assert metrics.lcp == 900.0
+        assert metrics.load is None
+        assert metrics.transfer_bytes == 204800
+        assert metrics.long_tasks == 2
+        assert "LCP 900ms" in metrics.summary()
+
+
+class TestMetricsOutput:
+    def test_append_writes_one_line_per_url(self, tmp_path):
+        output = tmp_path / "shots" / "top.png"
+        path = append_metrics(PageMetrics("https://example.com/", lcp=900.0), output)
+        append_metrics(PageMetrics("https://example.com/list", lcp=1500.0), tmp_path / "shots" / "list.png")
+
+        assert path == tmp_path / "shots" / "metrics.jsonl"
+        records = [json.loads(line) for line in path.read_text().splitlines()]
+        assert [r["url"] for r in records] == ["https://example.com/", "https://example.com/list"]
+        assert records[0]["output"] == str(output)
+
+    def test_summary_percentiles_skip_missing_values(self):
+        metrics = [PageMetrics(f"https://example.com/{i}", lcp=float(i * 100)) for i in range(1, 11)]
+        metrics.append(PageMetrics("https://example.com/none"))
+        summary = summarize_metrics(metrics)
+        assert summary["lcp"]["count"] == 10
+        assert summary["lcp"]["p50"] == pytest.approx(550)
+        assert summary["lcp"]["max"] == 1000
+        assert "fcp" not in summary
+        assert summary["requests"]["count"] == 11
+        assert format_metrics_summary(summary).splitlines()[0].startswith("metric")
+
+
+class TestLauncherMetrics:
+    @pytest.mark.asyncio
+    async def test_observers_installed_and_metrics_attached_to_result(self, tmp_path):
+        launcher = BrowserLauncher(ScreenInfo(1920, 1080, 1.0), metrics=True)
+        context = AsyncMock()
+        browser = MagicMock()
+        browser.new_context = AsyncMock(return_value=context)
+        await launcher.new_context(browser)
+        scripts = [c.args[0] for c in context.add_init_script.await_args_list]
+        assert OBSERVER_SCRIPT in scripts
+
+        result, _ = await launcher._capture_item(_page(), CaptureItem("https://example.com/", str(tmp_path / "a.png")))
+        assert result.ok
+        assert result.metrics.fcp == 120.0
+
+    @pytest.mark.asyncio
+    async def test_disabled_by_default(self):
+        launcher = BrowserLauncher(ScreenInfo(1920, 1080, 1.0))
+        page = _page()
+        assert await launcher.collect_metrics(page) is None
+        page.evaluate.assert_not_awaited()